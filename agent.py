@@ -0,0 +1,280 @@
+"""
+Local unlock agent, similar to ssh-agent.
+
+The agent unlocks the vault once and answers requests from local processes over a
+Unix domain socket, so clients don't need to re-derive the key or open the database.
+
+    python agent.py serve                 # prompts for the master password
+    python agent.py get 3
+    python agent.py search github
+    python agent.py generate --length 24
+    python agent.py lock
+    python agent.py --profile Team serve  # one agent (and socket) per profile
+
+Requests and responses are single JSON lines:
+    {"op": "get", "id": 3}            -> {"ok": true, "result": {...}}
+    {"op": "search", "query": "git"}  -> {"ok": true, "result": [...]}
+    {"op": "generate", "length": 24}  -> {"ok": true, "result": "..."}
+    {"op": "unlock", "password": ...} / {"op": "lock"} / {"op": "ping"}
+Errors come back as {"ok": false, "error": "..."}.
+
+The socket lives in a directory only the current user can enter and is itself mode 0600;
+on Linux the peer's uid is also checked. The unlocked session follows the same idle
+timeout as the GUI (PMRS_TIMEOUT_SECONDS, see timeout_manager.py).
+"""
+
+import argparse
+import asyncio
+import getpass
+import json
+import os
+import socket
+import struct
+import sys
+import time
+
+from database import Database
+from generator_core import PasswordPolicy, generate_password
+from profiles import DEFAULT_DB_NAME, profile_slug, resolve_db_path
+from timeout_manager import DEFAULT_TIMEOUT_SECONDS
+from utils import clear_key_cache
+from vault_service import VaultService, VaultLockedError, unlock_step
+
+
+def default_socket_path(profile=None):
+    """Each profile gets its own agent, so unlocking one vault never unlocks another."""
+    base = os.environ.get("XDG_RUNTIME_DIR") or os.path.join(os.path.expanduser("~"), ".pmrs")
+    name = "agent.sock" if profile is None else f"agent-{profile_slug(profile)}.sock"
+    return os.environ.get("PMRS_AGENT_SOCKET", os.path.join(base, "pmrs", name))
+
+
+class Agent:
+    def __init__(self, vault, socket_path, timeout_seconds=None):
+        self.vault = vault
+        self.socket_path = socket_path
+        if timeout_seconds is None:
+            timeout_seconds = float(os.environ.get("PMRS_TIMEOUT_SECONDS", DEFAULT_TIMEOUT_SECONDS))
+        self.timeout_seconds = timeout_seconds
+        self.last_activity = time.monotonic()
+        self._deadline = None  # asyncio TimerHandle for the idle lock
+
+    def update_activity(self):
+        self.last_activity = time.monotonic()
+
+    def lock(self):
+        self.vault.lock()
+        clear_key_cache()
+        if self._deadline is not None:
+            self._deadline.cancel()
+            self._deadline = None
+
+    def _arm(self, seconds):
+        # Same approach as TimeoutManager: one timer that re-arms itself if there was activity
+        if self._deadline is not None:
+            self._deadline.cancel()
+        self._deadline = asyncio.get_running_loop().call_later(max(seconds, 0.001), self._on_deadline)
+
+    def _on_deadline(self):
+        self._deadline = None
+        remaining = self.last_activity + self.timeout_seconds - time.monotonic()
+        if remaining <= 0:
+            print("Idle timeout: vault locked", file=sys.stderr)
+            self.lock()
+        else:
+            self._arm(remaining)
+
+    def _unlock_step(self, password):
+        """unlock_step on an executor thread, with a connection opened there (sqlite connections can't be shared between threads)."""
+        db = Database(self.vault.db.db_name)
+        try:
+            return unlock_step(db, password)
+        finally:
+            db.close()
+
+    async def handle(self, request):
+        """Answer one request dict and return the response dict."""
+        op = request.get("op")
+        try:
+            if op == "ping":
+                return {"ok": True, "result": {"unlocked": self.vault.is_unlocked}}
+            if op == "lock":
+                self.lock()
+                return {"ok": True, "result": None}
+            if op == "unlock":
+                # Key derivation and data migrations can take a while; keep serving other clients meanwhile
+                password = request.get("password", "")
+                if not await asyncio.get_running_loop().run_in_executor(None, self._unlock_step, password):
+                    return {"ok": False, "error": "Incorrect master password"}
+                self.vault.unlocked_by(password)
+                self.update_activity()
+                self._arm(self.timeout_seconds)
+                return {"ok": True, "result": None}
+            if op == "generate":
+                policy = PasswordPolicy(length=int(request.get("length", 20)),
+                                        exclude_look_alikes=bool(request.get("exclude_look_alikes", False)))
+                return {"ok": True, "result": generate_password(policy)}
+
+            # Everything below reads the vault and counts as activity
+            if not self.vault.is_unlocked:
+                return {"ok": False, "error": "Vault is locked"}
+            self.update_activity()
+            if op == "get":
+                entry = self.vault.get(int(request["id"]))
+                if entry is None:
+                    return {"ok": False, "error": f"No entry with ID {request['id']}"}
+                return {"ok": True, "result": entry}
+            if op == "search":
+                return {"ok": True, "result": self.vault.search(str(request.get("query", "")), bool(request.get("exact")))}
+            return {"ok": False, "error": f"Unknown operation: {op}"}
+        except (KeyError, ValueError, VaultLockedError) as e:
+            return {"ok": False, "error": str(e)}
+
+    def _peer_allowed(self, writer):
+        """Only accept connections from the user running the agent (Linux SO_PEERCRED)."""
+        sock = writer.get_extra_info("socket")
+        if sock is None or not hasattr(socket, "SO_PEERCRED"):
+            return True
+        creds = sock.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i"))
+        _, uid, _ = struct.unpack("3i", creds)
+        return uid == os.getuid()
+
+    async def _client(self, reader, writer):
+        if not self._peer_allowed(writer):
+            writer.close()
+            return
+        try:
+            # One connection can send many requests, one JSON object per line
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    response = await self.handle(json.loads(line))
+                except json.JSONDecodeError:
+                    response = {"ok": False, "error": "Invalid JSON"}
+                writer.write(json.dumps(response).encode() + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    def _remove_stale_socket(self):
+        """Remove the socket left by an agent that exited; refuse to replace one that still answers."""
+        if not os.path.exists(self.socket_path):
+            return
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(self.socket_path)
+        except ConnectionRefusedError:
+            os.remove(self.socket_path)
+            return
+        except FileNotFoundError:
+            return
+        finally:
+            probe.close()
+        raise RuntimeError(f"An agent is already listening on {self.socket_path}")
+
+    async def serve(self):
+        directory = os.path.dirname(self.socket_path)
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        os.chmod(directory, 0o700)
+        self._remove_stale_socket()
+
+        # Create the socket with no group/other permissions from the start
+        old_umask = os.umask(0o177)
+        try:
+            server = await asyncio.start_unix_server(self._client, path=self.socket_path)
+        finally:
+            os.umask(old_umask)
+        os.chmod(self.socket_path, 0o600)
+
+        if self.vault.is_unlocked:
+            self._arm(self.timeout_seconds)
+        print(f"Agent listening on {self.socket_path}", file=sys.stderr)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.lock()
+            if os.path.exists(self.socket_path):
+                os.remove(self.socket_path)
+
+
+class AgentClient:
+    """Blocking client for scripts; keeps one connection open for many requests."""
+
+    def __init__(self, socket_path=None):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(socket_path or default_socket_path())
+        self.file = self.sock.makefile("rwb")
+
+    def request(self, op, **fields):
+        self.file.write(json.dumps(dict(fields, op=op)).encode() + b"\n")
+        self.file.flush()
+        response = json.loads(self.file.readline())
+        if not response.get("ok"):
+            raise RuntimeError(response.get("error", "Agent error"))
+        return response["result"]
+
+    def close(self):
+        self.file.close()
+        self.sock.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Password vault unlock agent")
+    parser.add_argument("--socket", help="Socket path (default: one per profile in $XDG_RUNTIME_DIR/pmrs)")
+    parser.add_argument("--profile", help="Serve or query this profile's vault (see profiles.py)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("serve", help="Unlock the vault and serve requests")
+    p.add_argument("--db", default=DEFAULT_DB_NAME, help="Vault database file, if no --profile is given")
+    p.add_argument("--timeout", type=float, help="Idle seconds before locking")
+    p = sub.add_parser("get")
+    p.add_argument("id", type=int)
+    p = sub.add_parser("search")
+    p.add_argument("query")
+    p = sub.add_parser("generate")
+    p.add_argument("--length", type=int, default=20)
+    sub.add_parser("lock")
+    sub.add_parser("ping")
+    args = parser.parse_args(argv)
+    socket_path = args.socket or default_socket_path(args.profile)
+
+    if not hasattr(socket, "AF_UNIX"):
+        print("The agent needs Unix domain sockets, which this platform does not support", file=sys.stderr)
+        return 1
+
+    if args.command == "serve":
+        try:
+            vault = VaultService(db_name=resolve_db_path(args.profile, args.db))
+        except KeyError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 1
+        password = os.environ.get("PMRS_MASTER_PASSWORD") or getpass.getpass("Master password: ")
+        if not vault.unlock(password):
+            print("Incorrect master password", file=sys.stderr)
+            return 2
+        try:
+            asyncio.run(Agent(vault, socket_path, args.timeout).serve())
+        except KeyboardInterrupt:
+            pass
+        except RuntimeError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 1
+        return 0
+
+    client = AgentClient(socket_path)
+    try:
+        fields = {k: v for k, v in vars(args).items() if k not in ("command", "socket", "profile")}
+        print(json.dumps(client.request(args.command, **fields), indent=2))
+    except RuntimeError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        client.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
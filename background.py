@@ -0,0 +1,56 @@
+"""
+Database work off the Tk thread.
+
+sqlite connections can't be shared between threads, so a DatabaseWorker opens its own
+Database for the step it runs. The GUI starts one, polls `done` with root.after() and
+then reads `result` or `error`:
+
+    worker = DatabaseWorker(db.db_name, step, *args).start()
+
+Rotation (rotation.py), unlocking and prefetching the first vault page (vault_service.py)
+run this way, so key derivation and bulk decryption never freeze the window.
+
+This module must not import customtkinter.
+"""
+
+import threading
+
+from database import Database
+
+
+class DatabaseWorker:
+    """
+    Runs one step on a background thread. `step` is called as step(db, *args, **kwargs)
+    with a Database opened on the worker thread.
+    Poll `done` from the UI thread, then read `result` or `error`.
+    """
+
+    def __init__(self, db_name, step, *args, **kwargs):
+        self.db_name = db_name
+        self.step = step
+        self.args = args
+        self.kwargs = kwargs
+        self.result = None
+        self.error = None
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=getattr(step, "__name__", "worker"), daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    def _run(self):
+        db = None
+        try:
+            db = Database(self.db_name)
+            self.result = self.step(db, *self.args, **self.kwargs)
+        except Exception as e:
+            self.error = e
+        finally:
+            if db is not None:
+                db.close()
+            self._done.set()
@@ -0,0 +1,84 @@
+"""
+Synthetic data for the benchmarks: vault databases and small offline recommender models.
+Nothing here needs a display or network access.
+"""
+
+import os
+import random
+import string
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "recommender system"))
+
+from cryptography.fernet import Fernet
+from database import Database
+from utils import derive_key_from_password
+
+MASTER_PASSWORD = "benchmark-master-password"
+
+# Small training corpus so the fixture model trains in seconds and never downloads anything
+FIXTURE_PASSWORDS = [
+    "password123", "qwerty123", "admin123", "welcome123", "monkey123", "football123",
+    "baseball123", "dragon123", "abc123456", "letmein123", "shadow123", "princess123",
+    "chocolate123", "pass123@", "house123", "love123456", "bestclub123@", "superman123",
+    "batman123", "spiderman123", "michael123", "jennifer123", "thomas123", "jessica123",
+    "mustang123", "starwars123", "matrix123", "sunshine2020", "summer2021!", "winter#99",
+    "bluesky77", "greenapple1", "silverfox22", "goldfish88", "riverrun12", "oceanwave3",
+]
+
+
+def make_synthetic_vault(path, rows, master_password=MASTER_PASSWORD, seed=0):
+    """
+    Create a password_manager.db at `path` with `rows` encrypted entries.
+    Rows are encrypted with one Fernet instance and inserted with executemany,
+    so building a 100k-row vault takes seconds rather than minutes.
+    """
+    if os.path.exists(path):
+        os.remove(path)
+    db = Database(path)
+    db.save_master_password(master_password, "benchmark-backup-key")
+
+    rng = random.Random(seed)
+    fernet = Fernet(derive_key_from_password(master_password))
+    alphabet = string.ascii_letters + string.digits + string.punctuation
+    batch = []
+    for i in range(rows):
+        site = f"site-{i}.example.com"
+        password = "".join(rng.choice(alphabet) for _ in range(16))
+        days_old = rng.randint(0, 900)
+        batch.append((site, fernet.encrypt(password.encode()).decode(), f"-{days_old} days"))
+    db.conn.executemany(
+        "INSERT INTO passwords (site, password, last_updated) VALUES (?, ?, datetime('now', ?))",
+        batch,
+    )
+    db.conn.commit()
+    return db
+
+
+def _offline(generator_class):
+    """Subclass a recommender generator so it trains on the fixture corpus instead of downloading."""
+    class OfflineGenerator(generator_class):
+        def download_dataset(self):
+            return [p for p in FIXTURE_PASSWORDS if 6 <= len(p) <= self.max_length]
+    OfflineGenerator.__name__ = "Offline" + generator_class.__name__
+    return OfflineGenerator
+
+
+def make_fixture_ml_generator(epochs=1):
+    """A recommender_system.PasswordGenerator with a small model trained on the fixture corpus."""
+    from recommender_system import PasswordGenerator
+    generator = _offline(PasswordGenerator)(max_length=15)
+    # Train in a throwaway run directory so a saved model is never picked up
+    generator.train(epochs=epochs, run_dir=tempfile.mkdtemp(prefix="pmrs_bench_"))
+    return generator
+
+
+def make_fixture_memorable_generator():
+    """A recommender_system_memorable.PasswordGenerator with its word list built from the fixture corpus."""
+    from recommender_system_memorable import PasswordGenerator
+    generator = _offline(PasswordGenerator)(max_length=15)
+    generator.extract_common_words(generator.download_dataset())
+    return generator
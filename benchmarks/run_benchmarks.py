@@ -0,0 +1,218 @@
+"""
+Headless benchmark suite for the hot paths.
+
+Usage:
+    python benchmarks/run_benchmarks.py                       # all benchmarks, 1k/10k/100k vaults
+    python benchmarks/run_benchmarks.py --sizes 1000 --skip-ml
+    python benchmarks/run_benchmarks.py --output new.json --baseline baseline.json
+
+Results are saved as JSON. With --baseline, every benchmark is compared against the
+baseline file and the script exits with status 1 if any got slower than --tolerance allows.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+import fixtures
+from fixtures import MASTER_PASSWORD
+from migrations import run_data_migrations
+
+# Operations timed per vault size (kept small so big vaults stay quick to benchmark)
+WRITE_OPS = 200
+CRYPTO_OPS = 1000
+
+
+def measure(func, repeat=3, ops=1):
+    """Run func `repeat` times and return the median seconds per run and per operation."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    seconds = statistics.median(timings)
+    return {"seconds": seconds, "ops": ops, "ms_per_op": seconds * 1000 / ops}
+
+
+def quiet(func):
+    """Silence the debug prints of the recommender modules while timing."""
+    def wrapper():
+        with contextlib.redirect_stdout(io.StringIO()):
+            return func()
+    return wrapper
+
+
+def bench_database(size, workdir):
+    path = os.path.join(workdir, f"vault_{size}.db")
+    db = fixtures.make_synthetic_vault(path, size)
+    rng = random.Random(size)
+    results = {}
+
+    def add():
+        for i in range(WRITE_OPS):
+            db.add_password(f"bench-{i}.example.com", "Benchmark#Password1", MASTER_PASSWORD)
+    results[f"db.add_password[{size}]"] = measure(add, ops=WRITE_OPS)
+
+    # The fixture stores plaintext sites like a vault from before site encryption; this is the one-off migration
+    results[f"migrations.encrypt_sites[{size}]"] = measure(lambda: run_data_migrations(db, MASTER_PASSWORD), repeat=1, ops=size)
+    results[f"db.search_passwords.prefix[{size}]"] = measure(lambda: db.search_passwords("site-12", MASTER_PASSWORD))
+    results[f"db.search_passwords.exact[{size}]"] = measure(
+        lambda: db.search_passwords("site-12.example.com", MASTER_PASSWORD, exact=True))
+
+    results[f"db.get_all_passwords[{size}]"] = measure(lambda: db.get_all_passwords(MASTER_PASSWORD), repeat=1, ops=size)
+
+    results[f"db.refresh_statuses[{size}]"] = measure(db.refresh_statuses)
+    results[f"db.count_by_status[{size}]"] = measure(db.count_by_status)
+    results[f"db.list_stale[{size}]"] = measure(lambda: db.list_stale(MASTER_PASSWORD, limit=100), ops=100)
+
+    # Keyset pagination: the last page should cost the same as the first
+    last_date = db.conn.execute("SELECT last_updated, id FROM passwords ORDER BY last_updated DESC, id DESC LIMIT 1 OFFSET 50").fetchone()
+    results[f"db.list_page.first[{size}]"] = measure(lambda: db.list_page(MASTER_PASSWORD, sort="last_updated"))
+    results[f"db.list_page.last[{size}]"] = measure(lambda: db.list_page(MASTER_PASSWORD, sort="last_updated", after=last_date))
+    results[f"db.list_page.site_filter[{size}]"] = measure(lambda: db.list_page(MASTER_PASSWORD, site="site-1"))
+
+    ids = [row[0] for row in db.conn.execute("SELECT id FROM passwords")]
+
+    def update():
+        for password_id in rng.sample(ids, WRITE_OPS):
+            db.update_password(password_id, "Rotated#Password2", MASTER_PASSWORD)
+    results[f"db.update_password[{size}]"] = measure(update, ops=WRITE_OPS)
+
+    # History lookups go through the (password_id, id) index however much history there is
+    results[f"db.password_history[{size}]"] = measure(lambda: db.password_history(ids[0], MASTER_PASSWORD, limit=10))
+    results[f"db.prune_history[{size}]"] = measure(lambda: db.prune_history(keep_versions=1), repeat=1)
+
+    def delete():
+        for password_id in rng.sample(ids, WRITE_OPS):
+            ids.remove(password_id)
+            db.delete_password(password_id)
+    results[f"db.delete_password[{size}]"] = measure(delete, repeat=1, ops=WRITE_OPS)
+
+    db.close()
+    return results
+
+
+def bench_sync(size, workdir):
+    """Sync a vault with a copy of itself: once to build the hash tree, then clean, then with a few edits."""
+    import shutil
+    from database import Database
+    from sync import sync
+
+    local_path = os.path.join(workdir, f"vault_{size}.db")
+    remote_path = os.path.join(workdir, f"vault_{size}_copy.db")
+    shutil.copy(local_path, remote_path)
+    results = {f"sync.first[{size}]": measure(lambda: sync(local_path, remote_path), repeat=1)}
+    results[f"sync.in_sync[{size}]"] = measure(lambda: sync(local_path, remote_path))
+
+    remote = Database(remote_path)
+    ids = [row[0] for row in remote.conn.execute("SELECT id FROM passwords LIMIT 10")]
+    with remote.batch():
+        for password_id in ids:
+            remote.update_password(password_id, "Synced#Password3", MASTER_PASSWORD)
+    remote.close()
+    results[f"sync.few_changes[{size}]"] = measure(lambda: sync(local_path, remote_path), repeat=1)
+    return results
+
+
+def bench_crypto():
+    from utils import encrypt_password, decrypt_password
+
+    def round_trip():
+        for _ in range(CRYPTO_OPS):
+            decrypt_password(encrypt_password("Benchmark#Password1", MASTER_PASSWORD), MASTER_PASSWORD)
+    return {"crypto.encrypt_decrypt": measure(round_trip, ops=CRYPTO_OPS)}
+
+
+def bench_recommender():
+    results = {}
+    ml = quiet(fixtures.make_fixture_ml_generator)()
+    corpus = ml.download_dataset()
+    results["ml.prepare_data"] = measure(lambda: ml.prepare_data(corpus), ops=len(corpus))
+    results["ml.generate_password"] = measure(quiet(lambda: [ml.generate_password() for _ in range(5)]), ops=5)
+    results["ml.generate_multiple"] = measure(quiet(lambda: ml.generate_multiple(100)), repeat=1, ops=100)
+    candidates = [random.choice(corpus) + str(i) for i in range(10000)]
+    results["ml.score_passwords"] = measure(lambda: ml.score_passwords(candidates), ops=len(candidates))
+
+    from model_export import ExportedModel, export_model
+    windows, _ = ml.prepare_data(corpus)
+    results["ml.keras.predict_1"] = measure(lambda: [ml.model.predict(windows[:1], verbose=0) for _ in range(20)], ops=20)
+    with tempfile.TemporaryDirectory() as workdir:
+        for dtype in ("float16", "int8"):
+            path = export_model(ml.model, ml.get_vocabulary(), os.path.join(workdir, f"model.{dtype}.pmrsm"), dtype)
+            results[f"ml.exported_{dtype}.load"] = measure(lambda: ExportedModel(path), ops=1)
+            exported = ExportedModel(path)
+            results[f"ml.exported_{dtype}.predict_1"] = measure(lambda: [exported.predict(windows[:1]) for _ in range(20)], ops=20)
+
+    memorable = quiet(fixtures.make_fixture_memorable_generator)()
+    results["memorable.extract_common_words"] = measure(quiet(lambda: memorable.extract_common_words(corpus)), ops=len(corpus))
+    results["memorable.generate_multiple"] = measure(quiet(lambda: memorable.generate_multiple(100)), ops=100)
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Return (name, baseline ms/op, current ms/op) for every benchmark that regressed."""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get("results", {}).get(name)
+        if previous and current["ms_per_op"] > previous["ms_per_op"] * (1 + tolerance):
+            regressions.append((name, previous["ms_per_op"], current["ms_per_op"]))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the headless benchmark suite")
+    parser.add_argument("--sizes", default="1000,10000,100000", help="Comma separated vault sizes")
+    parser.add_argument("--skip-ml", action="store_true", help="Skip the recommender benchmarks (no TensorFlow needed)")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", help="Previous results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown before failing (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in [int(s) for s in args.sizes.split(",") if s.strip()]:
+            print(f"Benchmarking database with {size} rows...")
+            results.update(bench_database(size, workdir))
+            results.update(bench_sync(size, workdir))
+    print("Benchmarking crypto...")
+    results.update(bench_crypto())
+    if not args.skip_ml:
+        print("Benchmarking recommender...")
+        results.update(bench_recommender())
+
+    for name, result in results.items():
+        print(f"{name:<40} {result['ms_per_op']:>10.3f} ms/op  ({result['seconds']:.3f}s total)")
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results saved to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        for name, before, after in regressions:
+            print(f"REGRESSION {name}: {before:.3f} -> {after:.3f} ms/op")
+        if regressions:
+            sys.exit(1)
+        print("No regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""
+Pre-generated password candidates.
+
+Generating a recommended password can take a while (the ML generator may run several
+LSTM generations before one passes its strength check), so each generator gets a
+CandidatePool: a bounded queue that a background thread keeps topped up. take() never
+blocks; it returns a ready candidate or None if the pool is still empty.
+
+The pool refills when it drops below `low_water` and stops once it holds `capacity`
+candidates. close() discards everything, which is done on logout and timeout so no
+unused passwords outlive the session.
+
+If setup or generation fails (a download error, a model error), the error is kept in
+`last_error` and the worker retries with an increasing delay instead of exiting, so one
+failure does not leave the pool empty for the rest of the session.
+"""
+
+import collections
+import threading
+import time
+
+from tracing import count, span
+
+# Delay before retrying after setup_fn or generate_fn raised, doubled on each failure in a row
+RETRY_INITIAL_SECONDS = 1.0
+RETRY_MAX_SECONDS = 60.0
+
+
+class CandidatePool:
+    def __init__(self, generate_fn, capacity=8, low_water=3, setup_fn=None, name="pool"):
+        """
+        generate_fn: called on the worker thread, returns a list of new candidates
+        setup_fn: optional one-off initialisation run on the worker thread first
+                  (for example training the ML model), so the UI never waits on it
+        """
+        if not 0 <= low_water < capacity:
+            raise ValueError("low_water must be between 0 and capacity - 1")
+        self.generate_fn = generate_fn
+        self.setup_fn = setup_fn
+        self.capacity = capacity
+        self.low_water = low_water
+        self.name = name
+
+        self._candidates = collections.deque()
+        self._condition = threading.Condition()
+        self._filling = True  # Fill up to capacity as soon as we start
+        self._closed = False
+        self._thread = None
+
+        self.ready = setup_fn is None
+        self.last_error = None
+        self.generated = 0
+        self.served = 0
+        self.misses = 0
+        self.generation_seconds = 0.0
+
+    def start(self):
+        """Start the background worker (does nothing if it is already running)."""
+        with self._condition:
+            if self._thread is not None or self._closed:
+                return
+            self._thread = threading.Thread(target=self._run, name=f"CandidatePool-{self.name}", daemon=True)
+            self._thread.start()
+
+    def take(self):
+        """Return a candidate immediately, or None if none is ready yet."""
+        with self._condition:
+            if not self._candidates:
+                self.misses += 1
+                count(f"pool.{self.name}.miss")
+                self._filling = True
+                self._condition.notify()
+                return None
+            candidate = self._candidates.popleft()
+            self.served += 1
+            count(f"pool.{self.name}.hit")
+            if len(self._candidates) < self.low_water:
+                self._filling = True
+                self._condition.notify()
+            return candidate
+
+    def stats(self):
+        with self._condition:
+            size = len(self._candidates)
+            if self.last_error is not None:
+                state = "retrying after error"
+            elif not self.ready:
+                state = "warming up"
+            elif self._filling:
+                state = "filling"
+            else:
+                state = "full"
+            return {
+                "name": self.name,
+                "state": state,
+                "size": size,
+                "capacity": self.capacity,
+                "generated": self.generated,
+                "served": self.served,
+                "misses": self.misses,
+                "avg_generation_ms": (self.generation_seconds * 1000 / self.generated) if self.generated else 0.0,
+            }
+
+    def close(self):
+        """Stop refilling and discard every pending candidate."""
+        with self._condition:
+            self._closed = True
+            self._candidates.clear()
+            self._condition.notify_all()
+
+    def _run(self):
+        delay = RETRY_INITIAL_SECONDS
+        while not self.ready:
+            try:
+                with span(f"pool.{self.name}.setup"):
+                    self.setup_fn()
+                self.ready = True
+                self.last_error = None
+            except Exception as e:
+                self._record_error(e)
+                if not self._wait_before_retry(delay):
+                    return
+                delay = min(delay * 2, RETRY_MAX_SECONDS)
+
+        delay = RETRY_INITIAL_SECONDS
+        while True:
+            with self._condition:
+                while not self._closed and not self._filling:
+                    self._condition.wait()
+                if self._closed:
+                    return
+
+            start = time.perf_counter()
+            try:
+                with span(f"pool.{self.name}.generate"):
+                    new_candidates = list(self.generate_fn())
+            except Exception as e:
+                self._record_error(e)
+                if not self._wait_before_retry(delay):
+                    return
+                delay = min(delay * 2, RETRY_MAX_SECONDS)
+                continue
+            elapsed = time.perf_counter() - start
+            delay = RETRY_INITIAL_SECONDS
+
+            with self._condition:
+                if self._closed:
+                    return
+                self.last_error = None
+                room = self.capacity - len(self._candidates)
+                self._candidates.extend(new_candidates[:room])
+                self.generated += len(new_candidates[:room])
+                self.generation_seconds += elapsed
+                if len(self._candidates) >= self.capacity:
+                    self._filling = False
+
+    def _record_error(self, error):
+        self.last_error = error
+        count(f"pool.{self.name}.error")
+
+    def _wait_before_retry(self, seconds):
+        """Wait before retrying a failed step; False if the pool was closed meanwhile."""
+        with self._condition:
+            self._condition.wait_for(lambda: self._closed, timeout=seconds)
+            return not self._closed
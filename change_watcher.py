@@ -0,0 +1,53 @@
+"""
+Notices when another connection changes the vault file: a second app window, the CLI,
+the agent, sync, or this app's own background threads.
+
+SQLite bumps PRAGMA data_version for a connection whenever a *different* connection
+commits to the same file, so polling it is a single cheap query with no file-system
+watching. Listeners are called on the Tk thread; they can then ask the database what
+changed (Database.changed_ids_since / deleted_since, by mod_counter).
+"""
+
+import os
+
+from tracing import count
+
+# How often to check for external changes (override with PMRS_WATCH_INTERVAL_MS)
+DEFAULT_INTERVAL_MS = 1000
+
+
+class ChangeWatcher:
+    def __init__(self, db, root, interval_ms=None):
+        self.db = db
+        self.root = root
+        self.interval_ms = int(interval_ms or os.environ.get("PMRS_WATCH_INTERVAL_MS", DEFAULT_INTERVAL_MS))
+        self.listeners = []
+        self._version = None
+        self._job = None
+        self._running = False
+
+    def add_listener(self, listener):
+        self.listeners.append(listener)
+
+    def start(self):
+        if not self._running:
+            self._running = True
+            self._version = self.db.data_version()
+            self._job = self.root.after(self.interval_ms, self._poll)
+
+    def stop(self):
+        self._running = False
+        if self._job is not None:
+            self.root.after_cancel(self._job)
+            self._job = None
+
+    def _poll(self):
+        self._job = None
+        version = self.db.data_version()
+        if version != self._version:
+            self._version = version
+            count("db.external_change")
+            for listener in list(self.listeners):
+                listener()
+        if self._running:  # A listener may have stopped the watcher
+            self._job = self.root.after(self.interval_ms, self._poll)
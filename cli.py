@@ -0,0 +1,192 @@
+"""
+Command-line access to the vault, for scripts and batch jobs.
+
+    python cli.py list
+    python cli.py get 3
+    python cli.py history 3              (previous passwords, newest first)
+    python cli.py add github.com --generate
+    python cli.py search git             (sites, or words in them, starting with "git")
+    python cli.py search github.com --exact
+    python cli.py rotate 3 7 9
+    python cli.py rotate --stale 90 --dry-run
+    python cli.py batch ops.jsonl        (or "-" to read from stdin)
+    python cli.py --profile Team list    (a profile's vault, see profiles.py)
+
+The master password is read from PMRS_MASTER_PASSWORD, from --password-file, or
+prompted for. Results are printed as JSON (one object per line for batch).
+
+Batch files contain one JSON operation per line, for example:
+    {"op": "add", "site": "github.com", "password": "..."}
+    {"op": "update", "id": 3, "password": "..."}
+    {"op": "rotate", "id": 3, "length": 24}
+    {"op": "delete", "id": 4}
+    {"op": "get", "id": 5}
+    {"op": "search", "query": "git"}     (add "exact": true for exact site names)
+    {"op": "list"}
+All operations in a batch run in one transaction: if one fails, none are applied.
+"""
+
+import argparse
+import getpass
+import json
+import os
+import sys
+
+from generator_core import PasswordPolicy, generate_password
+from vault_service import VaultService, DEFAULT_ROTATION_POLICY
+from rotation import plan_rotation, apply_rotation
+from profiles import DEFAULT_DB_NAME, resolve_db_path
+
+
+def read_master_password(args):
+    if os.environ.get("PMRS_MASTER_PASSWORD"):
+        return os.environ["PMRS_MASTER_PASSWORD"]
+    if args.password_file:
+        with open(args.password_file, encoding="utf-8") as f:
+            return f.readline().rstrip("\n")
+    return getpass.getpass("Master password: ")
+
+
+def policy_from(op):
+    length = op.get("length")
+    return PasswordPolicy(length=int(length)) if length else DEFAULT_ROTATION_POLICY
+
+
+def run_operation(vault, op):
+    """Run one batch operation (a dict) and return its JSON-serialisable result."""
+    name = op.get("op")
+    if name == "list":
+        return vault.list()
+    if name == "get":
+        return vault.get(int(op["id"]))
+    if name == "search":
+        return vault.search(op["query"], bool(op.get("exact")))
+    if name == "add":
+        password = op.get("password") or generate_password(policy_from(op))
+        return {"id": vault.add(op["site"], password, op.get("last_updated")), "password": password}
+    if name == "update":
+        vault.update(int(op["id"]), op["password"])
+        return {"id": int(op["id"])}
+    if name == "rotate":
+        return {"id": int(op["id"]), "password": vault.rotate(int(op["id"]), policy_from(op))}
+    if name == "delete":
+        vault.delete(int(op["id"]))
+        return {"id": int(op["id"])}
+    raise ValueError(f"Unknown operation: {name}")
+
+
+def run_batch(vault, lines):
+    """Run every operation in one transaction and return the list of results."""
+    ops = [json.loads(line) for line in lines if line.strip()]
+    results = []
+    with vault.batch():
+        for op in ops:
+            results.append({"op": op.get("op"), "result": run_operation(vault, op)})
+    return results
+
+
+def print_json(value):
+    print(json.dumps(value, indent=2))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Password vault command-line interface")
+    parser.add_argument("--db", default=DEFAULT_DB_NAME, help="Vault database file")
+    parser.add_argument("--profile", help="Use this profile's vault (see profiles.py) instead of --db")
+    parser.add_argument("--password-file", help="Read the master password from the first line of this file")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("list", help="List all entries")
+    p = sub.add_parser("get", help="Show one entry")
+    p.add_argument("id", type=int)
+    p = sub.add_parser("history", help="Show an entry's previous passwords")
+    p.add_argument("id", type=int)
+    p.add_argument("--limit", type=int)
+    p = sub.add_parser("search", help="Find entries by site")
+    p.add_argument("query")
+    p.add_argument("--exact", action="store_true", help="Match the whole site name")
+    p = sub.add_parser("add", help="Add an entry")
+    p.add_argument("site")
+    group = p.add_mutually_exclusive_group(required=True)
+    group.add_argument("--password")
+    group.add_argument("--generate", action="store_true", help="Generate a strong password")
+    p.add_argument("--length", type=int, default=DEFAULT_ROTATION_POLICY.length)
+    p = sub.add_parser("update", help="Change an entry's password")
+    p.add_argument("id", type=int)
+    p.add_argument("password")
+    p = sub.add_parser("delete", help="Delete entries")
+    p.add_argument("ids", type=int, nargs="+")
+    p = sub.add_parser("rotate", help="Replace entries' passwords with generated ones")
+    p.add_argument("ids", type=int, nargs="*")
+    p.add_argument("--stale", type=int, metavar="DAYS", help="Rotate every entry older than DAYS instead")
+    p.add_argument("--dry-run", action="store_true", help="With --stale, only show what would change")
+    p.add_argument("--length", type=int, default=DEFAULT_ROTATION_POLICY.length)
+    p = sub.add_parser("batch", help="Run JSON-lines operations from a file or stdin in one transaction")
+    p.add_argument("file", nargs="?", default="-")
+    args = parser.parse_args(argv)
+    if args.command == "rotate" and not args.ids and args.stale is None:
+        parser.error("rotate needs entry IDs or --stale DAYS")
+
+    try:
+        db_name = resolve_db_path(args.profile, args.db)
+    except KeyError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    vault = VaultService(db_name=db_name)
+    if not vault.unlock(read_master_password(args)):
+        print("Incorrect master password", file=sys.stderr)
+        return 2
+
+    try:
+        if args.command == "list":
+            print_json(vault.list())
+        elif args.command == "get":
+            entry = vault.get(args.id)
+            if entry is None:
+                print(f"No entry with ID {args.id}", file=sys.stderr)
+                return 1
+            print_json(entry)
+        elif args.command == "history":
+            print_json(vault.history(args.id, args.limit))
+        elif args.command == "search":
+            print_json(vault.search(args.query, args.exact))
+        elif args.command == "add":
+            op = {"op": "add", "site": args.site, "password": args.password, "length": args.length}
+            print_json(run_operation(vault, op))
+        elif args.command == "update":
+            vault.update(args.id, args.password)
+        elif args.command == "delete":
+            with vault.batch():
+                for password_id in args.ids:
+                    vault.delete(password_id)
+        elif args.command == "rotate" and args.stale is not None:
+            rotation = plan_rotation(vault.db, args.stale, PasswordPolicy(length=args.length),
+                                     master_password=vault.master_password)
+            if not args.dry_run:
+                apply_rotation(vault.db, rotation, vault.master_password)
+            print_json([{"id": item.password_id, "site": item.site, "last_updated": item.last_updated,
+                         "password": item.new_password, "applied": rotation.applied} for item in rotation.items])
+        elif args.command == "rotate":
+            policy = PasswordPolicy(length=args.length)
+            with vault.batch():
+                results = [{"id": i, "password": vault.rotate(i, policy)} for i in args.ids]
+            # Only print the new passwords once they are committed
+            print_json(results)
+        elif args.command == "batch":
+            if args.file == "-":
+                results = run_batch(vault, sys.stdin)
+            else:
+                with open(args.file, encoding="utf-8") as f:
+                    results = run_batch(vault, f)
+            for result in results:
+                print(json.dumps(result))
+    except (KeyError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        vault.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
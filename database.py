@@ -1,42 +1,209 @@
 import sqlite3
+import contextlib
+import functools
+import logging
 import random
-import string
-from utils import hash_password, encrypt_password, decrypt_password
+import re
+import time
+from utils import hash_password, encrypt_password, decrypt_password, blind_index
 import hashlib
 import os
 import secrets
+import threading
+from datetime import datetime, timedelta
+from generator_core import PasswordPolicy, generate_password
+from migrations import migrate, NEXT_MOD_COUNTER, SYNC_BUCKET_DIGITS
+from tracing import traced
+
+logger = logging.getLogger("pmrs.db")
+
+# Password age buckets, stored in passwords.status
+STATUS_ACTIVE = "Active"
+STATUS_RECOMMENDED = "Recommended to Update"
+STATUS_VERY_IMPORTANT = "Very Important to Update"
+STATUS_UNKNOWN = "Unknown"
+RECOMMENDED_AFTER_DAYS = 90
+VERY_IMPORTANT_AFTER_DAYS = 365
+
+# last_updated is always "YYYY-MM-DD HH:MM:SS", so comparing it to a cutoff string
+# in the same format is an index range scan
+STATUS_CASE = '''
+    CASE
+        WHEN last_updated IS NULL OR datetime(last_updated) IS NULL THEN 'Unknown'
+        WHEN last_updated < :very_important THEN 'Very Important to Update'
+        WHEN last_updated < :recommended THEN 'Recommended to Update'
+        ELSE 'Active'
+    END
+'''
+
+# Columns list_page can sort by, with their collation. Each is backed by an index (which
+# also holds the id), so a page is an index range scan in (column, id) order. Sites are
+# encrypted, so they can be filtered (through the blind index below) but not sorted in SQL
+SORT_COLUMNS = {
+    "id": "",
+    "last_updated": "",
+}
+# Position of each sort column in a (id, site, password, last_updated, status) row
+SORT_ROW_INDEX = {"id": 0, "last_updated": 3}
+PAGE_SIZE = 50
+
+# Tables, indexes and triggers (sync bookkeeping, history, site index) are created by the
+# schema migrations in migrations.py
+
+# Every overwritten password is kept in password_history by a trigger, in the same
+# transaction as the change, whoever makes it (GUI, CLI, rotation, sync). Entries take
+# their history with them when deleted. HistoryCompactor trims it to the retention below.
+HISTORY_KEEP_VERSIONS = int(os.environ.get("PMRS_HISTORY_KEEP_VERSIONS", 10))  # Per entry, 0 = no limit
+HISTORY_MAX_AGE_DAYS = int(os.environ.get("PMRS_HISTORY_MAX_AGE_DAYS", 0))  # 0 = no limit
+HISTORY_PRUNE_BATCH = 500  # Rows deleted per transaction, so other writers are never held up for long
+VACUUM_PAGES_PER_STEP = 1000
+
+
+# Site names are stored encrypted. So that entries can still be looked up without decrypting
+# every site, each row also has a blind index: truncated HMACs (see utils.blind_index) of its
+# normalized site name, for exact lookups (passwords.site_index), and of the prefixes of the
+# name and of each word in it, for prefix lookups (site_tokens).
+# A writer that changes a site without a new site_index (sync copies encrypted sites as they
+# are) leaves the row unindexed; a data migration (migrations.py) catches up on the next unlock.
+SITE_PREFIX_MAX_LENGTH = 16  # Longer queries are looked up by their first 16 characters, then checked
+
+
+def normalize_site(site):
+    """The form sites are indexed and searched in: "https://www.GitHub.com/" -> "github.com"."""
+    site = re.sub(r'^[a-z][a-z0-9+.-]*://', '', site.strip().lower())
+    if site.startswith('www.'):
+        site = site[4:]
+    return site.rstrip('/')
+
+
+def site_prefix_terms(name):
+    """The prefixes of a normalized site name and of its words that prefix lookups can find it by."""
+    return {"^" + text[:end]
+            for text in [name] + re.findall(r'[a-z0-9]+', name)
+            for end in range(1, min(len(text), SITE_PREFIX_MAX_LENGTH) + 1)}
+
+
+def site_matches(site, query):
+    """Whether a decrypted site matches a prefix query, the same way the index does."""
+    name, query = normalize_site(site), normalize_site(query)
+    return any(text.startswith(query) for text in [name] + re.findall(r'[a-z0-9]+', name))
+
+
+def decrypt_or_raw(value, master_password):
+    """Decrypt a value, or return it unchanged if it isn't encrypted with this key (e.g. a site from before sites were encrypted)."""
+    try:
+        return decrypt_password(value, master_password)
+    except Exception:
+        return value
+
+
+def looks_encrypted(value):
+    """Whether a value has the shape of a Fernet token (all current ones start with version byte 0x80 and a zero high timestamp)."""
+    return value.startswith("gAAAAA") and re.fullmatch(r'[A-Za-z0-9_-]+=*', value) is not None
+
+
+def content_hash(site, password, last_updated):
+    """
+    Hash of what sync compares: the stored site, encrypted password and date. Encrypting a
+    plaintext site keeps the row's hash (see Database.index_site_rows), since each copy of
+    a vault encrypts it differently.
+    """
+    return hashlib.sha256(f"{site}\0{password}\0{last_updated}".encode()).hexdigest()
+
+
+# Several windows, scripts or the agent may share one vault file. SQLite waits up to the
+# busy timeout for a lock; writes that still fail (e.g. a read transaction that cannot be
+# upgraded while another process writes) are retried with exponential backoff.
+BUSY_TIMEOUT_SECONDS = float(os.environ.get("PMRS_BUSY_TIMEOUT_SECONDS", 5))
+WRITE_RETRIES = 5
+RETRY_INITIAL_DELAY = 0.05  # seconds, doubled after each attempt
+
+
+def is_locked_error(error):
+    message = str(error).lower()
+    return "locked" in message or "busy" in message
+
+
+def retry_when_locked(method):
+    """
+    Re-run a Database write when another connection holds the lock. The failed attempt is
+    rolled back first, so a retry never repeats half a change. Inside batch() the error is
+    raised instead, since only the caller can restart the whole batch.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        delay = RETRY_INITIAL_DELAY
+        for attempt in range(WRITE_RETRIES + 1):
+            try:
+                return method(self, *args, **kwargs)
+            except sqlite3.OperationalError as e:
+                if self._batch_depth > 0 or attempt == WRITE_RETRIES or not is_locked_error(e):
+                    raise
+                self.conn.rollback()
+                time.sleep(delay + random.uniform(0, delay))  # Jitter so competing writers don't retry in step
+                delay *= 2
+    return wrapper
+
+
+# How often StatusRefresher re-buckets passwords as they age (override with PMRS_STATUS_REFRESH_SECONDS)
+DEFAULT_STATUS_REFRESH_SECONDS = 3600
+# How often HistoryCompactor prunes history and frees pages (override with PMRS_HISTORY_COMPACT_SECONDS)
+DEFAULT_HISTORY_COMPACT_SECONDS = 6 * 3600
+
+
+def age_cutoff(days):
+    """The last_updated value a password must be older than to be more than `days` old."""
+    return (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def status_cutoffs():
+    return {"recommended": age_cutoff(RECOMMENDED_AFTER_DAYS), "very_important": age_cutoff(VERY_IMPORTANT_AFTER_DAYS)}
+
 
 class Database:
-    def __init__(self):
-        self.db_name = 'password_manager.db'
-        self.conn = sqlite3.connect(self.db_name)
+    def __init__(self, db_name='password_manager.db'):
+        self.db_name = db_name
+        self.conn = sqlite3.connect(self.db_name, timeout=BUSY_TIMEOUT_SECONDS)
+        self._batch_depth = 0  # > 0 while inside batch(), commits are deferred until it ends
         self.create_tables()
 
-    def create_tables(self):
-        """Create the necessary tables if they don't already exist."""
-        cursor = self.conn.cursor()
+    def commit(self):
+        """Commit, unless a batch() is open (it commits once at the end)."""
+        if self._batch_depth == 0:
+            self.conn.commit()
 
-        # Users Table: Stores master password hash and backup key hash
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY,
-                master_password_hash TEXT NOT NULL,
-                backup_key_hash TEXT NOT NULL
-            )
-        ''')
+    @contextlib.contextmanager
+    def batch(self):
+        """
+        Group several writes into one transaction:
+            with db.batch():
+                db.add_password(...)
+                db.delete_password(...)
+        Everything is rolled back if an exception escapes the block.
+        """
+        self._batch_depth += 1
+        try:
+            yield self
+        except BaseException:
+            self._batch_depth -= 1
+            if self._batch_depth == 0:
+                self.conn.rollback()
+            raise
+        self._batch_depth -= 1
+        if self._batch_depth == 0:
+            self.conn.commit()
 
-        # Passwords Table: Stores site-specific passwords (what the user enters to it)
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS passwords (
-                id INTEGER PRIMARY KEY,
-                site TEXT NOT NULL,
-                password TEXT NOT NULL,
-                last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                status TEXT DEFAULT 'Active'
-            )
-        ''')
-        self.conn.commit()
+    @traced("db.create_tables")
+    def create_tables(self):
+        """
+        Bring the schema up to date (see migrations.py). Files that are already current cost
+        one PRAGMA read. Rewrites of existing rows are left to unlock, sync and the migrations
+        CLI, so opening a vault (on the Tk thread, or in every background connection) stays quick.
+        """
+        migrate(self.conn)
 
+    @traced("db.save_master_password")
+    @retry_when_locked
     def save_master_password(self, master_password, backup_key):
         """Save the master password and backup key hashes to the database."""
         cursor = self.conn.cursor()
@@ -51,8 +218,9 @@ class Database:
             VALUES (?, ?)
         """, (master_password_hash, backup_key_hash))
         
-        self.conn.commit()
+        self.commit()
 
+    @traced("db.verify_master_password")
     def verify_master_password(self, master_password):
         cursor = self.conn.cursor()
         master_password_hash = hashlib.sha256(master_password.encode()).hexdigest()
@@ -66,6 +234,7 @@ class Database:
             return result[0] == master_password_hash
         return False
 
+    @traced("db.verify_backup_key")
     def verify_backup_key(self, backup_key):
         cursor = self.conn.cursor()
         backup_key_hash = hashlib.sha256(backup_key.encode()).hexdigest()
@@ -83,8 +252,11 @@ class Database:
         """
         Generate a random 16-character alphanumeric backup key.
         """
-        return ''.join(random.choices(string.ascii_letters + string.digits, k=16))
+        policy = PasswordPolicy(length=16, classes=("uppercase", "lowercase", "digits"))
+        return generate_password(policy)
 
+    @traced("db.generate_new_backup_key")
+    @retry_when_locked
     def generate_new_backup_key(self):
         """
         Generate and save a new backup key for the user.
@@ -93,19 +265,48 @@ class Database:
         new_backup_key_hash = hash_password(new_backup_key)  # Hash the new backup key
         cursor = self.conn.cursor()
         cursor.execute("UPDATE users SET backup_key_hash = ? WHERE id = 1", (new_backup_key_hash,))
-        self.conn.commit()
+        self.commit()
         return new_backup_key
 
-    def add_password(self, site, password, master_password):
+    @traced("db.set_master_password")
+    @retry_when_locked
+    def set_master_password(self, new_password):
         """
-        Add a new password entry for a specific site.
+        Replace the master password hash (used after recovery with the backup key).
         """
+        master_password_hash = hash_password(new_password)
+        cursor = self.conn.cursor()
+        cursor.execute("UPDATE users SET master_password_hash = ? WHERE id = 1", (master_password_hash,))
+        self.commit()
+
+    @traced("db.add_password")
+    @retry_when_locked
+    def add_password(self, site, password, master_password, last_updated=None):
+        """
+        Add a new password entry for a specific site and return its ID.
+        last_updated: "YYYY-MM-DD HH:MM:SS" string, defaults to now
+        """
+        encrypted_site = encrypt_password(site, master_password)
         encrypted_password = encrypt_password(password, master_password)
+        site_index = blind_index("=" + normalize_site(site), master_password)
         cursor = self.conn.cursor()
-        cursor.execute('INSERT INTO passwords (site, password) VALUES (?, ?)',
-                      (site, encrypted_password))
-        self.conn.commit()
+        if last_updated:
+            cursor.execute('INSERT INTO passwords (site, password, last_updated, site_index) VALUES (?, ?, ?, ?)',
+                          (encrypted_site, encrypted_password, last_updated, site_index))
+        else:
+            cursor.execute('INSERT INTO passwords (site, password, site_index) VALUES (?, ?, ?)',
+                          (encrypted_site, encrypted_password, site_index))
+        password_id = cursor.lastrowid
+        cursor.executemany('INSERT INTO site_tokens (token, password_id) VALUES (?, ?)',
+                           self._site_tokens(password_id, site, master_password))
+        if last_updated:
+            # A back-dated entry may already be stale
+            cursor.execute(f'UPDATE passwords SET status = {STATUS_CASE} WHERE id = :id',
+                           dict(status_cutoffs(), id=password_id))
+        self.commit()
+        return password_id
 
+    @traced("db.get_all_passwords")
     def get_all_passwords(self, master_password):
         """
         Retrieve all password entries from the database and decrypt them.
@@ -114,36 +315,334 @@ class Database:
         cursor.execute('SELECT id, site, password, last_updated, status FROM passwords')
         results = cursor.fetchall()
         
-        # Decrypt passwords
-        decrypted_results = []
-        for row in results:
-            id_, site, encrypted_password, last_updated, status = row
-            try:
-                decrypted_password = decrypt_password(encrypted_password, master_password)
-                decrypted_results.append((id_, site, decrypted_password, last_updated, status))
-            except:
-                # If decryption fails, return the encrypted password
-                decrypted_results.append((id_, site, encrypted_password, last_updated, status))
-        
-        return decrypted_results
+        return [self._decrypt_row(row, master_password) for row in results]
+
+    def _decrypt_row(self, row, master_password):
+        # If decryption fails, the encrypted value is returned
+        id_, site, encrypted_password, last_updated, status = row
+        return (id_, decrypt_or_raw(site, master_password), decrypt_or_raw(encrypted_password, master_password),
+                last_updated, status)
+
+    def _site_tokens(self, password_id, site, master_password):
+        """The site_tokens rows of one entry."""
+        return [(blind_index(term, master_password), password_id) for term in site_prefix_terms(normalize_site(site))]
+
+    def _site_filter(self, query, master_password, exact=False):
+        """
+        A WHERE condition and its parameters matching entries by site through the blind index:
+        exact (normalized) names, or names in which the name or a word starts with `query`.
+        """
+        name = normalize_site(query)
+        if exact:
+            return 'site_index = ?', [blind_index("=" + name, master_password)]
+        if not name:
+            return '1', []
+        token = blind_index("^" + name[:SITE_PREFIX_MAX_LENGTH], master_password)
+        if len(name) <= SITE_PREFIX_MAX_LENGTH:
+            return 'id IN (SELECT password_id FROM site_tokens WHERE token = ?)', [token]
+        # Only the first SITE_PREFIX_MAX_LENGTH characters are indexed; check the few candidates' full names
+        cursor = self.conn.cursor()
+        cursor.execute('SELECT id, site FROM passwords WHERE id IN (SELECT password_id FROM site_tokens WHERE token = ?)',
+                       (token,))
+        ids = [id_ for id_, site in cursor.fetchall() if site_matches(decrypt_or_raw(site, master_password), name)]
+        return f"id IN ({', '.join('?' * len(ids))})", ids
+
+    @traced("db.get_password")
+    def get_password(self, password_id, master_password):
+        """
+        Retrieve and decrypt a single password entry, or None if it does not exist.
+        """
+        cursor = self.conn.cursor()
+        cursor.execute('SELECT id, site, password, last_updated, status FROM passwords WHERE id = ?', (password_id,))
+        row = cursor.fetchone()
+        return self._decrypt_row(row, master_password) if row else None
 
+    @traced("db.search_passwords")
+    def search_passwords(self, query, master_password, exact=False):
+        """
+        Retrieve and decrypt the entries whose site, or a word in it, starts with `query`
+        (case-insensitive), or whose site is `query` if exact. Found through the blind index,
+        so only the matching entries are decrypted.
+        """
+        where, params = self._site_filter(query, master_password, exact)
+        cursor = self.conn.cursor()
+        cursor.execute(f'SELECT id, site, password, last_updated, status FROM passwords WHERE {where}', params)
+        return [self._decrypt_row(row, master_password) for row in cursor.fetchall()]
+
+    @traced("db.index_site_rows")
+    @retry_when_locked
+    def index_site_rows(self, rows, master_password):
+        """
+        Encrypt and index the sites of (id, stored site) rows without a site_index, in one
+        transaction: rows from before sites were encrypted, and rows sync copied in.
+        """
+        # Rows without a site_index have no tokens (the trigger drops them along with the index)
+        cursor = self.conn.cursor()
+        tokens = []
+        for id_, stored_site in rows:
+            site = decrypt_or_raw(stored_site, master_password)
+            site_index = blind_index("=" + normalize_site(site), master_password)
+            if site is stored_site and not looks_encrypted(stored_site):
+                # A plaintext site. Fernet ciphertexts are random, so every copy of the vault
+                # encrypts it differently: keep the hash of the plaintext row and its change time,
+                # or sync would see every row as changed on both sides. Setting mod_counter keeps
+                # the sync trigger from stamping a new change.
+                password, last_updated, old_hash = cursor.execute(
+                    'SELECT password, last_updated, content_hash FROM passwords WHERE id = ?', (id_,)).fetchone()
+                cursor.execute(f'UPDATE passwords SET site = ?, site_index = ?, content_hash = ?, '
+                               f'mod_counter = {NEXT_MOD_COUNTER} WHERE id = ?',
+                               (encrypt_password(site, master_password), site_index,
+                                old_hash or content_hash(stored_site, password, last_updated), id_))
+            else:
+                cursor.execute('UPDATE passwords SET site_index = ? WHERE id = ?', (site_index, id_))
+            tokens.extend(self._site_tokens(id_, site, master_password))
+        cursor.executemany('INSERT OR IGNORE INTO site_tokens (token, password_id) VALUES (?, ?)', tokens)
+        self.commit()
+
+    @traced("db.list_page")
+    def list_page(self, master_password, sort="id", descending=False, site=None, status=None,
+                  older_than_days=None, after=None, limit=PAGE_SIZE):
+        """
+        One page of entries, sorted and filtered in SQL. Only the rows on the page are decrypted.
+        sort: "id" or "last_updated"
+        site: Only sites whose name, or a word in it, starts with this text (case-insensitive)
+        status: Only entries with this status
+        older_than_days: Only entries not updated for more than this many days
+        after: The cursor returned with the previous page. Pages are fetched by seeking past the
+               last (sort value, id) seen instead of with OFFSET, so deep pages cost the same as the first.
+        Returns (entries, cursor), where cursor is None on the last page.
+        """
+        if sort not in SORT_COLUMNS:
+            raise ValueError(f"Cannot sort by {sort!r}; choose from {', '.join(SORT_COLUMNS)}")
+        collation = SORT_COLUMNS[sort]
+        where, params = [], []
+        if site:
+            site_where, site_params = self._site_filter(site, master_password)
+            where.append(site_where)
+            params.extend(site_params)
+        if status:
+            where.append("status = ?")
+            params.append(status)
+        if older_than_days is not None:
+            where.append("last_updated < ?")
+            params.append(age_cutoff(older_than_days))
+        if after is not None:
+            op = "<" if descending else ">"
+            if sort == "id":
+                where.append(f"id {op} ?")
+                params.append(after[1])
+            else:
+                # The collation goes on the parameter: SQLite only seeks the index for a bare column
+                where.append(f"({sort}, id) {op} (?{collation}, ?)")
+                params.extend(after)
+
+        direction = "DESC" if descending else "ASC"
+        order = f"id {direction}" if sort == "id" else f"{sort}{collation} {direction}, id {direction}"
+        query = 'SELECT id, site, password, last_updated, status FROM passwords'
+        if where:
+            query += ' WHERE ' + ' AND '.join(where)
+        query += f' ORDER BY {order} LIMIT ?'
+        params.append(limit + 1)  # One extra row tells us whether there is a next page
+
+        cursor = self.conn.cursor()
+        cursor.execute(query, params)
+        rows = cursor.fetchall()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = (rows[-1][SORT_ROW_INDEX[sort]], rows[-1][0])
+        return [self._decrypt_row(row, master_password) for row in rows], next_cursor
+
+    @traced("db.delete_password")
+    @retry_when_locked
     def delete_password(self, password_id):
         """
         Delete a password entry by its ID.
         """
         cursor = self.conn.cursor()
         cursor.execute('DELETE FROM passwords WHERE id = ?', (password_id,))
-        self.conn.commit()
+        self.commit()
 
+    @traced("db.update_password")
+    @retry_when_locked
     def update_password(self, password_id, new_password, master_password):
         """
         Update a password entry by its ID.
         """
         encrypted_password = encrypt_password(new_password, master_password)
         cursor = self.conn.cursor()
-        cursor.execute('UPDATE passwords SET password = ?, last_updated = CURRENT_TIMESTAMP WHERE id = ?',
-                      (encrypted_password, password_id))
+        cursor.execute('UPDATE passwords SET password = ?, last_updated = CURRENT_TIMESTAMP, status = ? WHERE id = ?',
+                      (encrypted_password, STATUS_ACTIVE, password_id))
+        self.commit()
+
+    @traced("db.refresh_statuses")
+    @retry_when_locked
+    def refresh_statuses(self):
+        """
+        Re-bucket every password by age in one UPDATE and return how many changed.
+        Only rows whose bucket actually changed are written. They get a new mod_counter (so
+        open vault windows show the new status) but keep modified_at, which sync compares.
+        """
+        cursor = self.conn.cursor()
+        cursor.execute(f'UPDATE passwords SET status = {STATUS_CASE}, mod_counter = {NEXT_MOD_COUNTER} '
+                       f'WHERE status IS NOT {STATUS_CASE}', status_cutoffs())
+        self.commit()
+        return cursor.rowcount
+
+    @traced("db.count_by_status")
+    def count_by_status(self):
+        """
+        Number of passwords in each status, e.g. {"Active": 12, "Recommended to Update": 3}.
+        Reads the stored status, so nothing is decrypted.
+        """
+        cursor = self.conn.cursor()
+        cursor.execute('SELECT status, COUNT(*) FROM passwords GROUP BY status')
+        return dict(cursor.fetchall())
+
+    @traced("db.list_stale")
+    def list_stale(self, master_password, threshold_days=RECOMMENDED_AFTER_DAYS, limit=None):
+        """
+        Retrieve and decrypt the entries not updated for more than `threshold_days`, oldest first.
+        Only the matching rows are read (through the last_updated index) and decrypted.
+        """
+        return [self._decrypt_row(row, master_password) for row in self.stale_rows(threshold_days, limit)]
+
+    def stale_rows(self, threshold_days=RECOMMENDED_AFTER_DAYS, limit=None):
+        """Like list_stale, but the passwords are left encrypted."""
+        cursor = self.conn.cursor()
+        cursor.execute('SELECT id, site, password, last_updated, status FROM passwords '
+                       'WHERE last_updated < ? ORDER BY last_updated LIMIT ?',
+                       (age_cutoff(threshold_days), -1 if limit is None else limit))
+        return cursor.fetchall()
+
+    @traced("db.replace_passwords")
+    @retry_when_locked
+    def replace_passwords(self, changes):
+        """
+        Swap encrypted passwords in one transaction and mark them updated now.
+        changes: (password_id, expected_encrypted, new_encrypted) tuples. A row is only changed
+                 if it still holds expected_encrypted; otherwise nothing is written and
+                 ValueError is raised.
+        """
+        changes = list(changes)
+        with self.batch():
+            cursor = self.conn.cursor()
+            cursor.executemany('UPDATE passwords SET password = ?, last_updated = CURRENT_TIMESTAMP, status = ? '
+                               'WHERE id = ? AND password = ?',
+                               [(new, STATUS_ACTIVE, id_, expected) for id_, expected, new in changes])
+            if cursor.rowcount != len(changes):
+                raise ValueError(f"{len(changes) - cursor.rowcount} entries changed since the preview; nothing was updated")
+
+    @traced("db.restore_passwords")
+    @retry_when_locked
+    def restore_passwords(self, rows):
+        """
+        Put back earlier versions of entries in one transaction (used to undo a rotation).
+        rows: (password_id, expected_encrypted, encrypted, last_updated, status) tuples, with the
+              same all-or-nothing check as replace_passwords.
+        """
+        rows = list(rows)
+        with self.batch():
+            cursor = self.conn.cursor()
+            cursor.executemany('UPDATE passwords SET password = ?, last_updated = ?, status = ? '
+                               'WHERE id = ? AND password = ?',
+                               [(encrypted, last_updated, status, id_, expected)
+                                for id_, expected, encrypted, last_updated, status in rows])
+            if cursor.rowcount != len(rows):
+                raise ValueError(f"{len(rows) - cursor.rowcount} entries changed since the rotation; nothing was restored")
+
+    @traced("db.password_history")
+    def password_history(self, password_id, master_password, limit=None):
+        """
+        An entry's previous passwords, newest first, as (history_id, password, last_updated,
+        replaced_at) tuples. Read through the (password_id, id) index; only these rows are decrypted.
+        """
+        cursor = self.conn.cursor()
+        cursor.execute('SELECT id, password, last_updated, replaced_at FROM password_history '
+                       'WHERE password_id = ? ORDER BY id DESC LIMIT ?',
+                       (password_id, -1 if limit is None else limit))
+        history = []
+        for history_id, encrypted_password, last_updated, replaced_at in cursor.fetchall():
+            try:
+                password = decrypt_password(encrypted_password, master_password)
+            except Exception:
+                password = encrypted_password
+            history.append((history_id, password, last_updated, replaced_at))
+        return history
+
+    @traced("db.prune_history")
+    def prune_history(self, keep_versions=None, max_age_days=None, batch_size=HISTORY_PRUNE_BATCH):
+        """
+        Delete history beyond the newest `keep_versions` of each entry, or older than
+        `max_age_days` (0 disables either limit). The rows are found in one pass and deleted
+        `batch_size` at a time, each batch in its own short transaction. Returns the number deleted.
+        """
+        keep_versions = HISTORY_KEEP_VERSIONS if keep_versions is None else keep_versions
+        max_age_days = HISTORY_MAX_AGE_DAYS if max_age_days is None else max_age_days
+        if not keep_versions and not max_age_days:
+            return 0
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            SELECT id FROM (
+                SELECT id, replaced_at, ROW_NUMBER() OVER (PARTITION BY password_id ORDER BY id DESC) AS version
+                FROM password_history
+            )
+            WHERE (:keep > 0 AND version > :keep) OR (:cutoff IS NOT NULL AND replaced_at < :cutoff)
+        ''', {"keep": keep_versions, "cutoff": age_cutoff(max_age_days) if max_age_days else None})
+        ids = [row[0] for row in cursor.fetchall()]
+        for start in range(0, len(ids), batch_size):
+            self._delete_history(ids[start:start + batch_size])
+        return len(ids)
+
+    @retry_when_locked
+    def _delete_history(self, ids):
+        self.conn.executemany('DELETE FROM password_history WHERE id = ?', [(id_,) for id_ in ids])
+        self.commit()
+
+    def enable_incremental_vacuum(self):
+        """
+        Switch a vault created before history existed to incremental auto-vacuum. This
+        rewrites the whole file once (VACUUM) under an exclusive lock, so it is only run as
+        an explicit maintenance step (python migrations.py --run), never in the background.
+        Returns False if it was already enabled.
+        """
+        if self.conn.execute('PRAGMA auto_vacuum').fetchone()[0] == 2:
+            return False
         self.conn.commit()
+        self.conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+        self.conn.execute('VACUUM')
+        return True
+
+    @traced("db.incremental_vacuum")
+    def incremental_vacuum(self, pages_per_step=VACUUM_PAGES_PER_STEP):
+        """Return the file's free pages to the file system a step at a time. Returns the pages freed."""
+        freed = 0
+        while True:
+            free_pages = self.conn.execute('PRAGMA freelist_count').fetchone()[0]
+            if free_pages == 0:
+                return freed
+            self.conn.execute(f'PRAGMA incremental_vacuum({min(free_pages, int(pages_per_step))})').fetchall()
+            self.commit()
+            remaining = self.conn.execute('PRAGMA freelist_count').fetchone()[0]
+            if remaining >= free_pages:
+                return freed  # auto_vacuum is off, nothing can be freed
+            freed += free_pages - remaining
+
+    def data_version(self):
+        """Changes whenever another connection commits to this file (see ChangeWatcher)."""
+        return self.conn.execute('PRAGMA data_version').fetchone()[0]
+
+    def max_mod_counter(self):
+        """The mod_counter of the latest change (including deletions) to this file."""
+        return self.conn.execute(f'SELECT {NEXT_MOD_COUNTER} - 1').fetchone()[0]
+
+    def changed_ids_since(self, counter):
+        """IDs of the entries changed after mod_counter `counter`, found through the mod_counter index."""
+        return [row[0] for row in self.conn.execute('SELECT id FROM passwords WHERE mod_counter > ?', (counter,))]
+
+    def deleted_since(self, counter):
+        """Number of entries deleted after mod_counter `counter`."""
+        return self.conn.execute('SELECT COUNT(*) FROM tombstones WHERE mod_counter > ?', (counter,)).fetchone()[0]
 
     def get_backup_key(self):
         cursor = self.conn.cursor()
@@ -155,4 +654,81 @@ class Database:
         """
         Close the database connection.
         """
-        self.conn.close()
\ No newline at end of file
+        self.conn.close()
+
+
+class StatusRefresher:
+    """
+    Keeps passwords.status current while the app runs, so statuses roll over to
+    "Recommended to Update" and "Very Important to Update" as entries age.
+    Runs refresh_statuses() on a daemon thread with its own connection.
+    """
+
+    def __init__(self, db_name='password_manager.db', interval=None):
+        self.db_name = db_name
+        self.interval = float(interval if interval is not None else
+                              os.environ.get("PMRS_STATUS_REFRESH_SECONDS", DEFAULT_STATUS_REFRESH_SECONDS))
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="status-refresher", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        # sqlite connections can't be shared between threads
+        db = Database(self.db_name)
+        try:
+            while True:
+                try:
+                    db.refresh_statuses()
+                except sqlite3.Error as e:
+                    logger.warning("Status refresh failed: %s", e)
+                if self._stop.wait(self.interval):
+                    break
+        finally:
+            db.close()
+
+
+class HistoryCompactor:
+    """
+    Keeps password_history within its retention while the app runs: prunes it in small
+    batches, then returns the freed pages to the file system with incremental vacuum.
+    Runs on a daemon thread with its own connection, like StatusRefresher.
+    Vaults created before incremental auto-vacuum only get the pruning (the freed pages are
+    reused) until `python migrations.py --run` converts them.
+    """
+
+    def __init__(self, db_name='password_manager.db', interval=None):
+        self.db_name = db_name
+        self.interval = float(interval if interval is not None else
+                              os.environ.get("PMRS_HISTORY_COMPACT_SECONDS", DEFAULT_HISTORY_COMPACT_SECONDS))
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="history-compactor", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        # sqlite connections can't be shared between threads
+        db = Database(self.db_name)
+        try:
+            while True:
+                try:
+                    if db.prune_history():
+                        db.incremental_vacuum()
+                except sqlite3.Error as e:
+                    logger.warning("History compaction failed: %s", e)
+                if self._stop.wait(self.interval):
+                    break
+        finally:
+            db.close()
\ No newline at end of file
@@ -0,0 +1,187 @@
+"""
+Cryptographically secure password generation.
+
+Passwords are drawn from os.urandom in bulk. Each password needs one "digit" per
+character plus the shuffle positions, so all of them are packed into a single mixed-radix
+number: one random integer is scaled onto [0, N) and then split back into digits. There
+are no rejection loops, and with 64 spare random bits the distance from a perfectly
+uniform draw is below 2^-64.
+
+Every required character class gets one guaranteed slot before the shuffle, so class
+coverage holds by construction instead of by retrying.
+"""
+
+import argparse
+import math
+import os
+import string
+import sys
+import time
+
+from tracing import traced
+
+CHARACTER_CLASSES = {
+    "uppercase": string.ascii_uppercase,
+    "lowercase": string.ascii_lowercase,
+    "digits": string.digits,
+    "special": string.punctuation,
+}
+
+# Characters that are easy to confuse when read or typed by hand
+LOOK_ALIKES = "Il1|O0o`'\""
+
+# Extra random bits drawn per password to keep the index mapping (near) unbiased
+SPARE_BITS = 64
+
+
+class PasswordPolicy:
+    """
+    Rules a generated password must follow.
+    length: Number of characters
+    classes: Character classes that must each appear at least once
+    exclude_look_alikes: Drop characters such as l, 1, O and 0
+    min_entropy: Minimum entropy in bits, checked when the policy is created
+    """
+
+    def __init__(self, length=12, classes=("uppercase", "lowercase", "digits", "special"),
+                 exclude_look_alikes=False, min_entropy=0):
+        self.length = length
+        self.classes = tuple(classes)
+        self.exclude_look_alikes = exclude_look_alikes
+        self.min_entropy = min_entropy
+
+        if not self.classes:
+            raise ValueError("Please select at least one character type for password generation.")
+        if self.length < len(self.classes):
+            raise ValueError(f"Password length must be at least {len(self.classes)} to include every selected character type.")
+
+        # Alphabet for each required class, and the combined pool for the free slots
+        self.class_alphabets = []
+        for name in self.classes:
+            if name not in CHARACTER_CLASSES:
+                raise ValueError(f"Unknown character class: {name}")
+            alphabet = CHARACTER_CLASSES[name]
+            if exclude_look_alikes:
+                alphabet = "".join(c for c in alphabet if c not in LOOK_ALIKES)
+            self.class_alphabets.append(alphabet)
+        self.pool = "".join(self.class_alphabets)
+
+        # Radix of every digit packed into one random number:
+        # required slots, free slots, then the Fisher-Yates shuffle positions
+        self.radices = [len(a) for a in self.class_alphabets]
+        self.radices += [len(self.pool)] * (self.length - len(self.classes))
+        self.radices += list(range(self.length, 1, -1))
+        self.combinations = math.prod(self.radices)
+        self.random_bits = self.combinations.bit_length() + SPARE_BITS
+        self.random_bytes = (self.random_bits + 7) // 8
+
+        if self.entropy_bits < self.min_entropy:
+            raise ValueError(
+                f"Policy gives {self.entropy_bits:.1f} bits of entropy, "
+                f"below the required {self.min_entropy} bits. Increase the length or add character types."
+            )
+
+    @property
+    def entropy_bits(self):
+        """
+        Entropy of the characters chosen (a lower bound: the shuffle is not counted).
+        """
+        bits = sum(math.log2(len(a)) for a in self.class_alphabets)
+        bits += (self.length - len(self.classes)) * math.log2(len(self.pool))
+        return bits
+
+    def _build(self, value):
+        """Turn a number in [0, combinations) into a password."""
+        chars = []
+        for alphabet in self.class_alphabets:
+            value, index = divmod(value, len(alphabet))
+            chars.append(alphabet[index])
+        pool = self.pool
+        pool_size = len(pool)
+        for _ in range(self.length - len(self.classes)):
+            value, index = divmod(value, pool_size)
+            chars.append(pool[index])
+        # Fisher-Yates shuffle so the guaranteed characters can land anywhere
+        for i in range(self.length - 1, 0, -1):
+            value, j = divmod(value, i + 1)
+            chars[i], chars[j] = chars[j], chars[i]
+        return "".join(chars)
+
+    def _from_random_bytes(self, chunk):
+        # Scale a uniform random integer onto [0, combinations) (multiply-shift, no rejection)
+        value = (int.from_bytes(chunk, "big") * self.combinations) >> (self.random_bytes * 8)
+        return self._build(value)
+
+
+def generate_password(policy):
+    """Generate a single password for the UI."""
+    return policy._from_random_bytes(os.urandom(policy.random_bytes))
+
+
+@traced("generator.generate_batch")
+def generate_batch(policy, count):
+    """Generate many passwords from one os.urandom call."""
+    size = policy.random_bytes
+    data = os.urandom(size * count)
+    build = policy._from_random_bytes
+    return [build(data[i:i + size]) for i in range(0, size * count, size)]
+
+
+def stream_to_file(policy, count, path, batch_size=10000):
+    """
+    Write `count` passwords to a file, one per line, without holding them all in memory.
+    """
+    written = 0
+    with open(path, "w", encoding="utf-8") as f:
+        while written < count:
+            batch = generate_batch(policy, min(batch_size, count - written))
+            f.write("\n".join(batch))
+            f.write("\n")
+            written += len(batch)
+    return written
+
+
+def benchmark(policy, count=100000, batch_size=10000):
+    """Time bulk generation and return passwords per second."""
+    start = time.perf_counter()
+    generated = 0
+    while generated < count:
+        generated += len(generate_batch(policy, min(batch_size, count - generated)))
+    elapsed = time.perf_counter() - start
+    return generated / elapsed if elapsed else float("inf")
+
+
+# Bulk generation from the command line
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate passwords in bulk with a CSPRNG")
+    parser.add_argument("--length", type=int, default=16)
+    parser.add_argument("--classes", default="uppercase,lowercase,digits,special",
+                        help="Comma separated list of: " + ", ".join(CHARACTER_CLASSES))
+    parser.add_argument("--exclude-look-alikes", action="store_true")
+    parser.add_argument("--min-entropy", type=float, default=0)
+    parser.add_argument("--count", type=int, default=1)
+    parser.add_argument("--output", help="File to stream passwords to (prints to stdout if omitted)")
+    parser.add_argument("--benchmark", action="store_true", help="Measure throughput instead of writing passwords")
+    args = parser.parse_args()
+
+    try:
+        policy = PasswordPolicy(
+            length=args.length,
+            classes=[c.strip() for c in args.classes.split(",") if c.strip()],
+            exclude_look_alikes=args.exclude_look_alikes,
+            min_entropy=args.min_entropy,
+        )
+    except ValueError as e:
+        parser.error(str(e))
+
+    # stderr, so `--count N > list.txt` holds only passwords
+    print(f"Policy entropy: {policy.entropy_bits:.1f} bits", file=sys.stderr)
+    if args.benchmark:
+        rate = benchmark(policy, max(args.count, 100000))
+        print(f"Generated {rate:,.0f} passwords/second")
+    elif args.output:
+        written = stream_to_file(policy, args.count, args.output)
+        print(f"Wrote {written} passwords to {args.output}")
+    else:
+        for password in generate_batch(policy, args.count):
+            print(password)
@@ -1,6 +1,7 @@
 import customtkinter as ctk
-from database import Database
+from profiles import ProfileManager
 from timeout_manager import TimeoutManager
+from screen_router import ScreenRouter
 
 # Set appearance mode (Light, Dark, or System)
 ctk.set_appearance_mode("System")  # Default set to System
@@ -16,22 +17,27 @@ def main():
     timeout_manager = TimeoutManager()
     timeout_manager.set_root(root)
     timeout_manager.start_timeout_check()
+
+    # The router builds, caches and switches between screens
+    router = ScreenRouter()
+    router.set_root(root)
     
-    db = Database()
-    
-    # Check if first run (first time user)
-    cursor = db.conn.cursor()
-    cursor.execute("SELECT COUNT(*) FROM users")
-    user_count = cursor.fetchone()[0]
-    
-    if user_count == 0:
-        from screens.consent_screen import ConsentScreen
-        screen = ConsentScreen(root)
-        timeout_manager.set_current_screen(screen)
+    # Each profile is a separate vault; its database is opened when the profile is first used
+    profiles = ProfileManager()
+    profiles.refresh_statuses = True  # Keep password age statuses current while the app is open
+
+    if len(profiles.registry.names()) > 1:
+        router.show("profiles")
     else:
-        from screens.login_screen import LoginScreen
-        screen = LoginScreen(root)
-        timeout_manager.set_current_screen(screen)
+        # Check if first run (first time user)
+        cursor = profiles.database().conn.cursor()
+        cursor.execute("SELECT COUNT(*) FROM users")
+        user_count = cursor.fetchone()[0]
+
+        if user_count == 0:
+            router.show("consent")
+        else:
+            router.show("login")
     
     root.mainloop()
 
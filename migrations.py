@@ -0,0 +1,419 @@
+"""
+Schema migrations for vault databases.
+
+The schema version is kept in PRAGMA user_version. A file is brought up to date in two
+steps:
+
+1. Schema migrations (SCHEMA_MIGRATIONS), in order, run by Database() on every open. Each one runs in its own transaction
+   together with the user_version bump, so a file is always at exactly one version. They
+   only change the schema (tables, columns, indexes, triggers) and are idempotent, so a
+   file from before versioning (user_version 0) simply runs them all.
+2. Data migrations (DATA_MIGRATIONS), rewrites of existing rows. They run `batch_size`
+   rows per transaction, so a large vault is never locked for long and an interrupted
+   upgrade resumes where it stopped: each one finds its remaining rows by a marker (e.g.
+   a NULL column), not by a version. They run at unlock (on the login worker, reporting
+   their progress), before a sync (the ones that don't need the key) and with --run below,
+   never when a file is merely opened.
+
+To change the format, append a schema migration (and, if existing rows must be
+rewritten, a data migration that the new schema can recognize). Never edit one that has
+shipped: files already past its version won't run it again.
+
+    python migrations.py                     (status of password_manager.db)
+    python migrations.py --profile Team --run
+
+--run also switches vaults created before history to incremental auto-vacuum, which
+rewrites the whole file once, so it is best done with the app closed.
+"""
+
+import argparse
+import getpass
+import hashlib
+import os
+import sqlite3
+import sys
+
+MIGRATION_BATCH_SIZE = 500  # Rows rewritten per transaction
+
+# Sync bookkeeping (see sync.py). Every row has a stable uuid, the file-local counter of its
+# last change, when it was last changed, and a hash of its content (NULL until sync needs it).
+# Deleted rows leave a tombstone. Rows are grouped into 4096 buckets by the first three hex
+# digits of their uuid; a bucket's cached hash is dropped whenever one of its rows changes.
+SYNC_BUCKET_DIGITS = 3
+NEXT_MOD_COUNTER = '''(
+    SELECT COALESCE(MAX(counter), 0) + 1 FROM (
+        SELECT MAX(mod_counter) AS counter FROM passwords
+        UNION ALL SELECT MAX(mod_counter) FROM tombstones
+    )
+)'''
+NOW_PRECISE = "strftime('%Y-%m-%d %H:%M:%f', 'now')"
+SYNC_COLUMNS = {
+    "uuid": "TEXT",
+    "mod_counter": "INTEGER",
+    "modified_at": "TEXT",
+    "content_hash": "TEXT",
+}
+# Writers that set mod_counter themselves (sync) skip the triggers
+SYNC_TRIGGERS = [
+    f'''
+    CREATE TRIGGER IF NOT EXISTS passwords_sync_insert AFTER INSERT ON passwords
+    WHEN NEW.mod_counter IS NULL
+    BEGIN
+        UPDATE passwords SET
+            uuid = COALESCE(NEW.uuid, lower(hex(randomblob(16)))),
+            mod_counter = {NEXT_MOD_COUNTER},
+            modified_at = {NOW_PRECISE},
+            content_hash = NULL
+        WHERE id = NEW.id;
+        DELETE FROM sync_buckets WHERE bucket = (SELECT substr(uuid, 1, {SYNC_BUCKET_DIGITS}) FROM passwords WHERE id = NEW.id);
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS passwords_sync_update AFTER UPDATE OF site, password, last_updated ON passwords
+    WHEN NEW.mod_counter IS OLD.mod_counter
+    BEGIN
+        UPDATE passwords SET
+            mod_counter = {NEXT_MOD_COUNTER},
+            modified_at = {NOW_PRECISE},
+            content_hash = NULL
+        WHERE id = NEW.id;
+        DELETE FROM sync_buckets WHERE bucket = substr(NEW.uuid, 1, {SYNC_BUCKET_DIGITS});
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS passwords_sync_delete AFTER DELETE ON passwords
+    WHEN OLD.uuid IS NOT NULL
+    BEGIN
+        INSERT OR REPLACE INTO tombstones (uuid, mod_counter, deleted_at)
+        VALUES (OLD.uuid, {NEXT_MOD_COUNTER}, {NOW_PRECISE});
+        DELETE FROM sync_buckets WHERE bucket = substr(OLD.uuid, 1, {SYNC_BUCKET_DIGITS});
+    END
+    ''',
+]
+
+# Keep the password an update overwrites, in the same transaction (see HistoryCompactor)
+HISTORY_TRIGGERS = [
+    f'''
+    CREATE TRIGGER IF NOT EXISTS passwords_history_update AFTER UPDATE OF password ON passwords
+    WHEN NEW.password IS NOT OLD.password
+    BEGIN
+        INSERT INTO password_history (password_id, password, last_updated, replaced_at)
+        VALUES (OLD.id, OLD.password, OLD.last_updated, {NOW_PRECISE});
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS passwords_history_delete AFTER DELETE ON passwords
+    BEGIN
+        DELETE FROM password_history WHERE password_id = OLD.id;
+    END
+    ''',
+]
+
+# A site changed without a new site_index (sync copies encrypted sites as they are) is
+# unindexed again, and picked up by the site encryption data migration at the next unlock
+SITE_INDEX_TRIGGERS = [
+    '''
+    CREATE TRIGGER IF NOT EXISTS passwords_site_index_update AFTER UPDATE OF site ON passwords
+    WHEN NEW.site_index IS OLD.site_index AND NEW.site IS NOT OLD.site
+    BEGIN
+        UPDATE passwords SET site_index = NULL WHERE id = NEW.id;
+        DELETE FROM site_tokens WHERE password_id = NEW.id;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS passwords_site_index_delete AFTER DELETE ON passwords
+    BEGIN
+        DELETE FROM site_tokens WHERE password_id = OLD.id;
+    END
+    ''',
+]
+
+
+def add_missing_columns(cursor, table, columns):
+    """ALTER TABLE ... ADD COLUMN for each of `columns` (name -> type) the table doesn't have yet."""
+    existing = {row[1] for row in cursor.execute(f'PRAGMA table_info({table})')}
+    for column, column_type in columns.items():
+        if column not in existing:
+            cursor.execute(f'ALTER TABLE {table} ADD COLUMN {column} {column_type}')
+
+
+# --- schema migrations ---
+
+def create_vault_tables(cursor):
+    # Users Table: Stores master password hash and backup key hash
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY,
+            master_password_hash TEXT NOT NULL,
+            backup_key_hash TEXT NOT NULL
+        )
+    ''')
+
+    # Passwords Table: Stores site-specific passwords (what the user enters to it)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS passwords (
+            id INTEGER PRIMARY KEY,
+            site TEXT NOT NULL,
+            password TEXT NOT NULL,
+            last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            status TEXT DEFAULT 'Active'
+        )
+    ''')
+
+
+def create_list_indexes(cursor):
+    # Age queries, and sorting and filtering the vault list (see Database.list_page)
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_passwords_last_updated ON passwords(last_updated)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_passwords_status_last_updated ON passwords(status, last_updated)')
+
+
+def create_sync_tables(cursor):
+    # Rows from before sync get their uuids from the legacy uuid data migration
+    add_missing_columns(cursor, 'passwords', SYNC_COLUMNS)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS tombstones (
+            uuid TEXT PRIMARY KEY,
+            mod_counter INTEGER NOT NULL,
+            deleted_at TEXT NOT NULL
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS sync_buckets (
+            bucket TEXT PRIMARY KEY,
+            hash TEXT NOT NULL
+        )
+    ''')
+    cursor.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_passwords_uuid ON passwords(uuid)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_passwords_mod_counter ON passwords(mod_counter)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_tombstones_mod_counter ON tombstones(mod_counter)')
+    for trigger in SYNC_TRIGGERS:
+        cursor.execute(trigger)
+
+
+def create_history_table(cursor):
+    # Previous passwords of each entry, newest last
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS password_history (
+            id INTEGER PRIMARY KEY,
+            password_id INTEGER NOT NULL,
+            password TEXT NOT NULL,
+            last_updated TIMESTAMP,
+            replaced_at TEXT NOT NULL
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_password_history_entry ON password_history(password_id, id)')
+    for trigger in HISTORY_TRIGGERS:
+        cursor.execute(trigger)
+
+
+def create_site_index_tables(cursor):
+    # Blind index of the encrypted sites; existing sites are encrypted by a data migration
+    add_missing_columns(cursor, 'passwords', {'site_index': 'TEXT'})
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS site_tokens (
+            token TEXT NOT NULL,
+            password_id INTEGER NOT NULL,
+            PRIMARY KEY (token, password_id)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_site_tokens_password_id ON site_tokens(password_id)')
+    # Also finds the rows still to be encrypted and indexed (site_index IS NULL)
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_passwords_site_index ON passwords(site_index)')
+    # Plaintext site indexes from before sites were encrypted
+    cursor.execute('DROP INDEX IF EXISTS idx_passwords_site')
+    cursor.execute('DROP INDEX IF EXISTS idx_passwords_status_site')
+    for trigger in SITE_INDEX_TRIGGERS:
+        cursor.execute(trigger)
+
+
+# (version, description, migration). Append only; versions must increase by one.
+SCHEMA_MIGRATIONS = [
+    (1, "vault tables", create_vault_tables),
+    (2, "list indexes", create_list_indexes),
+    (3, "sync bookkeeping", create_sync_tables),
+    (4, "password history", create_history_table),
+    (5, "encrypted site index", create_site_index_tables),
+]
+SCHEMA_VERSION = SCHEMA_MIGRATIONS[-1][0]
+
+
+def schema_version(conn):
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+def migrate(conn):
+    """
+    Run the schema migrations `conn`'s file hasn't had yet. Returns the versions applied.
+    Each migration takes the write lock first (BEGIN IMMEDIATE) and re-reads the version,
+    so two processes opening the same old file don't both apply it.
+    """
+    version = schema_version(conn)
+    if version > SCHEMA_VERSION:
+        raise ValueError(f"This vault uses schema version {version}, newer than this app supports "
+                         f"({SCHEMA_VERSION}). Update the app to open it.")
+    if version == SCHEMA_VERSION:
+        return []
+    if version == 0:
+        # Lets HistoryCompactor hand freed pages back to the file system. Only takes effect
+        # on a new file; older vaults are converted by `python migrations.py --run`
+        conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+    conn.commit()
+    applied = []
+    for target, description, migration in SCHEMA_MIGRATIONS:
+        if target <= version:
+            continue
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            if schema_version(conn) < target:
+                migration(conn.cursor())
+                conn.execute(f'PRAGMA user_version = {target}')
+                applied.append(target)
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+    return applied
+
+
+# --- data migrations ---
+
+class DataMigration:
+    """
+    A rewrite of existing rows, done a batch at a time.
+    pending(db): number of rows still to rewrite
+    run_batch(db, batch_size, master_password): rewrite up to batch_size of them in one
+        transaction and return how many were done (0 once finished)
+    needs_key: only runs when given the master password (i.e. at unlock)
+    """
+
+    def __init__(self, name, pending, run_batch, needs_key=False):
+        self.name = name
+        self.pending = pending
+        self.run_batch = run_batch
+        self.needs_key = needs_key
+
+
+def legacy_uuid(id_, site, password):
+    """
+    uuid for a row created before sync existed. Derived from the row itself, so copies
+    of the same vault file give their shared rows the same uuid.
+    """
+    return hashlib.sha256(f"{id_}\0{site}\0{password}".encode()).hexdigest()[:32]
+
+
+def count_legacy_uuids(db):
+    return db.conn.execute('SELECT COUNT(*) FROM passwords WHERE uuid IS NULL').fetchone()[0]
+
+
+def backfill_legacy_uuids(db, batch_size, master_password=None):
+    """Give rows from before sync existed their bookkeeping values."""
+    cursor = db.conn.cursor()
+    cursor.execute('SELECT id, site, password, last_updated FROM passwords WHERE uuid IS NULL LIMIT ?', (batch_size,))
+    rows = cursor.fetchall()
+    if rows:
+        # mod_counter is set, so the sync triggers leave these rows alone
+        cursor.executemany('UPDATE passwords SET uuid = ?, mod_counter = id, modified_at = ? WHERE id = ?',
+                           [(legacy_uuid(id_, site, password), last_updated, id_)
+                            for id_, site, password, last_updated in rows])
+        cursor.execute('DELETE FROM sync_buckets')
+        db.conn.commit()
+    return len(rows)
+
+
+def count_unindexed_sites(db):
+    return db.conn.execute('SELECT COUNT(*) FROM passwords WHERE site_index IS NULL').fetchone()[0]
+
+
+def encrypt_site_batch(db, batch_size, master_password):
+    """Encrypt plaintext sites and build the blind index of rows without one (see Database.index_site_rows)."""
+    rows = db.conn.execute('SELECT id, site FROM passwords WHERE site_index IS NULL LIMIT ?', (batch_size,)).fetchall()
+    if rows:
+        db.index_site_rows(rows, master_password)
+    return len(rows)
+
+
+# Run in this order; append new ones at the end
+DATA_MIGRATIONS = [
+    DataMigration("Assigning sync ids", count_legacy_uuids, backfill_legacy_uuids),
+    DataMigration("Encrypting site names", count_unindexed_sites, encrypt_site_batch, needs_key=True),
+]
+
+
+def pending_data_migrations(db, master_password=None):
+    """(migration, rows left) for each data migration with work left that can run now."""
+    pending = []
+    for migration in DATA_MIGRATIONS:
+        if migration.needs_key and master_password is None:
+            continue
+        count = migration.pending(db)
+        if count:
+            pending.append((migration, count))
+    return pending
+
+
+def run_data_migrations(db, master_password=None, progress=None, batch_size=MIGRATION_BATCH_SIZE):
+    """
+    Run every pending data migration that can run now (those that need the key only with
+    `master_password`, which the caller must have verified). progress(name, done, total) is
+    called after each batch. Returns the number of rows rewritten.
+    """
+    rewritten = 0
+    for migration, total in pending_data_migrations(db, master_password):
+        done = 0
+        while True:
+            count = migration.run_batch(db, batch_size, master_password)
+            if count == 0:
+                break
+            done += count
+            rewritten += count
+            if progress is not None:
+                progress(migration.name, done, max(total, done))
+    return rewritten
+
+
+def main(argv=None):
+    # Imported here: database imports this module
+    from database import Database
+    from profiles import DEFAULT_DB_NAME, resolve_db_path
+
+    parser = argparse.ArgumentParser(description="Show or finish a vault's schema migrations")
+    parser.add_argument("--db", default=DEFAULT_DB_NAME, help="Vault database file")
+    parser.add_argument("--profile", help="Use this profile's vault (see profiles.py) instead of --db")
+    parser.add_argument("--run", action="store_true",
+                        help="Also run the rewrites that need the master password (read from PMRS_MASTER_PASSWORD "
+                             "or prompted for) and convert the file to incremental auto-vacuum")
+    args = parser.parse_args(argv)
+
+    try:
+        db = Database(resolve_db_path(args.profile, args.db))  # Applies the schema migrations
+    except (KeyError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    try:
+        print(f"Schema version {schema_version(db.conn)} of {SCHEMA_VERSION}")
+        if args.run:
+            master_password = os.environ.get("PMRS_MASTER_PASSWORD") or getpass.getpass("Master password: ")
+            if not db.verify_master_password(master_password):
+                print("Incorrect master password", file=sys.stderr)
+                return 2
+            run_data_migrations(db, master_password,
+                                progress=lambda name, done, total: print(f"{name}: {done}/{total}", flush=True))
+            try:
+                if db.enable_incremental_vacuum():
+                    print("Converted to incremental auto-vacuum")
+            except sqlite3.Error as e:
+                print(f"Could not convert to incremental auto-vacuum: {e}", file=sys.stderr)
+                return 1
+        for migration in DATA_MIGRATIONS:
+            count = migration.pending(db)
+            print(f"{migration.name}: {'done' if count == 0 else f'{count} rows left'}"
+                  f"{' (runs at unlock, or with --run)' if count else ''}")
+        incremental = db.conn.execute('PRAGMA auto_vacuum').fetchone()[0] == 2
+        print(f"Incremental auto-vacuum: {'on' if incremental else 'off (converted with --run)'}")
+    finally:
+        db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
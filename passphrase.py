@@ -0,0 +1,246 @@
+"""
+Diceware-style passphrases from a large, memory-mapped wordlist.
+
+Wordlists are stored in a packed file so even 100k+ words open instantly and use no
+Python memory per word:
+
+    8 bytes   magic b"PMRSWL1\\0"
+    4 bytes   word count N (little-endian uint32)
+    4 bytes   reserved
+    4*(N+1)   byte offsets of each word in the data section (uint32)
+    ...       UTF-8 word bytes, back to back
+
+The file is mapped read-only and word i is read straight from its two offsets, so a
+lookup is O(1) and nothing is decoded until a word is actually picked. Words are picked
+with secrets.randbelow, and because the list is de-duplicated the entropy is exactly
+words * log2(N) bits (plus the optional number).
+
+The default list, wordlists/eff_large.pwl, is the EFF large Diceware wordlist
+(wordlists/sources/eff_large_wordlist.txt, CC BY 3.0 US, Electronic Frontier Foundation).
+Its four hyphenated words are dropped so they can't be confused with the separator,
+which leaves 7,772 words, about 12.9 bits per word. It is rebuilt with:
+
+    python passphrase.py build wordlists/sources/eff_large_wordlist.txt
+
+Other commands:
+
+    python passphrase.py build my_list.txt                # Diceware lists ("11111<TAB>word") or one word per line
+    python passphrase.py build --default                  # from wordlists/*.txt and the built-in word lists
+    python passphrase.py check                            # word count and bits per word of the default list
+    python passphrase.py generate --words 6
+"""
+
+import argparse
+import math
+import mmap
+import os
+import re
+import secrets
+import struct
+import sys
+
+from tracing import traced
+
+MAGIC = b"PMRSWL1\0"
+HEADER = struct.Struct("<8sII")
+OFFSET = struct.Struct("<I")
+
+WORDLIST_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "wordlists")
+DEFAULT_WORDLIST_PATH = os.environ.get("PMRS_PASSPHRASE_WORDLIST", os.path.join(WORDLIST_DIR, "eff_large.pwl"))
+
+# Words that are easy to type and read back: plain lowercase letters
+WORD_PATTERN = re.compile(r"^[a-z]{3,9}$")
+
+# Below this, passphrases get too weak per word to be worth offering
+MIN_WORDS = 1024
+
+
+class PackedWordlist:
+    """Read-only, memory-mapped word list with O(1) access by index."""
+
+    def __init__(self, path=DEFAULT_WORDLIST_PATH):
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ValueError(f"{path} is empty")
+        magic, self._count, _ = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a packed wordlist")
+        self._offsets_start = HEADER.size
+        self._data_start = HEADER.size + OFFSET.size * (self._count + 1)
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        if not 0 <= index < self._count:
+            raise IndexError("word index out of range")
+        start, end = struct.unpack_from("<II", self._map, self._offsets_start + OFFSET.size * index)
+        return self._map[self._data_start + start:self._data_start + end].decode("utf-8")
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @staticmethod
+    def build(words, path):
+        """Write `words` (de-duplicated, order kept) as a packed wordlist and return the count."""
+        unique = list(dict.fromkeys(words))
+        encoded = [w.encode("utf-8") for w in unique]
+        offsets = [0]
+        for data in encoded:
+            offsets.append(offsets[-1] + len(data))
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, len(unique), 0))
+            f.write(struct.pack(f"<{len(offsets)}I", *offsets))
+            f.write(b"".join(encoded))
+        os.replace(tmp_path, path)
+        return len(unique)
+
+
+def read_wordlist_text(path):
+    """Words from a text list: Diceware style ("11111<TAB>word") or one word per line."""
+    words = []
+    with open(path, encoding="utf-8", errors="ignore") as f:
+        for line in f:
+            parts = line.split()
+            if parts:
+                words.append(parts[-1].lower())
+    return words
+
+
+def read_word_index(path):
+    """Words from the memorable generator's word_frequencies.tsv."""
+    with open(path, encoding="utf-8") as f:
+        return [line.split("\t", 1)[0] for line in f if line.strip() and not line.startswith("#")]
+
+
+def default_source_words():
+    """Candidate words from wordlists/*.txt and the built-in strength and memorable word lists."""
+    words = []
+    if os.path.isdir(WORDLIST_DIR):
+        for name in sorted(os.listdir(WORDLIST_DIR)):
+            if name.endswith(".txt"):
+                words.extend(read_wordlist_text(os.path.join(WORDLIST_DIR, name)))
+    index_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "recommender system", "word_frequencies.tsv")
+    if os.path.exists(index_path):
+        words.extend(read_word_index(index_path))
+    from password_strength import COMMON_WORDS
+    words.extend(COMMON_WORDS)
+    return words
+
+
+def build_wordlist(words, path=DEFAULT_WORDLIST_PATH):
+    """Filter to easy-to-type words, sort, and pack. Raises ValueError if too few remain."""
+    usable = sorted({w for w in words if WORD_PATTERN.match(w)})
+    if len(usable) < MIN_WORDS:
+        raise ValueError(f"Only {len(usable)} usable words found; at least {MIN_WORDS} are needed. "
+                         f"Add a wordlist (e.g. the EFF Diceware list) to {WORDLIST_DIR}.")
+    return PackedWordlist.build(usable, path)
+
+
+class PassphraseGenerator:
+    """
+    words: Number of words per passphrase
+    separator: Placed between words (fixed, so it adds no entropy)
+    capitalize: Capitalize each word (fixed, adds no entropy)
+    add_number: Append a random number 0-99 (adds log2(100) bits)
+    """
+
+    def __init__(self, wordlist, words=6, separator="-", capitalize=False, add_number=False):
+        if words < 1:
+            raise ValueError("A passphrase needs at least one word")
+        self.wordlist = wordlist
+        self.words = words
+        self.separator = separator
+        self.capitalize = capitalize
+        self.add_number = add_number
+
+    @property
+    def entropy_bits(self):
+        bits = self.words * math.log2(len(self.wordlist))
+        if self.add_number:
+            bits += math.log2(100)
+        return bits
+
+    @traced("passphrase.generate")
+    def generate(self):
+        size = len(self.wordlist)
+        picked = [self.wordlist[secrets.randbelow(size)] for _ in range(self.words)]
+        if self.capitalize:
+            picked = [w.capitalize() for w in picked]
+        if self.add_number:
+            picked.append(str(secrets.randbelow(100)))
+        return self.separator.join(picked)
+
+
+def open_default_wordlist():
+    """Open the default packed wordlist (the shipped EFF list unless PMRS_PASSPHRASE_WORDLIST says otherwise),
+    building it from the local word sources if it is missing."""
+    if not os.path.exists(DEFAULT_WORDLIST_PATH):
+        build_wordlist(default_source_words(), DEFAULT_WORDLIST_PATH)
+    return PackedWordlist(DEFAULT_WORDLIST_PATH)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Packed wordlists and Diceware-style passphrases")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("build", help="Pack a wordlist")
+    p.add_argument("sources", nargs="*", help="Text wordlists (Diceware or one word per line)")
+    p.add_argument("--default", action="store_true", help="Use wordlists/*.txt and the built-in word lists")
+    p.add_argument("--output", default=DEFAULT_WORDLIST_PATH)
+    p = sub.add_parser("check", help="Open a packed wordlist and show its size and bits per word")
+    p.add_argument("--wordlist", default=DEFAULT_WORDLIST_PATH)
+    p = sub.add_parser("generate", help="Print passphrases")
+    p.add_argument("--words", type=int, default=6)
+    p.add_argument("--count", type=int, default=1)
+    p.add_argument("--separator", default="-")
+    p.add_argument("--capitalize", action="store_true")
+    p.add_argument("--add-number", action="store_true")
+    p.add_argument("--wordlist", default=DEFAULT_WORDLIST_PATH)
+    args = parser.parse_args()
+
+    try:
+        if args.command == "build":
+            words = []
+            for source in args.sources:
+                words.extend(read_wordlist_text(source))
+            if args.default or not args.sources:
+                words.extend(default_source_words())
+            count = build_wordlist(words, args.output)
+            print(f"Packed {count} words into {args.output}")
+        elif args.command == "check":
+            with PackedWordlist(args.wordlist) as wordlist:
+                bits = math.log2(len(wordlist)) if len(wordlist) else 0.0
+                print(f"{args.wordlist}: {len(wordlist)} words, {bits:.2f} bits per word")
+                if len(wordlist) < MIN_WORDS:
+                    print(f"Error: at least {MIN_WORDS} words are needed", file=sys.stderr)
+                    return 1
+        else:
+            wordlist = PackedWordlist(args.wordlist) if args.wordlist != DEFAULT_WORDLIST_PATH else open_default_wordlist()
+            with wordlist:
+                generator = PassphraseGenerator(wordlist, args.words, args.separator, args.capitalize, args.add_number)
+                for _ in range(args.count):
+                    print(generator.generate())
+                print(f"{generator.entropy_bits:.1f} bits of entropy ({len(wordlist)} words)", file=sys.stderr)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
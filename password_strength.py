@@ -0,0 +1,377 @@
+"""
+Password strength estimation (zxcvbn-style).
+
+A password is split into the cheapest sequence of patterns an attacker would try:
+dictionary words (optionally reversed or l33t), keyboard walks, repeats and sequences.
+Anything not covered by a pattern is treated as bruteforce.
+
+Every match only depends on the characters up to where it ends, so the estimator keeps
+the per-position results of the last password it scored. When the user types a key only
+the changed suffix is recomputed, which keeps live scoring cheap even with large dictionaries.
+"""
+
+import math
+import os
+
+from tracing import traced
+
+# Most common passwords first (rank 1 = most guessable)
+COMMON_PASSWORDS = [
+    "123456", "password", "12345678", "qwerty", "123456789", "12345", "1234", "111111",
+    "1234567", "dragon", "123123", "baseball", "abc123", "football", "monkey", "letmein",
+    "696969", "shadow", "master", "666666", "qwertyuiop", "123321", "mustang", "1234567890",
+    "michael", "654321", "superman", "1qaz2wsx", "7777777", "121212", "000000", "qazwsx",
+    "123qwe", "killer", "trustno1", "jordan", "jennifer", "zxcvbnm", "asdfgh", "hunter",
+    "buster", "soccer", "harley", "batman", "andrew", "tigger", "sunshine", "iloveyou",
+    "2000", "charlie", "robert", "thomas", "hockey", "ranger", "daniel", "starwars",
+    "klaster", "112233", "george", "computer", "michelle", "jessica", "pepper", "1111",
+    "zxcvbn", "555555", "11111111", "131313", "freedom", "777777", "pass", "maggie",
+    "159753", "aaaaaa", "ginger", "princess", "joshua", "cheese", "amanda", "summer",
+    "love", "ashley", "nicole", "chelsea", "biteme", "matthew", "access", "yankees",
+    "987654321", "dallas", "austin", "thunder", "taylor", "matrix", "admin", "welcome",
+    "chocolate", "spiderman", "hulk", "bestclub", "house", "login", "secret", "passw0rd",
+]
+
+# Common English words that show up in passwords
+COMMON_WORDS = [
+    "the", "love", "you", "and", "home", "life", "time", "sun", "moon", "star", "rain",
+    "snow", "wind", "fire", "water", "hope", "dream", "work", "play", "book", "game",
+    "food", "tree", "bird", "fish", "cat", "dog", "blue", "red", "green", "black",
+    "white", "gold", "silver", "mountain", "river", "ocean", "beach", "forest", "garden",
+    "spring", "summer", "autumn", "winter", "day", "night", "sky", "angel", "baby",
+    "happy", "money", "music", "power", "king", "queen", "girl", "boy", "friend",
+    "family", "heart", "magic", "lucky", "apple", "orange", "banana", "cookie", "secret",
+    "hello", "world", "super", "best", "cool", "sweet", "pretty", "little", "big",
+]
+
+# Keyboard layout used for the spatial (keyboard walk) matcher
+QWERTY_ROWS = ["`1234567890-=", "qwertyuiop[]\\", "asdfghjkl;'", "zxcvbnm,./"]
+QWERTY_SHIFTED_ROWS = ["~!@#$%^&*()_+", "QWERTYUIOP{}|", "ASDFGHJKL:\"", "ZXCVBNM<>?"]
+
+# Common l33t substitutions, mapped back to the letter they replace
+LEET_TABLE = {"4": "a", "@": "a", "8": "b", "(": "c", "3": "e", "6": "g", "1": "i",
+              "!": "i", "0": "o", "9": "g", "$": "s", "5": "s", "7": "t", "+": "t", "2": "z"}
+
+# zxcvbn treats every uncovered character as 10 guesses
+BRUTEFORCE_LOG10 = 1.0
+MIN_SUBMATCH_LOG10 = math.log10(50)
+MIN_SINGLE_CHAR_LOG10 = math.log10(10)
+
+# Score thresholds on log10(guesses), same cut-offs as zxcvbn
+SCORE_THRESHOLDS = [3, 6, 8, 10]
+SCORE_LABELS = ["Very weak", "Weak", "Fair", "Strong", "Very strong"]
+SCORE_COLORS = ["red", "red", "orange", "green", "green"]
+
+# Folder with optional extra ranked wordlists (one word per line, most common first)
+WORDLIST_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "wordlists")
+
+_default_dictionaries = None
+
+
+class StrengthResult:
+    """The outcome of scoring one password."""
+
+    def __init__(self, password, guesses_log10, matches):
+        self.password = password
+        self.guesses_log10 = guesses_log10
+        self.matches = matches  # Patterns found, in order, as (pattern, token) tuples
+        self.score = sum(1 for threshold in SCORE_THRESHOLDS if guesses_log10 >= threshold)
+        self.label = SCORE_LABELS[self.score]
+        self.color = SCORE_COLORS[self.score]
+
+    @property
+    def feedback(self):
+        """A short hint about the weakest pattern found."""
+        patterns = [pattern for pattern, _ in self.matches]
+        if not self.password:
+            return ""
+        if "dictionary" in patterns:
+            return "Avoid common words and passwords"
+        if "keyboard" in patterns:
+            return "Avoid keyboard patterns like 'qwerty'"
+        if "repeat" in patterns:
+            return "Avoid repeated characters or blocks"
+        if "sequence" in patterns:
+            return "Avoid sequences like 'abc' or '123'"
+        if self.score < 3:
+            return "Add more characters"
+        return ""
+
+
+class RankedDictionaries:
+    """
+    Word -> rank lookups, precomputed once and shared by every estimator.
+    """
+
+    def __init__(self):
+        self.ranks = {}
+        self.max_word_length = 0
+
+    def add(self, words):
+        """Add an iterable of words ordered by rank (most common first)."""
+        for rank, word in enumerate(words, start=1):
+            word = word.strip().lower()
+            if not word:
+                continue
+            # Keep the best rank if a word appears in several lists
+            if word not in self.ranks or rank < self.ranks[word]:
+                self.ranks[word] = rank
+            if len(word) > self.max_word_length:
+                self.max_word_length = len(word)
+
+    def add_file(self, path):
+        """Add a ranked wordlist file (one word per line)."""
+        with open(path, encoding="utf-8", errors="ignore") as f:
+            self.add(line for line in f)
+
+    def rank(self, word):
+        return self.ranks.get(word)
+
+
+def load_default_dictionaries():
+    """
+    Build the default dictionaries once: the built-in lists plus any *.txt in WORDLIST_DIR.
+    """
+    global _default_dictionaries
+    if _default_dictionaries is None:
+        dictionaries = RankedDictionaries()
+        dictionaries.add(COMMON_PASSWORDS)
+        dictionaries.add(COMMON_WORDS)
+        if os.path.isdir(WORDLIST_DIR):
+            for name in sorted(os.listdir(WORDLIST_DIR)):
+                if name.endswith(".txt"):
+                    dictionaries.add_file(os.path.join(WORDLIST_DIR, name))
+        _default_dictionaries = dictionaries
+    return _default_dictionaries
+
+
+def _build_keyboard_graph():
+    """Map every key to its neighbours on a (staggered) qwerty keyboard."""
+    positions = {}
+    for rows in (QWERTY_ROWS, QWERTY_SHIFTED_ROWS):
+        for r, row in enumerate(rows):
+            for c, char in enumerate(row):
+                positions[char] = (r, c)
+
+    by_position = {}
+    for char, pos in positions.items():
+        by_position.setdefault(pos, []).append(char)
+
+    graph = {}
+    for char, (r, c) in positions.items():
+        neighbours = {}
+        # Each direction gets an id so we can count turns in a walk
+        for direction, (dr, dc) in enumerate([(-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0)]):
+            for neighbour in by_position.get((r + dr, c + dc), []):
+                neighbours[neighbour] = direction
+        graph[char] = neighbours
+    return graph
+
+
+KEYBOARD_GRAPH = _build_keyboard_graph()
+# Shifted and unshifted characters share a key, so count keys rather than characters
+KEYBOARD_STARTING_POSITIONS = sum(len(row) for row in QWERTY_ROWS)
+KEYBOARD_AVERAGE_DEGREE = sum(len(KEYBOARD_GRAPH[c]) for row in QWERTY_ROWS for c in row) / 2 / KEYBOARD_STARTING_POSITIONS
+
+
+def _n_choose_k(n, k):
+    if k > n or k < 0:
+        return 0
+    return math.comb(n, k)
+
+
+def _uppercase_variations(token):
+    """Extra guesses needed for the capitalisation of a dictionary word."""
+    upper = sum(1 for c in token if c.isupper())
+    lower = sum(1 for c in token if c.islower())
+    if upper == 0:
+        return 1
+    if lower == 0 or (upper == 1 and token[0].isupper()):
+        return 2
+    return sum(_n_choose_k(upper + lower, i) for i in range(1, min(upper, lower) + 1))
+
+
+def _char_cardinality(char):
+    if char.isdigit():
+        return 10
+    if char.isalpha():
+        return 26
+    return 33
+
+
+def _keyboard_guesses_log10(length, turns):
+    """zxcvbn's spatial guess estimate for a keyboard walk."""
+    guesses = 0
+    for i in range(2, length + 1):
+        for j in range(1, min(turns, i - 1) + 1):
+            guesses += _n_choose_k(i - 1, j - 1) * KEYBOARD_STARTING_POSITIONS * KEYBOARD_AVERAGE_DEGREE ** j
+    return math.log10(max(guesses, 1))
+
+
+def _sequence_guesses_log10(token, ascending):
+    first = token[0]
+    if first in "aAzZ019":
+        base = 4  # Obvious starting points
+    elif first.isdigit():
+        base = 10
+    else:
+        base = 26
+    if not ascending:
+        base *= 2
+    return math.log10(base * len(token))
+
+
+class StrengthEstimator:
+    """
+    Incremental password strength estimator.
+
+    Keep one instance per input field: the results for the previous value are reused
+    for the unchanged prefix of the next one.
+    """
+
+    def __init__(self, dictionaries=None, max_block_length=8):
+        self.dictionaries = dictionaries or load_default_dictionaries()
+        self.max_block_length = max_block_length  # Longest block checked by the repeat matcher
+        self.reset()
+
+    def reset(self):
+        """Forget the memoized state for the previous password."""
+        self._text = ""
+        # Per end-position state (index j describes text[:j + 1])
+        self._best = []          # Cheapest log10(guesses) for the prefix
+        self._back = []          # (start, pattern, match_log10) of the last match used
+        self._walk_dirs = []     # Keyboard direction from j-1 to j (None if not adjacent)
+        self._seq_deltas = []    # Code point delta from j-1 to j if it can extend a sequence
+
+    @traced("strength.score")
+    def score(self, password):
+        """Score a password, recomputing only the part that changed since the last call."""
+        # Find how much of the previous password we can keep
+        keep = 0
+        limit = min(len(password), len(self._text))
+        while keep < limit and password[keep] == self._text[keep]:
+            keep += 1
+
+        del self._best[keep:]
+        del self._back[keep:]
+        del self._walk_dirs[keep:]
+        del self._seq_deltas[keep:]
+        self._text = password
+
+        for j in range(keep, len(password)):
+            self._extend(password, j)
+
+        if not password:
+            return StrengthResult(password, 0.0, [])
+        return StrengthResult(password, self._best[-1], self._match_sequence())
+
+    def _prefix_cost(self, start):
+        return self._best[start - 1] if start > 0 else 0.0
+
+    def _extend(self, text, j):
+        """Compute the DP state for the prefix ending at position j."""
+        char = text[j]
+        prev = text[j - 1] if j > 0 else None
+
+        # Cheapest option so far: bruteforce this character
+        best = self._prefix_cost(j) + BRUTEFORCE_LOG10
+        back = (j, "bruteforce", BRUTEFORCE_LOG10)
+
+        def consider(start, pattern, match_log10):
+            nonlocal best, back
+            min_log10 = MIN_SINGLE_CHAR_LOG10 if j == start else MIN_SUBMATCH_LOG10
+            match_log10 = max(match_log10, min_log10)
+            cost = self._prefix_cost(start) + match_log10
+            if cost < best:
+                best = cost
+                back = (start, pattern, match_log10)
+
+        # Dictionary matcher (plain, reversed and l33t), only over windows that can be words.
+        # Walk the start backwards so the lowered and de-l33ted tokens grow one char at a time.
+        max_len = self.dictionaries.max_word_length
+        rank_of = self.dictionaries.ranks.get
+        lowered = ""
+        unleeted = ""
+        subs = 0
+        for start in range(j, max(0, j - max_len + 1) - 1, -1):
+            c = text[start].lower()
+            lowered = c + lowered
+            if c in LEET_TABLE:
+                unleeted = LEET_TABLE[c] + unleeted
+                subs += 1
+            else:
+                unleeted = c + unleeted
+            rank = rank_of(lowered)
+            if rank is not None:
+                consider(start, "dictionary", math.log10(rank * _uppercase_variations(text[start:j + 1])))
+            if start < j:
+                rank = rank_of(lowered[::-1])
+                if rank is not None:
+                    consider(start, "dictionary", math.log10(rank * _uppercase_variations(text[start:j + 1]) * 2))
+            if subs and j - start >= 2:
+                rank = rank_of(unleeted)
+                if rank is not None:
+                    consider(start, "dictionary", math.log10(rank * _uppercase_variations(text[start:j + 1]) * 2 ** subs))
+
+        # Keyboard walk matcher (3+ adjacent keys)
+        direction = KEYBOARD_GRAPH.get(prev, {}).get(char) if prev is not None else None
+        self._walk_dirs.append(direction)
+        turns = 1
+        k = j
+        while k > 0 and self._walk_dirs[k] is not None:
+            if k < j and self._walk_dirs[k] != self._walk_dirs[k + 1]:
+                turns += 1
+            start = k - 1
+            if j - start + 1 >= 3:
+                consider(start, "keyboard", _keyboard_guesses_log10(j - start + 1, turns))
+            k -= 1
+
+        # Sequence matcher (abc, 1357, zyx) with a constant step of at most 5
+        delta = None
+        if prev is not None and (prev.isdigit() == char.isdigit()) and (prev.islower() == char.islower()) \
+                and prev.isalnum() and char.isalnum():
+            step = ord(char) - ord(prev)
+            if 0 < abs(step) <= 5:
+                delta = step
+        self._seq_deltas.append(delta)
+        if delta is not None:
+            start = j - 1
+            while start > 0 and self._seq_deltas[start] == delta:
+                start -= 1
+            if j - start + 1 >= 3:
+                consider(start, "sequence", _sequence_guesses_log10(text[start:j + 1], delta > 0))
+
+        # Repeat matcher: a block of 1..max_block_length characters repeated 2+ times
+        for block in range(1, self.max_block_length + 1):
+            if (j + 1) < 2 * block:
+                break
+            unit = text[j - block + 1:j + 1]
+            count = 1
+            start = j - block + 1
+            while start - block >= 0 and text[start - block:start] == unit:
+                count += 1
+                start -= block
+            if count >= 2:
+                # Guessing the block once is roughly as hard as the cheapest way to type it
+                if block == 1:
+                    base_log10 = math.log10(_char_cardinality(char))
+                else:
+                    base_log10 = block * BRUTEFORCE_LOG10
+                    block_cost = self._best[j - block] - self._prefix_cost(j - 2 * block + 1)
+                    if 0 < block_cost < base_log10:
+                        base_log10 = block_cost
+                consider(start, "repeat", base_log10 + math.log10(count))
+
+        self._best.append(best)
+        self._back.append(back)
+
+    def _match_sequence(self):
+        """Walk the back-pointers to list the patterns used for the current password."""
+        matches = []
+        j = len(self._text) - 1
+        while j >= 0:
+            start, pattern, _ = self._back[j]
+            matches.append((pattern, self._text[start:j + 1]))
+            j = start - 1
+        matches.reverse()
+        return matches
@@ -0,0 +1,204 @@
+"""
+Vault profiles.
+
+Each profile is its own vault database file, so a large team vault and a personal vault
+never share tables, indexes or master passwords, and each can be unlocked without
+touching the others. The registry is a small JSON file:
+
+    {"profiles": {"Default": "password_manager.db", "Team": "vaults/team.db"}, "last_used": "Team"}
+
+Relative paths are resolved against the registry's folder. Without a registry there is a
+single "Default" profile on password_manager.db, so existing installs keep working.
+
+ProfileManager tracks the active profile for the GUI. It opens a profile's database the
+first time it is needed and keeps one connection per profile. It also keeps one
+VaultService per profile as that profile's key session.
+
+    python profiles.py list
+    python profiles.py add Team --path vaults/team.db
+    python profiles.py remove Team          (the vault file is left in place)
+
+This module must not import customtkinter.
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+
+from database import Database, StatusRefresher, HistoryCompactor
+from vault_service import VaultService
+
+DEFAULT_PROFILE = "Default"
+DEFAULT_DB_NAME = "password_manager.db"
+REGISTRY_PATH = os.environ.get("PMRS_PROFILES", "profiles.json")
+PROFILE_DIR = "vaults"  # Where new profiles' databases go, relative to the registry
+
+
+def profile_slug(name):
+    """A file-name-safe version of a profile name."""
+    return re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-") or "profile"
+
+
+class ProfileRegistry:
+    def __init__(self, path=REGISTRY_PATH):
+        self.path = path
+        self.base_dir = os.path.dirname(os.path.abspath(path))
+        self.profiles = {DEFAULT_PROFILE: DEFAULT_DB_NAME}
+        self.last_used = DEFAULT_PROFILE
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            self.profiles = data.get("profiles") or self.profiles
+            self.last_used = data.get("last_used", self.last_used)
+        if self.last_used not in self.profiles:
+            self.last_used = next(iter(self.profiles))
+
+    def names(self):
+        return list(self.profiles)
+
+    def path_for(self, name):
+        """Absolute database path of a profile."""
+        if name not in self.profiles:
+            raise KeyError(f"No profile named {name!r}")
+        return os.path.join(self.base_dir, self.profiles[name])
+
+    def add(self, name, path=None):
+        """Register a profile; its database is created when it is first opened."""
+        name = name.strip()
+        if not name:
+            raise ValueError("Profile name is required.")
+        if name in self.profiles:
+            raise ValueError(f"A profile named {name!r} already exists.")
+        path = path or os.path.join(PROFILE_DIR, profile_slug(name) + ".db")
+        if path in self.profiles.values():
+            raise ValueError(f"{path} already belongs to another profile.")
+        self.profiles[name] = path
+        self.save()
+        return self.path_for(name)
+
+    def remove(self, name):
+        """Unregister a profile. Its database file is kept."""
+        if name not in self.profiles:
+            raise KeyError(f"No profile named {name!r}")
+        if len(self.profiles) == 1:
+            raise ValueError("The last profile cannot be removed.")
+        del self.profiles[name]
+        if self.last_used == name:
+            self.last_used = next(iter(self.profiles))
+        self.save()
+
+    def set_last_used(self, name):
+        if self.last_used != name:
+            self.last_used = name
+            self.save()
+
+    def save(self):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"profiles": self.profiles, "last_used": self.last_used}, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+def resolve_db_path(profile=None, db=None, registry_path=REGISTRY_PATH):
+    """Database path for command-line tools: --profile wins, then --db, then the default."""
+    if profile is not None:
+        return ProfileRegistry(registry_path).path_for(profile)
+    return db or DEFAULT_DB_NAME
+
+
+class ProfileManager:
+    """
+    The active profile and its open database, shared by every screen.
+    A profile's Database (and its background jobs) is only opened once that profile is used.
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(ProfileManager, cls).__new__(cls)
+            cls._instance.registry = ProfileRegistry()
+            cls._instance.active = cls._instance.registry.last_used
+            cls._instance.refresh_statuses = False  # Set by main() to keep statuses current and history compact
+            cls._instance._databases = {}
+            cls._instance._sessions = {}
+            cls._instance._jobs = {}
+        return cls._instance
+
+    def select(self, name):
+        """Make `name` the active profile (remembered for the next start)."""
+        self.registry.path_for(name)  # Raises KeyError for unknown profiles
+        self.active = name
+        self.registry.set_last_used(name)
+
+    def database(self, name=None):
+        """The profile's Database, opened on first use."""
+        name = name or self.active
+        db = self._databases.get(name)
+        if db is None:
+            path = self.registry.path_for(name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            db = self._databases[name] = Database(path)
+            if self.refresh_statuses:
+                self._jobs[name] = [StatusRefresher(path), HistoryCompactor(path)]
+                for job in self._jobs[name]:
+                    job.start()
+        return db
+
+    def session(self, name=None):
+        """The profile's key session: a VaultService that is unlocked separately from every other profile."""
+        name = name or self.active
+        vault = self._sessions.get(name)
+        if vault is None:
+            vault = self._sessions[name] = VaultService(self.database(name))
+        return vault
+
+    def lock_all(self):
+        """Forget every profile's master password (on logout and timeout)."""
+        for vault in self._sessions.values():
+            vault.lock()
+
+    def close(self, name):
+        """Lock a profile and close its database."""
+        vault = self._sessions.pop(name, None)
+        if vault is not None:
+            vault.lock()
+        for job in self._jobs.pop(name, []):
+            job.stop()
+        db = self._databases.pop(name, None)
+        if db is not None:
+            db.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage vault profiles")
+    parser.add_argument("--registry", default=REGISTRY_PATH)
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("list", help="Show every profile and its database file")
+    p = sub.add_parser("add", help="Register a new profile")
+    p.add_argument("name")
+    p.add_argument("--path", help=f"Database file (default: {PROFILE_DIR}/<name>.db)")
+    p = sub.add_parser("remove", help="Unregister a profile (its database file is kept)")
+    p.add_argument("name")
+    args = parser.parse_args(argv)
+
+    registry = ProfileRegistry(args.registry)
+    try:
+        if args.command == "list":
+            for name in registry.names():
+                marker = "*" if name == registry.last_used else " "
+                print(f"{marker} {name}: {registry.path_for(name)}")
+        elif args.command == "add":
+            print(f"Added {args.name}: {registry.add(args.name, args.path)}")
+        else:
+            registry.remove(args.name)
+            print(f"Removed {args.name}")
+    except (KeyError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,393 @@
+"""
+Compact export of the character-level password model.
+
+The trained Keras model (Embedding -> LSTM/GRU... -> Dense) is written to a flat binary file
+that numpy can memory-map, so it loads in milliseconds without importing TensorFlow:
+
+    8 bytes   magic b"PMRSMDL\\0"
+    4 bytes   format version (little-endian uint32)
+    4 bytes   length of the JSON metadata
+    ...       JSON metadata: dtype, seq_length, max_length, character vocabulary, layers
+              and the offset/shape/dtype of every tensor
+    ...       tensor data, each tensor 64-byte aligned
+
+Weights can be stored as float32, float16 or int8. int8 weight matrices are quantized
+symmetrically with one float32 scale per output column; biases always stay float32.
+ExportedModel runs the forward pass in numpy and has the same predict(x, verbose=0)
+call as the Keras model, so PasswordGenerator can use either. Quantized weights are
+dequantized one layer at a time during a forward pass and dropped afterwards, so only the
+mapped file stays resident; cache_weights=True keeps the float32 copies instead, trading
+memory for speed.
+
+    python model_export.py export               # model.float32/float16/int8.pmrsm in the run directory
+    python model_export.py compare              # accuracy, size and latency against the Keras model
+"""
+
+import argparse
+import glob
+import json
+import os
+import statistics
+import struct
+import time
+
+import numpy as np
+
+MAGIC = b"PMRSMDL\0"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<8sII")
+ALIGNMENT = 64
+
+DTYPES = ("float32", "float16", "int8")
+# Variant loaded by PasswordGenerator.train(); `compare` shows how close it is to float32
+DEFAULT_EXPORT_DTYPE = "float16"
+
+# Same location as training_manager.RUNS_DIR (which can't be imported without TensorFlow)
+RUNS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "runs")
+
+
+def export_path(run_dir=None, dtype=DEFAULT_EXPORT_DTYPE):
+    return os.path.join(run_dir or os.path.join(RUNS_DIR, "ml"), f"model.{dtype}.pmrsm")
+
+
+def remove_exports(run_dir):
+    """Delete exported models, e.g. after the Keras model they came from was retrained."""
+    for path in glob.glob(os.path.join(run_dir, "model.*.pmrsm")):
+        os.remove(path)
+
+
+def _align(n):
+    return (n + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def _quantize(weights, dtype):
+    """Return (stored array, per-column float32 scale or None)."""
+    weights = np.asarray(weights, dtype=np.float32)
+    if dtype == "float32":
+        return weights, None
+    if dtype == "float16":
+        return weights.astype(np.float16), None
+    axes = tuple(range(weights.ndim - 1))
+    scale = np.abs(weights).max(axis=axes) / 127.0
+    scale[scale == 0] = 1.0
+    quantized = np.clip(np.round(weights / scale), -127, 127).astype(np.int8)
+    return quantized, scale.astype(np.float32)
+
+
+def _layer_specs(keras_model):
+    """Describe the supported layers and collect their float32 weights."""
+    layers = []
+    for layer in keras_model.layers:
+        kind = type(layer).__name__
+        if kind == "Dropout":
+            continue  # Inference-time no-op
+        weights = layer.get_weights()
+        if kind == "Embedding":
+            layers.append({"type": "embedding", "weights": {"embeddings": weights[0]}})
+        elif kind == "LSTM":
+            if layer.activation.__name__ != "tanh" or layer.recurrent_activation.__name__ != "sigmoid":
+                raise ValueError("Only LSTMs with tanh/sigmoid activations can be exported")
+            layers.append({
+                "type": "lstm",
+                "units": layer.units,
+                "return_sequences": layer.return_sequences,
+                "weights": {"kernel": weights[0], "recurrent_kernel": weights[1], "bias": weights[2]},
+            })
+        elif kind == "GRU":
+            if not layer.reset_after or layer.activation.__name__ != "tanh" or layer.recurrent_activation.__name__ != "sigmoid":
+                raise ValueError("Only GRUs with reset_after and tanh/sigmoid activations can be exported")
+            layers.append({
+                "type": "gru",
+                "units": layer.units,
+                "return_sequences": layer.return_sequences,
+                "weights": {"kernel": weights[0], "recurrent_kernel": weights[1], "bias": weights[2]},
+            })
+        elif kind == "Dense":
+            layers.append({
+                "type": "dense",
+                "activation": layer.activation.__name__,
+                "weights": {"kernel": weights[0], "bias": weights[1]},
+            })
+        else:
+            raise ValueError(f"Layer type {kind} is not supported by the export format")
+    return layers
+
+
+def export_model(keras_model, vocabulary, path, dtype=DEFAULT_EXPORT_DTYPE, seq_length=5, max_length=15):
+    """
+    Write keras_model to `path` in the flat format.
+    vocabulary: char -> index mapping (PasswordGenerator.get_vocabulary())
+    """
+    if dtype not in DTYPES:
+        raise ValueError(f"dtype must be one of {', '.join(DTYPES)}")
+
+    tensors = {}
+    blobs = []
+    offset = 0
+
+    def add(name, array):
+        nonlocal offset
+        array = np.ascontiguousarray(array)
+        tensors[name] = {"offset": offset, "shape": list(array.shape), "dtype": str(array.dtype)}
+        blobs.append((offset, array.tobytes()))
+        offset = _align(offset + array.nbytes)
+
+    layers = []
+    for i, spec in enumerate(_layer_specs(keras_model)):
+        names = {}
+        for key, weights in spec.pop("weights").items():
+            # Biases are tiny and sensitive, so they always stay float32 (GRU biases are 2-D)
+            stored, scale = _quantize(weights, "float32" if key == "bias" else dtype)
+            name = f"{i}.{key}"
+            add(name, stored)
+            if scale is not None:
+                add(name + ".scale", scale)
+                tensors[name]["scale"] = name + ".scale"
+            names[key] = name
+        spec["tensors"] = names
+        layers.append(spec)
+
+    meta = json.dumps({
+        "dtype": dtype,
+        "seq_length": seq_length,
+        "max_length": max_length,
+        "vocabulary": vocabulary,
+        "layers": layers,
+        "tensors": tensors,
+    }).encode("utf-8")
+    data_start = _align(HEADER.size + len(meta))
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, len(meta)))
+        f.write(meta)
+        for blob_offset, data in blobs:
+            f.seek(data_start + blob_offset)
+            f.write(data)
+    os.replace(tmp_path, path)
+    return path
+
+
+def _sigmoid(x):
+    return 1.0 / (1.0 + np.exp(-x))
+
+
+class ExportedModel:
+    """Memory-mapped exported model with a numpy forward pass."""
+
+    def __init__(self, path, cache_weights=False):
+        self.path = path
+        self.cache_weights = cache_weights
+        self._map = np.memmap(path, dtype=np.uint8, mode="r")
+        magic, version, meta_length = HEADER.unpack(self._map[:HEADER.size].tobytes())
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not an exported password model")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"{path} uses format version {version}, expected {FORMAT_VERSION}")
+        meta = json.loads(self._map[HEADER.size:HEADER.size + meta_length].tobytes())
+        data_start = _align(HEADER.size + meta_length)
+
+        self.dtype = meta["dtype"]
+        self.seq_length = meta["seq_length"]
+        self.max_length = meta["max_length"]
+        self.vocabulary = meta["vocabulary"]
+        self.layers = meta["layers"]
+        self._tensor_info = meta["tensors"]
+        # Views straight into the mapped file: nothing is copied until a weight is used
+        self._tensors = {
+            name: np.ndarray(info["shape"], dtype=info["dtype"], buffer=self._map, offset=data_start + info["offset"])
+            for name, info in self._tensor_info.items()
+        }
+        self._layer_weights = None  # float32 weights per layer, kept with cache_weights
+
+    def _layer_weights_float32(self, layer):
+        """One layer's weights as float32. float32 tensors stay views into the mapped file."""
+        return {key: self._weight(name) for key, name in layer["tensors"].items()}
+
+    def _weight(self, name):
+        """The tensor as float32, dequantized if needed."""
+        tensor = self._tensors[name]
+        scale = self._tensor_info[name].get("scale")
+        if scale is not None:
+            return tensor.astype(np.float32) * self._tensors[scale]
+        if tensor.dtype != np.float32:
+            return tensor.astype(np.float32)
+        return tensor
+
+    @property
+    def nbytes(self):
+        return sum(t.nbytes for t in self._tensors.values())
+
+    @property
+    def resident_bytes(self):
+        """Weight memory held between predicts: the mapped tensors plus any cached float32 copies."""
+        cached = sum(w.nbytes for weights in self._layer_weights or [] for w in weights.values()
+                     if not np.may_share_memory(w, self._map))
+        return self.nbytes + cached
+
+    def predict(self, x, batch_size=4096, verbose=0):
+        """Next-character probabilities for a batch of index windows, like keras Model.predict."""
+        x = np.asarray(x).astype(np.int64)
+        weights = None
+        if self.cache_weights:
+            if self._layer_weights is None:
+                self._layer_weights = [self._layer_weights_float32(layer) for layer in self.layers]
+            weights = self._layer_weights
+        outputs = [self._forward(x[i:i + batch_size], weights) for i in range(0, len(x), batch_size)]
+        return np.concatenate(outputs) if outputs else np.zeros((0, 0), dtype=np.float32)
+
+    def _forward(self, x, weights=None):
+        h = None
+        for i, layer in enumerate(self.layers):
+            # Without a cache, each layer is converted once for all its time steps and freed after it
+            w = weights[i] if weights is not None else self._layer_weights_float32(layer)
+            if layer["type"] == "embedding":
+                h = w["embeddings"][x]
+            elif layer["type"] == "lstm":
+                h = self._lstm(h, w, layer["units"], layer["return_sequences"])
+            elif layer["type"] == "gru":
+                h = self._gru(h, w, layer["units"], layer["return_sequences"])
+            elif layer["type"] == "dense":
+                h = h @ w["kernel"] + w["bias"]
+                if layer["activation"] == "softmax":
+                    h = np.exp(h - h.max(axis=-1, keepdims=True))
+                    h /= h.sum(axis=-1, keepdims=True)
+        return h
+
+    @staticmethod
+    def _lstm(inputs, w, units, return_sequences):
+        batch, steps, _ = inputs.shape
+        # Input projections for every step at once; Keras gate order is i, f, c, o
+        projected = inputs @ w["kernel"] + w["bias"]
+        h = np.zeros((batch, units), dtype=np.float32)
+        c = np.zeros((batch, units), dtype=np.float32)
+        sequence = []
+        for t in range(steps):
+            z = projected[:, t] + h @ w["recurrent_kernel"]
+            i = _sigmoid(z[:, :units])
+            f = _sigmoid(z[:, units:2 * units])
+            g = np.tanh(z[:, 2 * units:3 * units])
+            o = _sigmoid(z[:, 3 * units:])
+            c = f * c + i * g
+            h = o * np.tanh(c)
+            if return_sequences:
+                sequence.append(h)
+        return np.stack(sequence, axis=1) if return_sequences else h
+
+    @staticmethod
+    def _gru(inputs, w, units, return_sequences):
+        batch, steps, _ = inputs.shape
+        # Keras GRU with reset_after: separate input and recurrent biases, gate order z, r, h
+        input_bias, recurrent_bias = w["bias"][0], w["bias"][1]
+        projected = inputs @ w["kernel"] + input_bias
+        h = np.zeros((batch, units), dtype=np.float32)
+        sequence = []
+        for t in range(steps):
+            x = projected[:, t]
+            r_proj = h @ w["recurrent_kernel"] + recurrent_bias
+            z = _sigmoid(x[:, :units] + r_proj[:, :units])
+            r = _sigmoid(x[:, units:2 * units] + r_proj[:, units:2 * units])
+            candidate = np.tanh(x[:, 2 * units:] + r * r_proj[:, 2 * units:])
+            h = z * h + (1 - z) * candidate
+            if return_sequences:
+                sequence.append(h)
+        return np.stack(sequence, axis=1) if return_sequences else h
+
+
+def _median_ms(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def compare(generator, run_dir=None, samples=2000, repeat=20):
+    """
+    Compare every exported variant with the Keras float32 model on windows from the
+    training corpus. Returns a list of result dicts (the Keras model first).
+    """
+    from tensorflow.keras.models import load_model
+    from training_manager import TrainingManager
+
+    manager = TrainingManager(generator, name="ml", run_dir=run_dir)
+    if not manager.load():
+        raise FileNotFoundError(f"No trained model in {manager.run_dir}")
+    keras_load_ms = _median_ms(lambda: load_model(manager.best_path), 1)
+
+    with open(manager.corpus_path, encoding="utf-8") as f:
+        X, _ = generator.prepare_data(f.read().splitlines())
+    X = X[:samples]
+    reference = generator.model.predict(X, verbose=0)
+    single = X[:1]
+
+    results = [{
+        "variant": "keras float32 (.h5)",
+        "file_bytes": os.path.getsize(manager.best_path),
+        "load_ms": keras_load_ms,
+        "predict_1_ms": _median_ms(lambda: generator.model.predict(single, verbose=0), repeat),
+        "predict_batch_ms": _median_ms(lambda: generator.model.predict(X, verbose=0), 3),
+        "resident_bytes": sum(w.nbytes for w in generator.model.get_weights()),
+        "top1_agreement": 1.0,
+        "max_abs_diff": 0.0,
+    }]
+    for dtype in DTYPES:
+        path = export_path(manager.run_dir, dtype)
+        if not os.path.exists(path):
+            continue
+        start = time.perf_counter()
+        model = ExportedModel(path)
+        load_ms = (time.perf_counter() - start) * 1000
+        preds = model.predict(X)
+        results.append({
+            "variant": f"exported {dtype}",
+            "file_bytes": os.path.getsize(path),
+            "load_ms": load_ms,
+            "predict_1_ms": _median_ms(lambda: model.predict(single), repeat),
+            "predict_batch_ms": _median_ms(lambda: model.predict(X), 3),
+            "resident_bytes": model.resident_bytes,
+            "top1_agreement": float(np.mean(preds.argmax(axis=1) == reference.argmax(axis=1))),
+            "max_abs_diff": float(np.abs(preds - reference).max()),
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the ML password model to the compact format")
+    parser.add_argument("action", choices=["export", "compare"])
+    parser.add_argument("--run-dir", help="Training run directory (default: runs/ml)")
+    parser.add_argument("--dtypes", default=",".join(DTYPES))
+    parser.add_argument("--samples", type=int, default=2000, help="Windows used by compare")
+    parser.add_argument("--output", help="Also save compare results as JSON")
+    args = parser.parse_args()
+
+    from recommender_system import PasswordGenerator
+    from training_manager import TrainingManager
+
+    generator = PasswordGenerator(max_length=15)
+    manager = TrainingManager(generator, name="ml", run_dir=args.run_dir)
+    if args.action == "export":
+        if not manager.load():
+            parser.error(f"No trained model in {manager.run_dir}; train one first")
+        for dtype in args.dtypes.split(","):
+            path = export_model(generator.model, generator.get_vocabulary(), export_path(manager.run_dir, dtype),
+                                dtype, generator.seq_length, generator.max_length)
+            print(f"{dtype:>8}: {os.path.getsize(path):>9,} bytes  {path}")
+        return
+
+    results = compare(generator, manager.run_dir, args.samples)
+    print(f"{'variant':<22} {'size':>10} {'resident':>10} {'load ms':>9} {'1 pred ms':>10} {'batch ms':>9} "
+          f"{'top-1':>7} {'max diff':>9}")
+    for r in results:
+        print(f"{r['variant']:<22} {r['file_bytes']:>10,} {r['resident_bytes']:>10,} {r['load_ms']:>9.1f} "
+              f"{r['predict_1_ms']:>10.2f} {r['predict_batch_ms']:>9.1f} {r['top1_agreement']:>7.1%} "
+              f"{r['max_abs_diff']:>9.4f}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
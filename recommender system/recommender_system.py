@@ -1,26 +1,43 @@
 import numpy as np
-import pandas as pd
-import tensorflow as tf
-from tensorflow.keras.models import Sequential
-from tensorflow.keras.layers import LSTM, Dense, Embedding, Dropout
-from tensorflow.keras.preprocessing.text import Tokenizer
-from tensorflow.keras.preprocessing.sequence import pad_sequences
 import random
 import string
 import requests
 from io import StringIO
+import os
+import sys
+
+# Make the app's top-level modules importable when this file is run on its own
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from tracing import traced, count as count_event
+from model_export import ExportedModel, export_model, export_path
+
+# TensorFlow is only imported when a model has to be built or trained, so loading an
+# exported model (see model_export.py) doesn't pay for it
+
+# Candidates the model finds more likely than 2^-MIN_GUESS_BITS are too predictable to offer.
+# The seed characters alone contribute about 33 bits, so this asks the model-generated part
+# for roughly 15 more.
+MIN_GUESS_BITS = 48
 
 class PasswordGenerator:
-    def __init__(self, max_length=12):
+    def __init__(self, max_length=12, seq_length=5, embedding_dim=32, units=64, layers=2, cell="lstm"):
         """
         Initialize the password generator
         max_length: Maximum length of generated passwords
+        seq_length, embedding_dim, units, layers, cell: Model size; see sweep.py for how
+        the configurations compare on training time, latency and quality
         """
+        if cell not in ("lstm", "gru"):
+            raise ValueError("cell must be 'lstm' or 'gru'")
         self.max_length = max_length
         self.model = None
         self.char_to_idx = None
         self.idx_to_char = None
-        self.seq_length = 5  # How many characters to look at to predict the next one
+        self.seq_length = seq_length  # How many characters to look at to predict the next one
+        self.embedding_dim = embedding_dim
+        self.units = units
+        self.layers = layers
+        self.cell = cell
         self.is_trained = False
         
     def download_dataset(self):
@@ -50,16 +67,17 @@ class PasswordGenerator:
                 "mustang123", "superman123", "starwars123", "matrix123,"
             ]
     
+    @traced("recommender.ml.prepare_data")
     def prepare_data(self, passwords):
         """
         Prepare the password data for training
         Creates sequences of characters and their next character predictions
         """
-        # Create character mappings (including special characters)
-        all_chars = set(''.join(passwords) + string.ascii_letters + string.digits + string.punctuation)
-        self.char_to_idx = {c: i+1 for i, c in enumerate(all_chars)}
-        self.char_to_idx['<pad>'] = 0
-        self.idx_to_char = {i: c for c, i in self.char_to_idx.items()}
+        # Create character mappings (including special characters), unless a saved vocabulary was loaded.
+        # Sorted so the same corpus always gives the same mapping.
+        if self.char_to_idx is None:
+            all_chars = sorted(set(''.join(passwords) + string.ascii_letters + string.digits + string.punctuation))
+            self.set_vocabulary({c: i+1 for i, c in enumerate(all_chars)})
         
         # Create training sequences
         sequences = []
@@ -67,6 +85,9 @@ class PasswordGenerator:
         
         for password in passwords:
             for i in range(len(password) - self.seq_length):
+                # Skip windows with characters a loaded vocabulary doesn't know (when fine-tuning)
+                if not all(c in self.char_to_idx for c in password[i:i+self.seq_length+1]):
+                    continue
                 sequences.append(password[i:i+self.seq_length])
                 next_chars.append(password[i+self.seq_length])
         
@@ -81,47 +102,88 @@ class PasswordGenerator:
             
         return X, y
     
+    def get_vocabulary(self):
+        """Character mapping to save alongside the model"""
+        return {c: i for c, i in self.char_to_idx.items() if c != '<pad>'}
+    
+    def set_vocabulary(self, vocabulary):
+        self.char_to_idx = dict(vocabulary)
+        self.char_to_idx['<pad>'] = 0
+        self.idx_to_char = {i: c for c, i in self.char_to_idx.items()}
+    
+    def vocab_size(self):
+        return len(self.char_to_idx)
+    
     def build_model(self, vocab_size):
         """
         Build the neural network model
-        Uses LSTM layers to learn password patterns
-        """
-        model = Sequential([
-            # Convert characters to dense vectors
-            Embedding(vocab_size, 32, input_length=self.seq_length),  # Reduced embedding size for performance
-            # First LSTM layer with dropout to prevent overfitting
-            LSTM(64, return_sequences=True),  # Reduced LSTM units for performance
-            Dropout(0.1),  # dropout to regularise
-            # Second LSTM layer
-            LSTM(64),
-            Dropout(0.1),
-            # Output layer to predict next character
-            Dense(vocab_size, activation='softmax')
-        ])
+        Uses recurrent (LSTM or GRU) layers to learn password patterns
+        """
+        from tensorflow.keras.models import Sequential
+        from tensorflow.keras.layers import GRU, LSTM, Dense, Embedding, Dropout
+        
+        Recurrent = GRU if self.cell == "gru" else LSTM
+        # Convert characters to dense vectors
+        model = Sequential([Embedding(vocab_size, self.embedding_dim, input_length=self.seq_length)])
+        for i in range(self.layers):
+            # Every recurrent layer but the last passes its full sequence on, each followed by dropout to regularise
+            model.add(Recurrent(self.units, return_sequences=i < self.layers - 1))
+            model.add(Dropout(0.1))
+        # Output layer to predict next character
+        model.add(Dense(vocab_size, activation='softmax'))
         
         model.compile(loss='categorical_crossentropy', 
                      optimizer='adam', 
                      metrics=['accuracy'])
         return model
     
-    def train(self, epochs=5, batch_size=64):  # seems to be the decent number for now
+    @traced("recommender.ml.train")
+    def train(self, epochs=5, batch_size=64, run_dir=None):  # seems to be the decent number for now
         """
-        Train the model on password data
-        epochs: Number of training iterations
+        Train the model on password data, or load it if a previous run already trained it
+        epochs: Maximum number of training iterations (stops early once validation loss plateaus)
         batch_size: Number of samples processed before model update
+        run_dir: Where the run's checkpoints and logs are kept (see training_manager.py)
         """
         if self.is_trained:
             print("Model is already trained!")
             return
-            
-        passwords = self.download_dataset()
-        print(f"Training on {len(passwords)} passwords")
         
-        X, y = self.prepare_data(passwords)
-        vocab_size = len(self.char_to_idx)
+        # Fast path: the compact export of a previous run, no TensorFlow needed
+        exported = export_path(run_dir)
+        if os.path.exists(exported):
+            self.load_exported(exported)
+            print(f"Loaded exported model from {exported}")
+            return
+        
+        from training_manager import TrainingManager
+        manager = TrainingManager(self, run_dir=run_dir)
+        if manager.load():
+            print(f"Loaded trained model from {manager.run_dir}")
+        else:
+            manager.train(epochs=epochs, batch_size=batch_size)
         
-        self.model = self.build_model(vocab_size)
-        self.model.fit(X, y, epochs=epochs, batch_size=batch_size, verbose=1)
+        # Export it so the next session can take the fast path
+        try:
+            export_model(self.model, self.get_vocabulary(), exported, seq_length=self.seq_length, max_length=self.max_length)
+        except (OSError, ValueError) as e:
+            print(f"Could not export model: {e}")
+    
+    def load(self, run_dir=None):
+        """
+        Load the model saved by a finished training run. Returns False if there is none.
+        """
+        from training_manager import TrainingManager
+        return TrainingManager(self, run_dir=run_dir).load()
+    
+    def load_exported(self, path=None):
+        """
+        Load a model written by model_export.py (memory-mapped, numpy inference)
+        """
+        model = ExportedModel(path or export_path())
+        self.set_vocabulary(model.vocabulary)
+        self.seq_length = model.seq_length
+        self.model = model
         self.is_trained = True
     
     def is_strong_password(self, password):
@@ -135,6 +197,7 @@ class PasswordGenerator:
             any(c.isdigit() for c in password)  # At least one number
         )
     
+    @traced("recommender.ml.generate_password")
     def generate_password(self, seed=None, temperature=0.7):
         """
         Generate a single password using the trained model
@@ -179,23 +242,116 @@ class PasswordGenerator:
         
         return generated
     
-    def generate_multiple(self, count=5): # testing purposes
+    @traced("recommender.ml.generate_batch")
+    def generate_batch(self, n, temperature=0.7):
+        """
+        Generate n passwords together, the same way as generate_password: each step runs
+        one model.predict over every password that is still growing, instead of one
+        predict per character per password.
+        """
+        if not self.is_trained:
+            raise Exception("Model not trained. Call train() first.")
+        
+        seed_chars = string.ascii_letters + string.digits
+        generated = [[random.choice(seed_chars) for _ in range(self.seq_length)] for _ in range(n)]
+        windows = np.array([[self.char_to_idx.get(c, 0) for c in chars] for chars in generated],
+                           dtype=np.int32).reshape(n, self.seq_length)
+        skipped = [i for i, c in self.idx_to_char.items() if c == '<pad>' or c == ' ']
+        active = np.arange(n) if self.seq_length < self.max_length else np.arange(0)
+        
+        while len(active):
+            preds = self.model.predict(windows[active], verbose=0)
+            
+            # Temperature, then one inverse-CDF draw per password
+            preds = np.exp(np.log(preds + 1e-10) / temperature)
+            cumulative = np.cumsum(preds, axis=1)
+            draws = np.random.random(len(active)) * cumulative[:, -1]
+            next_indices = np.minimum((cumulative < draws[:, None]).sum(axis=1), preds.shape[1] - 1)
+            
+            # Rows that drew a space or padding draw again on the next step
+            keep = ~np.isin(next_indices, skipped)
+            rows, next_indices = active[keep], next_indices[keep]
+            windows[rows] = np.column_stack((windows[rows, 1:], next_indices))
+            for row, index in zip(rows, next_indices):
+                generated[row].append(self.idx_to_char[index])
+            active = np.array([row for row in active if len(generated[row]) < self.max_length], dtype=np.int64)
+        
+        return [''.join(chars) for chars in generated]
+    
+    @traced("recommender.ml.score_passwords")
+    def score_passwords(self, passwords, batch_size=4096):
+        """
+        Log2-likelihood of each password under the model, using one batched forward pass
+        over every context window of every password.
+        The first seq_length characters have no full context window (the generator seeds
+        them at random), so they are scored as uniform over the vocabulary, as are
+        characters the model has never seen.
+        Returns a numpy array; the negated value is the password's guessability in bits.
+        """
+        if not self.is_trained:
+            raise Exception("Model not trained. Call train() first.")
+        
+        uniform = -np.log2(len(self.char_to_idx) - 1)  # Excluding <pad>
+        lengths = np.array([len(p) for p in passwords])
+        scores = np.minimum(lengths, self.seq_length) * uniform
+        if len(passwords) == 0 or lengths.max() <= self.seq_length:
+            return scores
+        
+        # Pad every password to the same length so all windows can be cut out at once
+        codes = np.zeros((len(passwords), lengths.max()), dtype=np.int32)
+        for n, password in enumerate(passwords):
+            codes[n, :len(password)] = [self.char_to_idx.get(c, 0) for c in password]
+        windows = np.lib.stride_tricks.sliding_window_view(codes, self.seq_length, axis=1)[:, :-1]
+        targets = codes[:, self.seq_length:]
+        valid = np.arange(targets.shape[1]) < (lengths - self.seq_length)[:, None]
+        
+        preds = self.model.predict(windows[valid], batch_size=batch_size, verbose=0)
+        target_codes = targets[valid]
+        log_probs = np.log2(preds[np.arange(len(target_codes)), target_codes] + 1e-12)
+        log_probs = np.where(target_codes > 0, log_probs, uniform)
+        
+        owners = np.nonzero(valid)[0]
+        return scores + np.bincount(owners, weights=log_probs, minlength=len(passwords))
+    
+    def guess_bits(self, password):
+        """
+        Guessability of one password in bits: an attacker sampling from this model
+        would need about 2^bits guesses to hit it.
+        """
+        return float(-self.score_passwords([password])[0])
+    
+    @traced("recommender.ml.generate_multiple")
+    def generate_multiple(self, count=5, min_guess_bits=MIN_GUESS_BITS, with_scores=False): # testing purposes
         """
         Generate multiple strong passwords
         count: Number of passwords to generate
+        min_guess_bits: Reject candidates the model finds more predictable than this
+        with_scores: Return (password, guess bits) pairs instead of plain passwords
         """
         passwords = []
         attempts = 0
         max_attempts = count * 10  # set max attempts (note to self: increase or decrease when facing errors)
         
-        print(f"Attempting to generate {count} passwords...")
         while len(passwords) < count and attempts < max_attempts:
-            pwd = self.generate_password()
-            print(f"Generated: {pwd}")  # Debug print
-            if self.is_strong_password(pwd):
-                passwords.append(pwd)
-                print(f"Accepted password: {pwd}")  # Debug print (ignore, debug purposes)
-            attempts += 1
+            # Generate a batch, drop the weak ones, then score the rest in one forward pass
+            batch = self.generate_batch(min(count - len(passwords), max_attempts - attempts))
+            attempts += len(batch)
+            strong = []
+            for pwd in batch:
+                if self.is_strong_password(pwd):
+                    strong.append(pwd)
+                else:
+                    count_event("recommender.ml.rejected")
+            if not strong:
+                continue
+            
+            for pwd, score in zip(strong, self.score_passwords(strong)):
+                bits = float(-score)
+                if bits < min_guess_bits:
+                    count_event("recommender.ml.rejected_predictable")
+                else:
+                    passwords.append((pwd, bits) if with_scores else pwd)
+                    count_event("recommender.ml.accepted")
                 
         return passwords
 
@@ -1,14 +1,17 @@
 import numpy as np
-import pandas as pd
-import tensorflow as tf
-from tensorflow.keras.models import Sequential
-from tensorflow.keras.layers import LSTM, Dense, Embedding, Dropout
-from tensorflow.keras.preprocessing.text import Tokenizer
-from tensorflow.keras.preprocessing.sequence import pad_sequences
 import random
 import string
 import requests
 from io import StringIO
+import os
+import sys
+
+# Make the app's top-level modules importable when this file is run on its own
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from tracing import traced, count as count_event
+from word_index import WordIndex, tokenize, DEFAULT_INDEX_PATH
+
+# TensorFlow is only imported for training; pattern-based generation doesn't need it
 
 class PasswordGenerator:
     def __init__(self, max_length=12):
@@ -18,7 +21,7 @@ class PasswordGenerator:
         """
         self.max_length = max_length
         self.model = None
-        self.tokenizer = Tokenizer()
+        self.tokenizer = None  # Keras Tokenizer, created when training data is prepared
         self.is_trained = False
         
         # Fallback common words if download fails
@@ -31,8 +34,9 @@ class PasswordGenerator:
             "spring", "summer", "autumn", "winter", "day", "night", "sky"
         ]
         
-        # Will be populated from downloaded passwords
+        # Will be populated from downloaded passwords (ranked, most frequent first)
         self.common_words = []
+        self.word_index = None
         
         self.common_numbers = ["123", "456", "789", "111", "222", "333", "444", "555"]
         self.common_special_chars = ["@", "#", "$", "!", "&", "*"]
@@ -64,6 +68,7 @@ class PasswordGenerator:
                 "mustang123", "superman123", "starwars123", "matrix123"
             ]
     
+    @traced("recommender.memorable.prepare_data")
     def prepare_data(self, passwords):
         """
         Prepare the password data for training
@@ -80,40 +85,42 @@ class PasswordGenerator:
                 sequences.append(words[i:i+2])
                 next_words.append(words[i+2])
         
-        # Convert to numerical format for the model
-        self.tokenizer.fit_on_texts(sequences + next_words)
+        # Convert to numerical format for the model (keeping a loaded vocabulary when fine-tuning)
+        if self.tokenizer is None:
+            from tensorflow.keras.preprocessing.text import Tokenizer
+            self.tokenizer = Tokenizer()
+            self.tokenizer.fit_on_texts(sequences + next_words)
         X = self.tokenizer.texts_to_matrix(sequences)
         y = self.tokenizer.texts_to_matrix(next_words)
             
         return X, y
     
+    def get_vocabulary(self):
+        """Tokenizer state to save alongside the model"""
+        return self.tokenizer.to_json()
+    
+    def set_vocabulary(self, vocabulary):
+        from tensorflow.keras.preprocessing.text import tokenizer_from_json
+        self.tokenizer = tokenizer_from_json(vocabulary)
+    
+    def vocab_size(self):
+        return len(self.tokenizer.word_index) + 1
+    
     def split_into_words(self, password):
         """
         Split password into words or meaningful chunks
-        Returns only alphabetic words (no numbers or special characters)
+        Returns only lowercase alphabetic words of 3+ characters (no numbers or special characters)
         """
-        words = []
-        current_word = ""
-        
-        for char in password:
-            if char.isalpha():
-                current_word += char.lower()  # Convert to lowercase for consistency
-            else:
-                if current_word and len(current_word) >= 3:  # Only keep words with 3+ characters
-                    words.append(current_word)
-                    current_word = ""
-                # Don't add non-alphabetic characters to words list
-        
-        if current_word and len(current_word) >= 3:  # Check the last word too
-            words.append(current_word)
-            
-        return words
+        return tokenize(password)
     
     def build_model(self, vocab_size):
         """
         Build the neural network model
         Uses LSTM layers to learn password patterns
         """
+        from tensorflow.keras.models import Sequential
+        from tensorflow.keras.layers import LSTM, Dense, Embedding, Dropout
+        
         model = Sequential([
             Embedding(vocab_size, 32, input_length=2),
             LSTM(64, return_sequences=True),
@@ -128,55 +135,66 @@ class PasswordGenerator:
                      metrics=['accuracy'])
         return model
     
+    @traced("recommender.memorable.extract_common_words")
     def extract_common_words(self, passwords):
         """
-        Extract common words from downloaded passwords
+        Extract common words from downloaded passwords into a frequency-ranked word index
         """
-        all_words = []
-        for password in passwords:
-            words = self.split_into_words(password)
-            all_words.extend(words)
-        
-        # Count word frequencies
-        word_counts = {}
-        for word in all_words:
-            if word in word_counts:
-                word_counts[word] += 1
-            else:
-                word_counts[word] = 1
-        
-        # Sort by frequency and take the top 50 words
-        sorted_words = sorted(word_counts.items(), key=lambda x: x[1], reverse=True)
-        common_words = [word for word, count in sorted_words[:50] if len(word) >= 3]
+        index = WordIndex.build(passwords)
         
         # If we found at least 10 common words, use them; otherwise, use fallback
-        if len(common_words) >= 10:
-            self.common_words = common_words
-            print(f"Extracted {len(common_words)} common words from passwords")
+        if len(index) >= 10:
+            self.word_index = index
+            print(f"Extracted {len(index)} common words from passwords")
         else:
-            self.common_words = self.fallback_words
+            self.word_index = WordIndex.from_words(self.fallback_words)
             print("Using fallback word list")
+        self.common_words = self.word_index.words
+        return self.word_index
     
-    def train(self, epochs=10, batch_size=64):
+    def load_word_index(self, path=DEFAULT_INDEX_PATH):
         """
-        Train the model on password data
+        Load the saved word index, or build it from the dataset and save it for next time
+        """
+        if os.path.exists(path):
+            self.word_index = WordIndex.load(path)
+            self.common_words = self.word_index.words
+            return self.word_index
+        
+        index = self.extract_common_words(self.download_dataset())
+        # Only keep a real corpus; the small offline fallback list is rebuilt next time
+        if len(index) >= 100:
+            index.save(path)
+        return index
+    
+    @traced("recommender.memorable.train")
+    def train(self, epochs=10, batch_size=64, run_dir=None):
+        """
+        Train the model on password data, or load it if a previous run already trained it
+        epochs: Maximum number of training iterations (stops early once validation loss plateaus)
+        run_dir: Where the run's checkpoints and logs are kept (see training_manager.py)
         """
         if self.is_trained:
             print("Model is already trained!")
             return
-            
-        passwords = self.download_dataset()
-        print(f"Training on {len(passwords)} passwords")
-        
-        # Extract common words from passwords
-        self.extract_common_words(passwords)
         
-        X, y = self.prepare_data(passwords)
-        vocab_size = len(self.tokenizer.word_index) + 1
+        # Make sure the word list used for generation is ready too
+        if self.word_index is None:
+            self.load_word_index()
         
-        self.model = self.build_model(vocab_size)
-        self.model.fit(X, y, epochs=epochs, batch_size=batch_size, verbose=1)
-        self.is_trained = True
+        from training_manager import TrainingManager
+        manager = TrainingManager(self, run_dir=run_dir)
+        if manager.load():
+            print(f"Loaded trained model from {manager.run_dir}")
+            return
+        manager.train(epochs=epochs, batch_size=batch_size)
+    
+    def load(self, run_dir=None):
+        """
+        Load the model saved by a finished training run. Returns False if there is none.
+        """
+        from training_manager import TrainingManager
+        return TrainingManager(self, run_dir=run_dir).load()
     
     def is_strong_password(self, password):
         """
@@ -188,6 +206,13 @@ class PasswordGenerator:
             any(c.isdigit() for c in password)  # At least one number
         )
     
+    def random_word(self):
+        """
+        Pick a word, weighted by how often it appears in real passwords
+        """
+        return self.word_index.sample()[0]
+    
+    @traced("recommender.memorable.generate_memorable_password")
     def generate_memorable_password(self):
         """
         Generate a memorable password using common patterns
@@ -195,47 +220,48 @@ class PasswordGenerator:
         # Choose a random pattern
         patterns = [
             # Word + Number + Special
-            lambda: f"{random.choice(self.common_words).capitalize()}{random.choice(self.common_numbers)}{random.choice(self.common_special_chars)}",
+            lambda: f"{self.random_word().capitalize()}{random.choice(self.common_numbers)}{random.choice(self.common_special_chars)}",
             # Word + Word + Number
-            lambda: f"{random.choice(self.common_words).capitalize()}{random.choice(self.common_words)}{random.choice(self.common_numbers)}",
+            lambda: f"{self.random_word().capitalize()}{self.random_word()}{random.choice(self.common_numbers)}",
             # Number + Word + Special
-            lambda: f"{random.choice(self.common_numbers)}{random.choice(self.common_words).capitalize()}{random.choice(self.common_special_chars)}",
+            lambda: f"{random.choice(self.common_numbers)}{self.random_word().capitalize()}{random.choice(self.common_special_chars)}",
             # Word + Special + Number
-            lambda: f"{random.choice(self.common_words).capitalize()}{random.choice(self.common_special_chars)}{random.choice(self.common_numbers)}"
+            lambda: f"{self.random_word().capitalize()}{random.choice(self.common_special_chars)}{random.choice(self.common_numbers)}"
         ]
         
         return random.choice(patterns)()
     
+    @traced("recommender.memorable.generate_multiple")
     def generate_multiple(self, count=5):
         """
         Generate multiple memorable passwords
         """
-        # If common_words is empty, try to populate it from dataset passwords
-        if not self.common_words:
+        # If there is no word index yet, load the saved one or build it from dataset passwords
+        if self.word_index is None:
             try:
-                passwords = self.download_dataset()
-                self.extract_common_words(passwords)
+                self.load_word_index()
             except Exception as e:
-                print(f"Error downloading passwords: {e}")
-                self.common_words = self.fallback_words
+                print(f"Error loading word index: {e}")
         
         # If still empty, use fallback
-        if not self.common_words:
-            self.common_words = self.fallback_words
+        if not self.word_index:
+            self.word_index = WordIndex.from_words(self.fallback_words)
+            self.common_words = self.word_index.words
             print("Using fallback word list for password generation")
         
         passwords = []
         attempts = 0
         max_attempts = count * 5
         
-        print(f"Generating {count} memorable passwords...")
         while len(passwords) < count and attempts < max_attempts:
             pwd = self.generate_memorable_password()
             # Ensure no spaces in the password
             pwd = pwd.replace(" ", "")
             if self.is_strong_password(pwd):
                 passwords.append(pwd)
-                print(f"Generated: {pwd}")
+                count_event("recommender.memorable.accepted")
+            else:
+                count_event("recommender.memorable.rejected")
             attempts += 1
                 
         return passwords
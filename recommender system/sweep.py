@@ -0,0 +1,159 @@
+"""
+Offline sweep over ML model sizes, to pick the production configuration on evidence.
+
+Every combination of the given settings is trained (with early stopping, see
+training_manager.py) on the same local corpus and measured for:
+
+    train_s            wall-clock training time
+    ms_per_char        median latency of one next-character prediction (batch of 1)
+    params, size_kb    parameter count and float32 weight size
+    val_loss           best validation loss
+    strong_rate        share of sampled passwords passing is_strong_password
+    accept_rate        share that also clears MIN_GUESS_BITS, i.e. what generate_multiple keeps
+
+The results are printed as a table sorted by latency, with Pareto-optimal rows (no other
+configuration is both faster and better on validation loss) marked with "*", and saved as JSON.
+
+    python sweep.py --corpus passwords.txt --embedding 16,32 --units 32,64,128 --layers 1,2 --cells lstm,gru --seq-lengths 4,5,6
+"""
+
+import argparse
+import contextlib
+import io
+import itertools
+import json
+import os
+import statistics
+import tempfile
+import time
+
+import numpy as np
+
+from recommender_system import PasswordGenerator, MIN_GUESS_BITS
+from training_manager import TrainingManager
+
+
+def config_name(config):
+    return "{cell}-L{layers}-U{units}-E{embedding_dim}-S{seq_length}".format(**config)
+
+
+def parse_list(text, cast=int):
+    return [cast(v) for v in text.split(",") if v.strip()]
+
+
+def load_corpus(path=None, max_length=15):
+    """Passwords from `path`, or the saved corpus of the production run, or a fresh download."""
+    if path is None:
+        saved = os.path.join(os.path.dirname(os.path.abspath(__file__)), "runs", "ml", "corpus.txt")
+        path = saved if os.path.exists(saved) else None
+    if path is None:
+        return PasswordGenerator(max_length=max_length).download_dataset()
+    with open(path, encoding="utf-8", errors="ignore") as f:
+        return [p for p in f.read().splitlines() if 6 <= len(p) <= max_length]
+
+
+def measure_latency(generator, repeat=200):
+    """Median milliseconds for one next-character prediction, as generate_password makes them."""
+    x = np.zeros((1, generator.seq_length))
+    generator.model.predict(x, verbose=0)  # Warm up
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        generator.model.predict(x, verbose=0)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def acceptance(generator, samples):
+    """Sample passwords and apply generate_multiple's acceptance rules."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        candidates = [generator.generate_password() for _ in range(samples)]
+    strong = [p for p in candidates if generator.is_strong_password(p)]
+    accepted = 0
+    if strong:
+        accepted = int(np.sum(-generator.score_passwords(strong) >= MIN_GUESS_BITS))
+    return len(strong) / samples, accepted / samples
+
+
+def run_config(config, passwords, workdir, epochs, patience, samples, max_length=15):
+    generator = PasswordGenerator(max_length=max_length, **config)
+    manager = TrainingManager(generator, run_dir=os.path.join(workdir, config_name(config)))
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        manager.train(passwords, epochs=epochs, patience=patience, resume=False, verbose=0)
+    train_seconds = time.perf_counter() - start
+
+    val_losses = [e["val_loss"] for e in manager.read_log() if "val_loss" in e]
+    params = generator.model.count_params()
+    strong_rate, accept_rate = acceptance(generator, samples)
+    return dict(
+        config,
+        name=config_name(config),
+        epochs=len(val_losses),
+        train_s=train_seconds,
+        ms_per_char=measure_latency(generator),
+        params=params,
+        size_kb=params * 4 / 1024,
+        val_loss=min(val_losses) if val_losses else float("nan"),
+        strong_rate=strong_rate,
+        accept_rate=accept_rate,
+    )
+
+
+def mark_pareto(results):
+    """Flag results that no other result beats on both latency and validation loss."""
+    for r in results:
+        r["pareto"] = not any(
+            o is not r and o["ms_per_char"] <= r["ms_per_char"] and o["val_loss"] <= r["val_loss"]
+            and (o["ms_per_char"] < r["ms_per_char"] or o["val_loss"] < r["val_loss"])
+            for o in results
+        )
+    return results
+
+
+def print_table(results):
+    print(f"  {'config':<24} {'epochs':>6} {'train s':>8} {'ms/char':>8} {'params':>8} {'KB':>7} "
+          f"{'val loss':>9} {'strong':>7} {'accept':>7}")
+    for r in sorted(results, key=lambda r: r["ms_per_char"]):
+        print(f"{'*' if r['pareto'] else ' '} {r['name']:<24} {r['epochs']:>6} {r['train_s']:>8.1f} {r['ms_per_char']:>8.2f} "
+              f"{r['params']:>8,} {r['size_kb']:>7.0f} {r['val_loss']:>9.4f} {r['strong_rate']:>7.1%} {r['accept_rate']:>7.1%}")
+    print("* = Pareto-optimal (nothing else is both faster and lower validation loss)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep ML model sizes for latency versus quality")
+    parser.add_argument("--corpus", help="Password list (default: the production run's corpus or a download)")
+    parser.add_argument("--embedding", default="16,32,64")
+    parser.add_argument("--units", default="32,64,128")
+    parser.add_argument("--layers", default="1,2")
+    parser.add_argument("--cells", default="lstm,gru")
+    parser.add_argument("--seq-lengths", default="5")
+    parser.add_argument("--epochs", type=int, default=20)
+    parser.add_argument("--patience", type=int, default=3)
+    parser.add_argument("--samples", type=int, default=50, help="Passwords sampled per config for acceptance rates")
+    parser.add_argument("--output", default="sweep_results.json")
+    args = parser.parse_args()
+
+    passwords = load_corpus(args.corpus)
+    grid = [
+        dict(cell=cell, layers=layers, units=units, embedding_dim=embedding, seq_length=seq_length)
+        for cell, layers, units, embedding, seq_length in itertools.product(
+            parse_list(args.cells, str), parse_list(args.layers), parse_list(args.units),
+            parse_list(args.embedding), parse_list(args.seq_lengths))
+    ]
+    print(f"Sweeping {len(grid)} configurations on {len(passwords)} passwords")
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix="pmrs_sweep_") as workdir:
+        for i, config in enumerate(grid, 1):
+            print(f"[{i}/{len(grid)}] {config_name(config)}", flush=True)
+            results.append(run_config(config, passwords, workdir, args.epochs, args.patience, args.samples))
+
+    print_table(mark_pareto(results))
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({"corpus_size": len(passwords), "results": results}, f, indent=2)
+    print(f"Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+"""
+Training runs for the recommender models.
+
+A TrainingManager wraps a PasswordGenerator (either module) and keeps everything about its
+training in one run directory, so a model is trained once and reused by later sessions:
+
+    corpus.txt          the passwords the run trains on (reused when resuming)
+    vocab.json          the generator's vocabulary, needed to load the model again
+    best.h5             weights with the lowest validation loss so far
+    last.h5, state.json the latest epoch, for resuming an interrupted run
+    training_log.json   loss, accuracy, seconds and samples/second for every epoch
+
+Training holds out a shuffled validation split, checkpoints the best weights, and stops
+once validation loss hasn't improved for `patience` epochs. fine_tune() continues from the
+best saved model on a new corpus with a lower learning rate instead of retraining.
+
+The generator only needs prepare_data, build_model, download_dataset, vocab_size and
+get_vocabulary/set_vocabulary.
+"""
+
+import json
+import os
+import time
+
+import numpy as np
+from tensorflow.keras.callbacks import Callback, EarlyStopping, ModelCheckpoint
+from tensorflow.keras.models import load_model
+from tensorflow.keras.optimizers import Adam
+
+from model_export import remove_exports
+from tracing import span
+
+RUNS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "runs")
+
+
+class EpochRecorder(Callback):
+    """Logs timing and throughput per epoch and saves what is needed to resume."""
+
+    def __init__(self, manager, phase, samples):
+        super().__init__()
+        self.manager = manager
+        self.phase = phase
+        self.samples = samples
+        self.started = None
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self.started = time.perf_counter()
+
+    def on_epoch_end(self, epoch, logs=None):
+        seconds = time.perf_counter() - self.started
+        entry = {
+            "phase": self.phase,
+            "epoch": epoch + 1,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "seconds": round(seconds, 3),
+            "samples_per_second": round(self.samples / seconds, 1) if seconds else None,
+        }
+        entry.update({key: float(value) for key, value in (logs or {}).items()})
+        self.manager.append_log(entry)
+
+        if self.phase == "train":
+            self.model.save(self.manager.last_path)
+            state = self.manager.read_state()
+            best = state.get("best_val_loss")
+            val_loss = entry.get("val_loss")
+            if val_loss is not None and (best is None or val_loss < best):
+                state["best_val_loss"] = val_loss
+            state["epoch"] = epoch + 1
+            self.manager.write_state(state)
+
+
+class TrainingManager:
+    def __init__(self, generator, name=None, run_dir=None):
+        self.generator = generator
+        if name is None:
+            name = "memorable" if hasattr(generator, "tokenizer") else "ml"
+        self.run_dir = run_dir or os.path.join(RUNS_DIR, name)
+        self.corpus_path = os.path.join(self.run_dir, "corpus.txt")
+        self.vocab_path = os.path.join(self.run_dir, "vocab.json")
+        self.best_path = os.path.join(self.run_dir, "best.h5")
+        self.last_path = os.path.join(self.run_dir, "last.h5")
+        self.state_path = os.path.join(self.run_dir, "state.json")
+        self.log_path = os.path.join(self.run_dir, "training_log.json")
+
+    # --- run files ---
+
+    def read_state(self):
+        if not os.path.exists(self.state_path):
+            return {}
+        with open(self.state_path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def write_state(self, state):
+        self._write_json(self.state_path, state)
+
+    def read_log(self):
+        if not os.path.exists(self.log_path):
+            return []
+        with open(self.log_path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def append_log(self, entry):
+        log = self.read_log()
+        log.append(entry)
+        self._write_json(self.log_path, log)
+
+    def _write_json(self, path, value):
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(value, f, indent=2)
+        os.replace(tmp_path, path)
+
+    def _save_corpus(self, passwords):
+        with open(self.corpus_path, "w", encoding="utf-8") as f:
+            f.writelines(p + "\n" for p in passwords)
+
+    def _load_corpus(self):
+        with open(self.corpus_path, encoding="utf-8") as f:
+            return f.read().splitlines()
+
+    def _load_vocabulary(self):
+        with open(self.vocab_path, encoding="utf-8") as f:
+            self.generator.set_vocabulary(json.load(f))
+
+    # --- loading ---
+
+    def has_trained_model(self):
+        return self.read_state().get("completed", False) and os.path.exists(self.best_path)
+
+    def load(self):
+        """Load the best model of a finished run into the generator. Returns False if there is none."""
+        if not self.has_trained_model():
+            return False
+        with span("recommender.training.load"):
+            self._load_vocabulary()
+            self.generator.model = load_model(self.best_path)
+            # Character models depend on the window length they were trained with
+            if hasattr(self.generator, "seq_length") and self.generator.model.input_shape[1]:
+                self.generator.seq_length = self.generator.model.input_shape[1]
+            self.generator.is_trained = True
+        return True
+
+    # --- training ---
+
+    def _split(self, X, y, validation_split, seed):
+        """Shuffle once with a fixed seed (so a resumed run sees the same split) and hold out the tail."""
+        order = np.random.default_rng(seed).permutation(len(X))
+        held_out = max(1, int(len(X) * validation_split))
+        train, val = order[:-held_out], order[-held_out:]
+        return X[train], y[train], X[val], y[val]
+
+    def train(self, passwords=None, epochs=20, batch_size=64, validation_split=0.1, patience=3, resume=True, verbose=1):
+        """
+        Train with early stopping, resuming an interrupted run in run_dir if there is one.
+        passwords: Training corpus; downloaded by the generator when not given
+        epochs: Upper limit on epochs (training usually stops earlier)
+        """
+        state = self.read_state() if resume else {}
+        if state.get("completed"):
+            return self.load()
+
+        os.makedirs(self.run_dir, exist_ok=True)
+        if state and os.path.exists(self.last_path):
+            # Resume with the same corpus, vocabulary and validation split
+            print(f"Resuming training from epoch {state['epoch']}")
+            passwords = self._load_corpus()
+            self._load_vocabulary()
+            X, y = self.generator.prepare_data(passwords)
+            model = load_model(self.last_path)
+            initial_epoch = state["epoch"]
+        else:
+            passwords = passwords if passwords is not None else self.generator.download_dataset()
+            print(f"Training on {len(passwords)} passwords")
+            for path in (self.best_path, self.last_path, self.log_path):
+                if os.path.exists(path):
+                    os.remove(path)
+            remove_exports(self.run_dir)
+            self._save_corpus(passwords)
+            X, y = self.generator.prepare_data(passwords)
+            self._write_json(self.vocab_path, self.generator.get_vocabulary())
+            model = self.generator.build_model(self.generator.vocab_size())
+            state = {"epoch": 0, "seed": int(np.random.default_rng().integers(2 ** 31)), "best_val_loss": None}
+            self.write_state(state)
+            initial_epoch = 0
+
+        X_train, y_train, X_val, y_val = self._split(X, y, validation_split, state["seed"])
+        best = state.get("best_val_loss")
+        callbacks = [
+            ModelCheckpoint(self.best_path, monitor="val_loss", save_best_only=True,
+                            initial_value_threshold=best if best is not None else np.inf),
+            EarlyStopping(monitor="val_loss", patience=patience, restore_best_weights=True),
+            EpochRecorder(self, "train", len(X_train)),
+        ]
+        with span("recommender.training.train"):
+            model.fit(X_train, y_train, validation_data=(X_val, y_val), epochs=epochs,
+                      initial_epoch=initial_epoch, batch_size=batch_size, callbacks=callbacks, verbose=verbose)
+
+        state = self.read_state()
+        state["completed"] = True
+        self.write_state(state)
+        if os.path.exists(self.last_path):
+            os.remove(self.last_path)
+        return self.load()
+
+    def fine_tune(self, passwords, epochs=5, batch_size=64, learning_rate=1e-4, validation_split=0.1, patience=2):
+        """
+        Continue training the saved best model on a new corpus, keeping its vocabulary.
+        The saved model is only replaced if fine-tuning improves validation loss on the new corpus.
+        """
+        if not self.load():
+            raise FileNotFoundError(f"No trained model in {self.run_dir}; train one first")
+        X, y = self.generator.prepare_data(passwords)
+        if len(X) < 2:
+            raise ValueError("The new corpus is too small to fine-tune on")
+        X_train, y_train, X_val, y_val = self._split(X, y, validation_split, seed=0)
+
+        model = self.generator.model
+        model.compile(loss="categorical_crossentropy", optimizer=Adam(learning_rate=learning_rate), metrics=["accuracy"])
+        baseline = model.evaluate(X_val, y_val, verbose=0)[0]
+        callbacks = [
+            ModelCheckpoint(self.best_path, monitor="val_loss", save_best_only=True, initial_value_threshold=baseline),
+            EarlyStopping(monitor="val_loss", patience=patience, restore_best_weights=True),
+            EpochRecorder(self, "fine_tune", len(X_train)),
+        ]
+        with span("recommender.training.fine_tune"):
+            model.fit(X_train, y_train, validation_data=(X_val, y_val), epochs=epochs,
+                      batch_size=batch_size, callbacks=callbacks, verbose=1)
+        # Exports are made from the old weights; they are re-exported on next use
+        remove_exports(self.run_dir)
+        return self.load()
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Train, resume or fine-tune a recommender model")
+    parser.add_argument("model", choices=["ml", "memorable"])
+    parser.add_argument("action", choices=["train", "fine-tune", "log"])
+    parser.add_argument("corpus", nargs="?", help="Password list, one per line (required for fine-tune)")
+    parser.add_argument("--run-dir")
+    parser.add_argument("--epochs", type=int, default=20)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--patience", type=int, default=3)
+    parser.add_argument("--fresh", action="store_true", help="Start over instead of resuming")
+    args = parser.parse_args()
+
+    if args.model == "ml":
+        from recommender_system import PasswordGenerator
+    else:
+        from recommender_system_memorable import PasswordGenerator
+    manager = TrainingManager(PasswordGenerator(max_length=15), name=args.model, run_dir=args.run_dir)
+
+    if args.action == "log":
+        for entry in manager.read_log():
+            print(json.dumps(entry))
+        return
+
+    passwords = None
+    if args.corpus:
+        with open(args.corpus, encoding="utf-8", errors="ignore") as f:
+            passwords = [p for p in f.read().splitlines() if p]
+    if args.action == "train":
+        manager.train(passwords, epochs=args.epochs, batch_size=args.batch_size,
+                      patience=args.patience, resume=not args.fresh)
+    else:
+        if passwords is None:
+            parser.error("fine-tune needs a corpus file")
+        manager.fine_tune(passwords, epochs=args.epochs, batch_size=args.batch_size)
+    print(f"Model saved in {manager.run_dir}")
+
+
+if __name__ == "__main__":
+    main()
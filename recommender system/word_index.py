@@ -0,0 +1,107 @@
+"""
+Word-frequency index for the memorable password generator.
+
+The index is built once from a password corpus: every run of 3+ letters is lowercased
+and counted with a single regex pass over the whole corpus, and the top words are kept
+in rank order. It is saved as a small tab-separated file (word, count) that loads in a
+few milliseconds, so new generator instances don't need to download or re-count anything.
+
+    python word_index.py passwords.txt [more.txt ...] --top-k 5000
+    python word_index.py --download          # build from the SecLists 10k corpus
+"""
+
+import argparse
+import os
+import re
+import secrets
+from collections import Counter
+from itertools import accumulate
+
+# Runs of 3+ letters (any alphabet), the same words split_into_words used to keep
+WORD_PATTERN = re.compile(r"[^\W\d_]{3,}")
+
+DEFAULT_INDEX_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "word_frequencies.tsv")
+DEFAULT_TOP_K = 5000
+HEADER = "# pmrs word index v1: word<TAB>count, most frequent first"
+
+_system_random = secrets.SystemRandom()
+
+
+def tokenize(password):
+    """Return the lowercase words (3+ letters) found in one password."""
+    return WORD_PATTERN.findall(password.lower())
+
+
+class WordIndex:
+    def __init__(self, ranked):
+        """ranked: list of (word, count) pairs, most frequent first."""
+        self.words = [word for word, _ in ranked]
+        self.counts = [count for _, count in ranked]
+        # Cumulative weights let random.choices skip re-summing on every draw
+        self.cum_weights = list(accumulate(self.counts))
+
+    def __len__(self):
+        return len(self.words)
+
+    @classmethod
+    def build(cls, passwords, top_k=DEFAULT_TOP_K):
+        """Count words across the corpus and keep the top_k."""
+        # One findall over the joined corpus instead of a Python loop per character
+        corpus = "\n".join(passwords).lower()
+        counter = Counter(WORD_PATTERN.findall(corpus))
+        return cls(counter.most_common(top_k))
+
+    @classmethod
+    def from_words(cls, words):
+        """An index where every word is equally likely (used for the fallback list)."""
+        return cls([(word, 1) for word in words])
+
+    @classmethod
+    def load(cls, path=DEFAULT_INDEX_PATH):
+        ranked = []
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("#") or not line.strip():
+                    continue
+                word, count = line.rstrip("\n").split("\t")
+                ranked.append((word, int(count)))
+        return cls(ranked)
+
+    def save(self, path=DEFAULT_INDEX_PATH):
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(HEADER + "\n")
+            f.writelines(f"{word}\t{count}\n" for word, count in zip(self.words, self.counts))
+        os.replace(tmp_path, path)
+
+    def sample(self, k=1):
+        """Draw k words, weighted by how often they appear in the corpus."""
+        return _system_random.choices(self.words, cum_weights=self.cum_weights, k=k)
+
+    def top(self, n):
+        return self.words[:n]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the memorable generator's word-frequency index")
+    parser.add_argument("files", nargs="*", help="Password lists, one password per line")
+    parser.add_argument("--download", action="store_true", help="Use the corpus the generator downloads")
+    parser.add_argument("--top-k", type=int, default=DEFAULT_TOP_K)
+    parser.add_argument("--output", default=DEFAULT_INDEX_PATH)
+    args = parser.parse_args()
+
+    passwords = []
+    for name in args.files:
+        with open(name, encoding="utf-8", errors="ignore") as f:
+            passwords.extend(f.read().splitlines())
+    if args.download or not args.files:
+        from recommender_system_memorable import PasswordGenerator
+        passwords.extend(PasswordGenerator(max_length=15).download_dataset())
+
+    index = WordIndex.build(passwords, args.top_k)
+    index.save(args.output)
+    print(f"Saved {len(index)} words from {len(passwords)} passwords to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Bulk rotation of stale passwords.
+
+A rotation runs in three steps, so nothing is written until the user has seen it:
+
+    rotation = plan_rotation(db, threshold_days=90)     # pick stale rows, generate replacements
+    apply_rotation(db, rotation, master_password)       # encrypt and write them in one transaction
+    undo_rotation(db, rotation)                         # put the old passwords back, also in one transaction
+
+New passwords come from generator_core (the same generator as the Password Generator
+screen) unless a generate_fn is given; the recommender engines' generate_multiple(count)
+and PassphraseGenerator fit the same (count -> list of passwords) shape.
+
+Applying and undoing check that every row still holds the password seen when the plan was
+made, so a row edited in the meantime aborts the whole step instead of being overwritten.
+
+RotationWorker runs any of these steps on a background thread with its own connection,
+so the GUI can rotate thousands of entries without blocking Tk.
+"""
+
+from background import DatabaseWorker
+from database import RECOMMENDED_AFTER_DAYS, decrypt_or_raw
+from generator_core import generate_batch
+from tracing import traced
+from utils import encrypt_many
+from vault_service import DEFAULT_ROTATION_POLICY
+
+
+class RotationItem:
+    def __init__(self, password_id, site, last_updated, status, old_encrypted, new_password):
+        self.password_id = password_id
+        self.site = site
+        self.last_updated = last_updated
+        self.status = status
+        self.old_encrypted = old_encrypted
+        self.new_password = new_password
+        self.new_encrypted = None  # Set once applied
+
+
+class Rotation:
+    """A previewed set of replacements, applied and undone as a whole."""
+
+    def __init__(self, items):
+        self.items = items
+        self.applied = False
+
+    def __len__(self):
+        return len(self.items)
+
+
+@traced("rotation.plan")
+def plan_rotation(db, threshold_days=RECOMMENDED_AFTER_DAYS, policy=None, limit=None, generate_fn=None,
+                  master_password=None):
+    """
+    Pick the entries older than `threshold_days` and generate a replacement for each.
+    Nothing is written and no existing password is decrypted; with `master_password`, the
+    picked entries' site names are, for the preview.
+    """
+    rows = db.stale_rows(threshold_days, limit)
+    if generate_fn is None:
+        policy = policy or DEFAULT_ROTATION_POLICY
+        generate_fn = lambda count: generate_batch(policy, count)
+    new_passwords = generate_fn(len(rows)) if rows else []
+    if len(new_passwords) < len(rows):
+        raise ValueError(f"Only {len(new_passwords)} of {len(rows)} replacement passwords were generated")
+    if master_password is not None:
+        rows = [(id_, decrypt_or_raw(site, master_password), *rest) for id_, site, *rest in rows]
+    return Rotation([
+        RotationItem(id_, site, last_updated, status, encrypted, new_password)
+        for (id_, site, encrypted, last_updated, status), new_password in zip(rows, new_passwords)
+    ])
+
+
+@traced("rotation.apply")
+def apply_rotation(db, rotation, master_password):
+    """Encrypt the new passwords and write them all in one transaction. Returns the number rotated."""
+    if rotation.applied:
+        raise ValueError("This rotation has already been applied")
+    encrypted = encrypt_many([item.new_password for item in rotation.items], master_password)
+    db.replace_passwords(
+        (item.password_id, item.old_encrypted, new) for item, new in zip(rotation.items, encrypted)
+    )
+    for item, new in zip(rotation.items, encrypted):
+        item.new_encrypted = new
+    rotation.applied = True
+    return len(rotation)
+
+
+@traced("rotation.undo")
+def undo_rotation(db, rotation):
+    """Restore the passwords, dates and statuses from before apply_rotation."""
+    if not rotation.applied:
+        raise ValueError("This rotation has not been applied")
+    db.restore_passwords(
+        (item.password_id, item.new_encrypted, item.old_encrypted, item.last_updated, item.status)
+        for item in rotation.items
+    )
+    rotation.applied = False
+    return len(rotation)
+
+
+# Runs a rotation step (e.g. RotationWorker(db_name, apply_rotation, rotation, master_password))
+RotationWorker = DatabaseWorker
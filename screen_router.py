@@ -0,0 +1,149 @@
+import importlib
+from timeout_manager import TimeoutManager
+from profiles import ProfileManager
+from tracing import span
+from utils import clear_key_cache
+
+# name -> (module, class, keep the built screen cached between visits)
+# Only screens used after unlocking are cached; they are evicted again on logout or timeout.
+SCREENS = {
+    "profiles": ("screens.profile_screen", "ProfileScreen", False),
+    "consent": ("screens.consent_screen", "ConsentScreen", False),
+    "setup": ("screens.setup_screen", "SetupScreen", False),
+    "login": ("screens.login_screen", "LoginScreen", False),
+    "recovery": ("screens.recovery_screen", "RecoveryScreen", False),
+    "backup_key": ("screens.backup_key_screen", "BackupKeyScreen", False),
+    "home": ("screens.home_screen", "HomeScreen", True),
+    "vault": ("screens.password_vault", "PasswordVault", True),
+    "generator": ("screens.password_generator", "PasswordGenerator", True),
+    "recommender": ("screens.recommender_screen", "RecommenderScreen", True),
+}
+
+# Screens likely to be opened next, built in the background while the user is idle.
+# The recommender is left out on purpose: importing TensorFlow would stall the UI.
+PREWARM = {
+    "home": ["vault", "generator"],
+}
+
+# How long the UI must stay quiet before prewarming the next screen
+PREWARM_DELAY_MS = 300
+
+DEFAULT_PACK_OPTIONS = {"padx": 20, "pady": 20}
+
+class ScreenRouter:
+    """
+    Owns the lifecycle of every screen.
+
+    Cached screens are hidden with pack_forget() and shown again with pack(), so going
+    back and forth between home, vault, generator and recommender does not rebuild
+    widgets, reload images or reopen the database. On re-entry the router calls the
+    screen's optional on_show() hook to refresh its data, and before hiding it the
+    optional on_hide() hook, so a hidden screen can stop its timers.
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(ScreenRouter, cls).__new__(cls)
+            cls._instance.root = None
+            cls._instance.current = None
+            cls._instance.current_name = None
+            cls._instance.cache = {}
+            cls._instance.session_args = ()  # Arguments the cached screens were built with
+            cls._instance._prewarm_id = None
+        return cls._instance
+
+    def set_root(self, root):
+        self.root = root
+
+    def show(self, name, *args):
+        """Show a screen, building it only if it is not cached yet."""
+        self._cancel_prewarm()
+        module_name, class_name, cached = SCREENS[name]
+        if cached and args:
+            self.session_args = args
+
+        self._hide_current()
+
+        screen = self.cache.get(name)
+        if screen is None:
+            screen = self._build(name, *args)
+
+        self.root.title(getattr(screen, "title", class_name))
+        screen.frame.pack(**getattr(screen, "pack_options", DEFAULT_PACK_OPTIONS))
+        self.current = screen
+        self.current_name = name
+        TimeoutManager().set_current_screen(screen)
+
+        if hasattr(screen, "on_show"):
+            with span(f"ui.refresh.{name}"):
+                screen.on_show()
+
+        if name in PREWARM:
+            self._schedule_prewarm(list(PREWARM[name]))
+        return screen
+
+    def lock(self):
+        """Drop every cached (unlocked) screen and return to the login screen."""
+        self._cancel_prewarm()
+        if self.current is not None and self.current_name not in self.cache:
+            self.current.frame.destroy()
+        self.current = None
+        self.current_name = None
+        for name in list(self.cache):
+            self.evict(name)
+        self.session_args = ()
+        ProfileManager().lock_all()
+        clear_key_cache()
+        return self.show("login")
+
+    def evict(self, name):
+        """Destroy a cached screen so it is rebuilt on the next visit."""
+        screen = self.cache.pop(name, None)
+        if screen is None:
+            return
+        if hasattr(screen, "on_evict"):
+            screen.on_evict()
+        screen.frame.destroy()
+        if self.current is screen:
+            self.current = None
+            self.current_name = None
+
+    def _build(self, name, *args):
+        module_name, class_name, cached = SCREENS[name]
+        with span(f"ui.build.{name}"):
+            screen_class = getattr(importlib.import_module(module_name), class_name)
+            screen = screen_class(self.root, *args)
+        if cached:
+            self.cache[name] = screen
+        return screen
+
+    def _hide_current(self):
+        if self.current is None:
+            return
+        if hasattr(self.current, "on_hide"):
+            self.current.on_hide()
+        if self.current_name in self.cache:
+            self.current.frame.pack_forget()
+        else:
+            self.current.frame.destroy()
+        self.current = None
+        self.current_name = None
+
+    def _schedule_prewarm(self, names):
+        names = [n for n in names if n not in self.cache]
+        if names:
+            self._prewarm_id = self.root.after(PREWARM_DELAY_MS, lambda: self._prewarm(names))
+
+    def _prewarm(self, names):
+        self._prewarm_id = None
+        # Build one screen per idle slot so a click in between is never delayed by more than one build
+        name = names.pop(0)
+        if name not in self.cache and self.session_args:
+            self._build(name, *self.session_args)
+        self._schedule_prewarm(names)
+
+    def _cancel_prewarm(self):
+        if self._prewarm_id is not None:
+            self.root.after_cancel(self._prewarm_id)
+            self._prewarm_id = None
@@ -1,13 +1,19 @@
 import customtkinter as ctk
 import pyperclip
+from screen_router import ScreenRouter
 
 class BackupKeyScreen:
+    # Shown by the ScreenRouter, which sets the window title and packs the frame
+    title = "Backup Key"
+    pack_options = {"fill": "both", "expand": True}
+
     def __init__(self, root, master_password, backup_key):
         self.root = root
         self.master_password = master_password
         self.backup_key = backup_key
+        self.router = ScreenRouter()
+
         self.frame = ctk.CTkFrame(root)
-        self.frame.pack(fill="both", expand=True)
         
         # Create UI elements
         self.create_widgets()
@@ -86,6 +92,4 @@ class BackupKeyScreen:
         self.feedback_label.configure(text="Backup key copied to clipboard!")
         
     def continue_to_home(self):
-        self.frame.destroy()
-        from screens.home_screen import HomeScreen
-        HomeScreen(self.root, self.master_password)
\ No newline at end of file
+        self.router.show("home", self.master_password)
\ No newline at end of file
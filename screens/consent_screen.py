@@ -1,4 +1,5 @@
 import customtkinter as ctk
+from screen_router import ScreenRouter
 from utils import toggle_theme
 import sys
 
@@ -6,13 +7,18 @@ import sys
 this is the consent screen for the application, it is the first screen that the user sees before getting access to the app.
 """
 class ConsentScreen:
+    # Shown by the ScreenRouter, which sets the window title and packs the frame
+    title = "Privacy Consent"
+    # No vault exists yet, so there is nothing to lock
+    locks_on_timeout = False
+    pack_options = {"padx": 20, "pady": 20, "expand": True}
+
     def __init__(self, root):
         self.root = root
-        self.root.title("Privacy Consent")
+        self.router = ScreenRouter()
         
         # Set up CTkFrame
         self.frame = ctk.CTkFrame(root)
-        self.frame.pack(padx=20, pady=20, expand=True)
         
         # Configure grid to center content
         self.frame.grid_columnconfigure(0, weight=1)
@@ -85,9 +91,7 @@ class ConsentScreen:
 
     def on_agree(self):
         """User agreed to the consent, proceed to setup screen."""
-        self.frame.destroy()
-        from .setup_screen import SetupScreen
-        screen = SetupScreen(self.root)
+        self.router.show("setup")
 
     def on_disagree(self):
         """User disagreed with the consent, close the application."""
@@ -1,18 +1,24 @@
 import customtkinter as ctk
+from screen_router import ScreenRouter
 from PIL import Image  # Import Image from Pillow
 import os
 from utils import toggle_theme
 from timeout_manager import TimeoutManager
+from database import STATUS_RECOMMENDED, STATUS_VERY_IMPORTANT
+from profiles import ProfileManager
 
 class HomeScreen:
+    # Shown by the ScreenRouter, which sets the window title and packs the frame
+    title = "Home"
+
     def __init__(self, root, master_password):
         self.root = root
-        self.root.title("Home")
+        self.router = ScreenRouter()
         self.master_password = master_password  # Store the master password
+        self.db = ProfileManager().database()
         
         # Initialize timeout manager
         self.timeout_manager = TimeoutManager()
-        self.timeout_manager.set_current_screen(self)
         
         # Load the image using PIL and wrap it with CTkImage
         self.genImg = ctk.CTkImage(
@@ -35,7 +41,6 @@ class HomeScreen:
         
         # Use CTkFrame instead of tk.Frame
         self.frame = ctk.CTkFrame(root)
-        self.frame.pack(padx=20, pady=20)
 
         # Theme toggle button in top-right corner
         self.theme_button = ctk.CTkButton(
@@ -70,41 +75,44 @@ class HomeScreen:
         # Recommender System Button
         ctk.CTkButton(self.frame, text="Recommender System", image=self.rsImg,
                       command=self.open_recommender, width=150, height=70).grid(row=2, column=0, columnspan=2, pady=10)
-        
-        # Bind mouse movement to update activity
-        self.frame.bind("<Motion>", self.update_activity)
-        self.frame.bind("<Button-1>", self.update_activity)
-        self.frame.bind("<Key>", self.update_activity)
+
+        # Stale password summary, refreshed every time the screen is shown
+        self.stale_label = ctk.CTkLabel(self.frame, text="", font=("Arial", 12))
+        self.stale_label.grid(row=3, column=0, columnspan=2, pady=(0, 10))
+
+    def on_show(self):
+        """Called by the router every time home is shown: update the stale password counts."""
+        # Only read here: unlock and the StatusRefresher thread keep the statuses current, and a
+        # write on the Tk thread could wait out the busy timeout while another process holds the lock
+        counts = self.db.count_by_status()
+        very_important = counts.get(STATUS_VERY_IMPORTANT, 0)
+        stale = counts.get(STATUS_RECOMMENDED, 0) + very_important
+        if stale == 0:
+            self.stale_label.configure(text="All passwords are up to date", text_color="green")
+        else:
+            self.stale_label.configure(
+                text=f"{stale} password{'s' if stale != 1 else ''} should be updated "
+                     f"({very_important} more than a year old)",
+                text_color="red" if very_important else "orange"
+            )
 
     def update_activity(self, event=None):
         self.timeout_manager.update_activity()
 
     def open_vault(self):
         """Navigate to the Password Vault screen."""
-        self.frame.destroy()
-        from .password_vault import PasswordVault
-        screen = PasswordVault(self.root, self.master_password)
-        self.timeout_manager.set_current_screen(screen)
+        self.router.show("vault", self.master_password)
 
     def open_generator(self):
         """Navigate to the Password Generator screen."""
-        self.frame.destroy()
-        from screens.password_generator import PasswordGenerator
-        screen = PasswordGenerator(self.root, self.master_password)
-        self.timeout_manager.set_current_screen(screen)
+        self.router.show("generator", self.master_password)
 
     def open_recommender(self):
         """Navigate to the Recommender System screen."""
-        self.frame.destroy()
-        from .recommender_screen import RecommenderScreen
-        screen = RecommenderScreen(self.root, self.master_password)
-        self.timeout_manager.set_current_screen(screen)
+        self.router.show("recommender", self.master_password)
 
     def logout(self):
-        self.frame.destroy()
-        from screens.login_screen import LoginScreen
-        screen = LoginScreen(self.root)
-        self.timeout_manager.set_current_screen(screen)
+        self.router.lock()
 
     def toggle_theme(self):
         """Toggle between light and dark mode."""
@@ -1,26 +1,27 @@
 import customtkinter as ctk
-from database import Database
+from screen_router import ScreenRouter
+from profiles import ProfileManager
 from utils import toggle_theme
 from timeout_manager import TimeoutManager
+from background import DatabaseWorker
+from vault_service import unlock_step
 
 class LoginScreen:
+    # Shown by the ScreenRouter, which sets the window title and packs the frame
+    title = "Login"
+    # Already locked, so the idle timeout does not apply here
+    locks_on_timeout = False
+
     def __init__(self, root):
         self.root = root
-        self.root.title("Login")
-        self.db = Database()
+        self.router = ScreenRouter()
+        self.profiles = ProfileManager()
 
         # Initialize timeout manager
         self.timeout_manager = TimeoutManager()
-        self.timeout_manager.set_current_screen(self)
 
         # Set up CTkFrame
         self.frame = ctk.CTkFrame(root)
-        self.frame.pack(padx=20, pady=20)
-
-        # Bind mouse movement to update activity
-        self.frame.bind("<Motion>", self.update_activity)
-        self.frame.bind("<Button-1>", self.update_activity)
-        self.frame.bind("<Key>", self.update_activity)
 
         # Theme toggle button in top-right corner
         self.theme_button = ctk.CTkButton(
@@ -52,12 +53,22 @@ class LoginScreen:
         self.error_label = ctk.CTkLabel(self.frame, text="", text_color="red")
         self.error_label.grid(row=3, column=0, columnspan=2, pady=5)
 
+        # Shown in place of the error label while the key is derived in the background
+        self.spinner = ctk.CTkProgressBar(self.frame, mode="indeterminate", width=160)
+        self.unlock_worker = None
+        self.unlock_progress = None  # (migration, rows done, total) while an older vault is upgraded
+
         # Login Button
-        ctk.CTkButton(self.frame, text="Login", command=self.login).grid(row=4, column=0, columnspan=2, pady=10)
+        self.login_button = ctk.CTkButton(self.frame, text="Login", command=self.login)
+        self.login_button.grid(row=4, column=0, columnspan=2, pady=10)
 
         # Forgot Password Button
         ctk.CTkButton(self.frame, text="Forgot Password?", command=self.open_recovery_screen).grid(row=5, column=0, columnspan=2, pady=5)
 
+        # Which vault is being unlocked, and a way to pick another
+        ctk.CTkLabel(self.frame, text=f"Vault: {self.profiles.active}", text_color="gray").grid(row=6, column=0, columnspan=2, pady=(10, 0))
+        ctk.CTkButton(self.frame, text="Switch Vault", command=self.open_profiles).grid(row=7, column=0, columnspan=2, pady=5)
+
     def update_activity(self, event=None):
         self.timeout_manager.update_activity()
 
@@ -70,26 +81,64 @@ class LoginScreen:
         self.update_activity()
 
     def login(self):
-        """Verify the master password and navigate to the home screen."""
+        """Verify the master password on a worker thread, keeping the window responsive."""
+        if self.unlock_worker is not None:
+            return  # Already unlocking
         password = self.password_entry.get()
-        if self.db.verify_master_password(password):
+        # Only the active profile's key session is unlocked
+        profile = self.profiles.active
+        self.unlock_progress = None
+        self.unlock_worker = DatabaseWorker(self.profiles.database(profile).db_name, unlock_step, password,
+                                            progress=self.report_progress).start()
+        self.login_button.configure(state="disabled")
+        self.error_label.grid_remove()
+        self.spinner.grid(row=3, column=0, columnspan=2, pady=5)
+        self.spinner.start()
+        self.poll_unlock(profile, password)
+
+    def poll_unlock(self, profile, password):
+        """Wait for the unlock worker, then open home or show what went wrong."""
+        if not self.frame.winfo_exists():
+            return  # Left the login screen meanwhile
+        worker = self.unlock_worker
+        if not worker.done:
+            if self.unlock_progress is not None:
+                # An older vault is being upgraded (see migrations.py)
+                name, done, total = self.unlock_progress
+                self.login_button.configure(text=f"{name}: {done * 100 // total}%")
+            self.root.after(50, lambda: self.poll_unlock(profile, password))
+            return
+        self.unlock_worker = None
+        self.spinner.stop()
+        self.spinner.grid_remove()
+        self.error_label.grid()
+        self.login_button.configure(state="normal", text="Login")
+        if worker.error is not None:
+            self.error_label.configure(text=f"Could not unlock: {worker.error}")
+        elif worker.result:
             # Clear any previous error message
             self.error_label.configure(text="")
-            self.frame.destroy()
-            from .home_screen import HomeScreen
-            screen = HomeScreen(self.root, password)
-            self.timeout_manager.set_current_screen(screen)
+            vault = self.profiles.session(profile)
+            vault.unlocked_by(password)
+            # Decrypt the vault's first page while home is shown, so opening the vault is instant
+            vault.prefetch_first_page()
+            self.router.show("home", password)
         else:
             # Display error message below the input field
             self.error_label.configure(text="Incorrect password!")
             self.update_activity()
 
+    def report_progress(self, name, done, total):
+        # Called on the worker thread; poll_unlock shows it
+        self.unlock_progress = (name, done, total)
+
+    def open_profiles(self):
+        """Navigate to the profile picker."""
+        self.router.show("profiles")
+
     def open_recovery_screen(self):
         """Navigate to the recovery screen."""
-        self.frame.destroy()
-        from .recovery_screen import RecoveryScreen
-        screen = RecoveryScreen(self.root)
-        self.timeout_manager.set_current_screen(screen)
+        self.router.show("recovery")
 
     def toggle_theme(self):
         """Toggle between light and dark mode."""
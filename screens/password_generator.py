@@ -1,25 +1,24 @@
 import customtkinter as ctk
-import random
-import string
+from screen_router import ScreenRouter
 import pyperclip
-from utils import toggle_theme
+from utils import toggle_theme, update_strength_label
+from password_strength import StrengthEstimator
+from generator_core import PasswordPolicy, generate_password
 from timeout_manager import TimeoutManager
 
 class PasswordGenerator:
+    # Shown by the ScreenRouter, which sets the window title and packs the frame
+    title = "Password Generator"
+
     def __init__(self, root, master_password):
         self.root = root
+        self.router = ScreenRouter()
         self.master_password = master_password
+        self.strength_estimator = StrengthEstimator()
         self.frame = ctk.CTkFrame(root)
-        self.frame.pack(padx=20, pady=20)
         
         # Initialize timeout manager
         self.timeout_manager = TimeoutManager()
-        self.timeout_manager.set_current_screen(self)
-        
-        # Bind mouse movement to update activity
-        self.frame.bind("<Motion>", self.update_activity)
-        self.frame.bind("<Button-1>", self.update_activity)
-        self.frame.bind("<Key>", self.update_activity)
         
         # Create UI elements
         self.create_widgets()
@@ -89,6 +88,7 @@ class PasswordGenerator:
         self.use_lowercase = ctk.BooleanVar(value=True)
         self.use_numbers = ctk.BooleanVar(value=True)
         self.use_special = ctk.BooleanVar(value=True)
+        self.exclude_look_alikes = ctk.BooleanVar(value=False)
         
         ctk.CTkCheckBox(
             options_frame,
@@ -113,6 +113,12 @@ class PasswordGenerator:
             text="Special Characters",
             variable=self.use_special
         ).pack(side="left", padx=5)
+
+        ctk.CTkCheckBox(
+            options_frame,
+            text="Exclude Look-alikes",
+            variable=self.exclude_look_alikes
+        ).pack(side="left", padx=5)
         
         # Generated password display
         self.password_var = ctk.StringVar()
@@ -123,6 +129,15 @@ class PasswordGenerator:
             width=400
         )
         password_entry.pack(pady=10)
+
+        # Live strength feedback, re-scored whenever the password changes
+        self.strength_label = ctk.CTkLabel(
+            content_frame,
+            text="",
+            font=("Arial", 12)
+        )
+        self.strength_label.pack(pady=2)
+        self.password_var.trace_add("write", self.update_strength)
         
         # Feedback label for both copy confirmation and errors
         self.feedback_label = ctk.CTkLabel(
@@ -164,33 +179,41 @@ class PasswordGenerator:
                 )
                 return
                 
-            characters = ""
+            classes = []
             if self.use_uppercase.get():
-                characters += string.ascii_uppercase
+                classes.append("uppercase")
             if self.use_lowercase.get():
-                characters += string.ascii_lowercase
+                classes.append("lowercase")
             if self.use_numbers.get():
-                characters += string.digits
+                classes.append("digits")
             if self.use_special.get():
-                characters += string.punctuation
-                
-            if not characters:
-                self.feedback_label.configure(
-                    text="Please select at least one character type for password generation.",
-                    text_color="red"
-                )
-                return
-                
-            password = ''.join(random.choice(characters) for _ in range(length))
-            self.password_var.set(password)
-            self.feedback_label.configure(text="")  # Clear any previous messages
-            
+                classes.append("special")
+
         except ValueError:
             self.feedback_label.configure(
                 text="Please enter a valid number for password length.",
                 text_color="red"
             )
+            return
+
+        try:
+            # Every selected character type is guaranteed to appear in the password
+            policy = PasswordPolicy(
+                length=length,
+                classes=classes,
+                exclude_look_alikes=self.exclude_look_alikes.get()
+            )
+        except ValueError as e:
+            self.feedback_label.configure(text=str(e), text_color="red")
+            return
+
+        password = generate_password(policy)
+        self.password_var.set(password)
+        self.feedback_label.configure(text="")  # Clear any previous messages
             
+    def update_strength(self, *args):
+        update_strength_label(self.strength_label, self.strength_estimator, self.password_var.get())
+
     def copy_password(self):
         password = self.password_var.get()
         if password and not password.startswith("Error:"):
@@ -201,17 +224,11 @@ class PasswordGenerator:
             )
             
     def back_to_home(self):
-        self.frame.destroy()
-        from screens.home_screen import HomeScreen
-        screen = HomeScreen(self.root, self.master_password)
-        self.timeout_manager.set_current_screen(screen)
+        self.router.show("home", self.master_password)
 
     def logout(self):
         """Navigate to the login screen."""
-        self.frame.destroy()
-        from screens.login_screen import LoginScreen
-        screen = LoginScreen(self.root)
-        self.timeout_manager.set_current_screen(screen)
+        self.router.lock()
 
     def toggle_theme(self):
         """Toggle between light and dark mode."""
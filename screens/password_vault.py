@@ -1,30 +1,42 @@
 from PIL import Image  # Import Pillow's Image module
 import customtkinter as ctk
+from screen_router import ScreenRouter
 from datetime import datetime
 from tkcalendar import Calendar  # For calendar popup
-from database import Database
-from utils import toggle_theme
+from database import (RECOMMENDED_AFTER_DAYS, VERY_IMPORTANT_AFTER_DAYS, PAGE_SIZE,
+                      STATUS_ACTIVE, STATUS_RECOMMENDED, STATUS_VERY_IMPORTANT, STATUS_UNKNOWN)
+from profiles import ProfileManager
+from rotation import RotationWorker, plan_rotation, apply_rotation, undo_rotation
+from utils import toggle_theme, update_strength_label
+from password_strength import StrengthEstimator
 from timeout_manager import TimeoutManager
+from tracing import traced
+from change_watcher import ChangeWatcher
 
 class PasswordVault:
+    # Shown by the ScreenRouter, which sets the window title and packs the frame
+    title = "Password Vault"
+
     def __init__(self, root, master_password):
         self.root = root
-        self.root.title("Password Vault")
-        self.db = Database()
+        self.router = ScreenRouter()
+        self.db = ProfileManager().database()
         self.master_password = master_password  # Store the master password
+        self.vault = ProfileManager().session()
+        if not self.vault.is_unlocked:
+            self.vault.unlock(master_password)
 
         # Initialize timeout manager
         self.timeout_manager = TimeoutManager()
-        self.timeout_manager.set_current_screen(self)
+
+        # Pick up changes other windows, scripts or background jobs make to the vault
+        self.row_labels = {}  # Password ID -> labels of its displayed row
+        self.seen_counter = 0  # mod_counter the list was last loaded at
+        self.watcher = ChangeWatcher(self.db, root)
+        self.watcher.add_listener(self.refresh_changes)
 
         # Use CTkFrame instead of tk.Frame
         self.frame = ctk.CTkFrame(root)  # Ensure proper theme inheritance
-        self.frame.pack(padx=20, pady=20)
-
-        # Bind mouse movement to update activity
-        self.frame.bind("<Motion>", self.update_activity)
-        self.frame.bind("<Button-1>", self.update_activity)
-        self.frame.bind("<Key>", self.update_activity)
         
         # Top row with title, logout and theme buttons
         # Logout button in top-left corner
@@ -70,6 +82,12 @@ class PasswordVault:
         self.password_entry = ctk.CTkEntry(self.frame)
         self.password_entry.grid(row=2, column=1, padx=10, pady=5)
 
+        # Live strength feedback for the password being added
+        self.strength_estimator = StrengthEstimator()
+        self.strength_label = ctk.CTkLabel(self.frame, text="", font=("Arial", 12))
+        self.strength_label.grid(row=2, column=2, sticky="w", padx=10, pady=5)
+        self.password_entry.bind("<KeyRelease>", self.update_strength)
+
         # Custom Date Picker with Icon
         ctk.CTkLabel(self.frame, text="Last Updated:").grid(row=3, column=0, sticky="w", padx=20, pady=5)
         self.date_var = ctk.StringVar()  # To store the selected date
@@ -107,6 +125,46 @@ class PasswordVault:
 
         ctk.CTkButton(self.frame, text="Add Password", command=self.add_password).grid(row=5, column=0, columnspan=2, pady=10, padx=(20, 0))
 
+        # Filters for the list. Sorting and filtering run in SQL (sites through their blind
+        # index), and only the rows on the displayed page are decrypted (see Database.list_page)
+        filter_frame = ctk.CTkFrame(self.frame, fg_color="transparent")
+        filter_frame.grid(row=5, column=2, sticky="w", padx=10, pady=10)
+
+        self.site_filter_var = ctk.StringVar()
+        site_filter_entry = ctk.CTkEntry(filter_frame, textvariable=self.site_filter_var,
+                                         placeholder_text="Filter by site", width=140)
+        site_filter_entry.pack(side="left", padx=(0, 5))
+        site_filter_entry.bind("<KeyRelease>", self.schedule_site_filter)
+        self.site_filter_job = None
+
+        self.status_filter_var = ctk.StringVar(value="Any status")
+        ctk.CTkOptionMenu(
+            filter_frame,
+            values=["Any status", STATUS_ACTIVE, STATUS_RECOMMENDED, STATUS_VERY_IMPORTANT, STATUS_UNKNOWN],
+            variable=self.status_filter_var,
+            command=lambda _: self.apply_filters()
+        ).pack(side="left", padx=5)
+
+        # Filter the list by password age; stale filters only read the stale rows
+        self.age_filters = {
+            "All entries": None,
+            f"Older than {RECOMMENDED_AFTER_DAYS} days": RECOMMENDED_AFTER_DAYS,
+            f"Older than {VERY_IMPORTANT_AFTER_DAYS} days": VERY_IMPORTANT_AFTER_DAYS,
+        }
+        self.age_filter_var = ctk.StringVar(value="All entries")
+        ctk.CTkOptionMenu(
+            filter_frame,
+            values=list(self.age_filters),
+            variable=self.age_filter_var,
+            command=lambda _: self.apply_filters()
+        ).pack(side="left", padx=5)
+
+        # Sort order and paging: page_cursors[-1] is the cursor the current page starts after
+        self.sort_key = "id"
+        self.sort_descending = False
+        self.page_cursors = [None]
+        self.next_cursor = None
+
         # Scrollable Frame for displaying passwords
         self.canvas = ctk.CTkCanvas(self.frame, bg="#276ea7", highlightthickness=4, highlightbackground="#a19f9f", width=800)
         self.scrollbar_y = ctk.CTkScrollbar(self.frame, orientation="vertical", command=self.canvas.yview)
@@ -137,18 +195,37 @@ class PasswordVault:
         button_frame = ctk.CTkFrame(self.frame)
         button_frame.grid(row=8, column=0, columnspan=3, pady=10, padx=(20, 0))
         
+        ctk.CTkButton(button_frame, text="Update Entry", command=self.update_entry).pack(side="left", padx=5)
+        ctk.CTkButton(button_frame, text="History", command=self.show_history).pack(side="left", padx=5)
+        ctk.CTkButton(button_frame, text="Rotate Stale", command=self.rotate_stale).pack(side="left", padx=5)
         ctk.CTkButton(button_frame, text="Delete Entry", command=self.delete_entry).pack(side="left", padx=5)
         ctk.CTkButton(button_frame, text="Back to Home", command=self.back_to_home).pack(side="left", padx=5)
 
+        self.previous_button = ctk.CTkButton(button_frame, text="<", width=30, command=self.previous_page)
+        self.previous_button.pack(side="left", padx=(20, 5))
+        self.page_label = ctk.CTkLabel(button_frame, text="Page 1")
+        self.page_label.pack(side="left", padx=5)
+        self.next_button = ctk.CTkButton(button_frame, text=">", width=30, command=self.next_page)
+        self.next_button.pack(side="left", padx=5)
+
         # Track selected row to help with deletion
         self.selected_row = None
+        self.selected_site = None
 
         # Label to show selected row to help with deletion
         self.selection_label = ctk.CTkLabel(self.frame, text="No row selected")
         self.selection_label.grid(row=9, column=0, columnspan=3, pady=5, padx=(20, 0))
 
-        # Populate the list of passwords
+    def on_show(self):
+        """Called by the router every time the vault is shown: refresh the list only."""
+        self.selected_row = None
+        self.selection_label.configure(text="No row selected")
         self.populate_list()
+        self.watcher.start()
+
+    def on_evict(self):
+        """Called by the router on logout or timeout."""
+        self.watcher.stop()
 
     def toggle_date_selection(self):
         """Toggle between manual date selection and using the current time."""
@@ -178,52 +255,126 @@ class PasswordVault:
         confirm_button = ctk.CTkButton(calendar_popup, text="Confirm", command=set_date)
         confirm_button.pack(pady=10)
 
+    @traced("ui.vault.populate_list")
     def populate_list(self):
         """Populate the scrollable frame with entries from the database."""
         # Clear existing widgets in the scrollable frame
         for widget in self.scrollable_frame.winfo_children():
             widget.destroy()
-
-        # Add headers
-        headers = ["ID", "Site", "Password", "Last Updated", "Status"]
-        for col, header in enumerate(headers):
+        self.row_labels = {}
+        self.seen_counter = self.db.max_mod_counter()
+
+        # Add headers; click a sortable one to sort by it, again to reverse
+        headers = [("ID", "id"), ("Site", None), ("Password", None), ("Last Updated", "last_updated"), ("Status", None)]
+        for col, (header, sort_key) in enumerate(headers):
+            if sort_key == self.sort_key:
+                header += " ▼" if self.sort_descending else " ▲"
             label = ctk.CTkLabel(self.scrollable_frame, text=header, font=("Helvetica", 12, "bold"), anchor="w")
             label.grid(row=0, column=col, padx=5, pady=5, sticky="w")
-
-        # Add rows
-        for row_idx, entry in enumerate(self.db.get_all_passwords(self.master_password), start=1):
-            id_, site, password, last_updated, _ = entry
-            status = self.calculate_status(last_updated)
+            if sort_key is not None:
+                label.configure(cursor="hand2")
+                label.bind("<Button-1>", lambda event, key=sort_key: self.sort_by(key))
+
+        # Add rows; status is kept current in the database (see StatusRefresher)
+        status = self.status_filter_var.get()
+        site = self.site_filter_var.get().strip()
+        older_than_days = self.age_filters[self.age_filter_var.get()]
+        first_page = None
+        if (self.sort_key, self.sort_descending, site, status, older_than_days, len(self.page_cursors)) == \
+                ("id", False, "", "Any status", None, 1):
+            # The default view: use the page decrypted in the background after login, if still current
+            first_page = self.vault.take_first_page(self.seen_counter)
+        if first_page is not None:
+            entries, self.next_cursor = first_page
+        else:
+            entries, self.next_cursor = self.db.list_page(
+                self.master_password,
+                sort=self.sort_key,
+                descending=self.sort_descending,
+                site=site,
+                status=None if status == "Any status" else status,
+                older_than_days=older_than_days,
+                after=self.page_cursors[-1],
+                limit=PAGE_SIZE
+            )
+        self.page_label.configure(text=f"Page {len(self.page_cursors)}")
+        self.previous_button.configure(state="normal" if len(self.page_cursors) > 1 else "disabled")
+        self.next_button.configure(state="normal" if self.next_cursor is not None else "disabled")
+        for row_idx, entry in enumerate(entries, start=1):
+            id_, site, password, last_updated, status = entry
 
             # Determine background color based on status
             bg_color = "transparent"
 
             # Create labels for each column
+            self.row_labels[id_] = []
             for col, value in enumerate([id_, site, password, last_updated, status]):
                 label = ctk.CTkLabel(self.scrollable_frame, text=value, anchor="w", fg_color=bg_color)
                 label.grid(row=row_idx, column=col, padx=5, pady=2, sticky="w")
+                self.row_labels[id_].append(label)
 
                 # Hover effect
                 label.bind("<Enter>", lambda event, lbl=label: lbl.configure(fg_color="#D3D3D3"))
                 label.bind("<Leave>", lambda event, lbl=label: lbl.configure(fg_color=bg_color))
 
                 # Click to select row
-                label.bind("<Button-1>", lambda event, row=row_idx - 1, site=site: self.select_row(row, site))
-
-    def calculate_status(self, last_updated):
-        """Determine the status of a password based on its age."""
-        try:
-            last_updated_date = datetime.strptime(last_updated, "%Y-%m-%d %H:%M:%S")
-            current_date = datetime.now()
-            age = current_date - last_updated_date
-            if age.days > 365:  # More than 12 months
-                return "Very Important to Update"
-            elif age.days > 90:  # More than 3 months
-                return "Recommended to Update"
-            else:
-                return "Active"
-        except ValueError:
-            return "Unknown"
+                label.bind("<Button-1>", lambda event, row=id_, site=site: self.select_row(row, site))
+
+    def refresh_changes(self):
+        """
+        Called by the ChangeWatcher when another connection changed the vault. Rows on the
+        page that were edited are re-read and updated in place; the page is only reloaded
+        when entries were added or deleted, or changed entries might move onto it.
+        """
+        if self.router.current is not self:
+            return  # on_show reloads the list anyway
+        since = self.seen_counter
+        self.seen_counter = self.db.max_mod_counter()
+        changed = self.db.changed_ids_since(since)
+        if self.db.deleted_since(since) or any(id_ not in self.row_labels for id_ in changed):
+            self.populate_list()
+            return
+        for id_ in changed:
+            entry = self.db.get_password(id_, self.master_password)
+            if entry is None:  # Deleted since the check above
+                self.populate_list()
+                return
+            for label, value in zip(self.row_labels[id_], entry):
+                label.configure(text=value)
+
+    def apply_filters(self):
+        """Show the first page for the current filters and sort order."""
+        self.page_cursors = [None]
+        self.populate_list()
+
+    def schedule_site_filter(self, event=None):
+        """Re-query once typing in the site filter pauses."""
+        if self.site_filter_job is not None:
+            self.root.after_cancel(self.site_filter_job)
+        self.site_filter_job = self.root.after(250, self.run_site_filter)
+
+    def run_site_filter(self):
+        self.site_filter_job = None
+        self.apply_filters()
+
+    def sort_by(self, sort_key):
+        """Sort by a column, or reverse the order if it is already the sort column."""
+        if self.sort_key == sort_key:
+            self.sort_descending = not self.sort_descending
+        else:
+            self.sort_key = sort_key
+            self.sort_descending = False
+        self.apply_filters()
+
+    def next_page(self):
+        if self.next_cursor is not None:
+            self.page_cursors.append(self.next_cursor)
+            self.populate_list()
+
+    def previous_page(self):
+        if len(self.page_cursors) > 1:
+            self.page_cursors.pop()
+            self.populate_list()
 
     def add_password(self):
         """Add a new password to the database."""
@@ -231,26 +382,27 @@ class PasswordVault:
         password = self.password_entry.get().strip()
         last_updated = self.date_var.get()
         if site and password and last_updated:
-            self.db.add_password(site, password, self.master_password)
-            cursor = self.db.conn.cursor()
-            cursor.execute("UPDATE passwords SET last_updated = ? WHERE site = ?", (last_updated, site))
-            self.db.conn.commit()
+            self.vault.add(site, password, last_updated=last_updated)
             self.populate_list()
             self.site_entry.delete(0, ctk.END)
             self.password_entry.delete(0, ctk.END)
+            self.update_strength()
             self.date_var.set("")  # Clear the date field
         else:
             self.show_error("Please fill all fields!")
 
+    def update_strength(self, event=None):
+        """Re-score the password field after each keystroke."""
+        update_strength_label(self.strength_label, self.strength_estimator, self.password_entry.get())
+
     def delete_entry(self):
         """Delete the selected password entry from the database."""
         if self.selected_row is None:
             self.show_error("Please select an entry to delete.")
             return
 
-        # Get the selected password's ID
-        entry = self.db.get_all_passwords(self.master_password)[self.selected_row]
-        id_ = entry[0]
+        # The selected row is tracked by its password ID
+        id_ = self.selected_row
 
         # Confirm deletion
         confirm = ctk.CTkToplevel(self.root)
@@ -262,24 +414,122 @@ class PasswordVault:
 
     def confirm_delete(self, id_, confirm_dialog):
         """Confirm and delete the selected entry."""
-        cursor = self.db.conn.cursor()
-        cursor.execute("DELETE FROM passwords WHERE id = ?", (id_,))
-        self.db.conn.commit()
+        self.vault.delete(id_)
         confirm_dialog.destroy()
         self.populate_list()
         self.selected_row = None  # Reset selection
         self.selection_label.configure(text="No row selected", text_color="white")
 
+    def update_entry(self):
+        """Change the selected entry's password, or generate a new one if left empty."""
+        if self.selected_row is None:
+            self.show_error("Please select an entry to update.")
+            return
+        dialog = ctk.CTkInputDialog(
+            title="Update Entry",
+            text=f"New password for {self.selected_site}\n(leave empty to generate one):"
+        )
+        new_password = dialog.get_input()
+        if new_password is None:
+            return  # Cancelled
+        new_password = new_password.strip()
+        if new_password:
+            self.vault.update(self.selected_row, new_password)
+        else:
+            self.vault.rotate(self.selected_row)
+        self.populate_list()
+
+    def show_history(self):
+        """Show the selected entry's previous passwords, newest first."""
+        if self.selected_row is None:
+            self.show_error("Please select an entry to see its history.")
+            return
+        history = self.vault.history(self.selected_row)
+
+        dialog = ctk.CTkToplevel(self.root)
+        dialog.title(f"History: {self.selected_site}")
+        dialog.geometry("520x320")
+        if not history:
+            ctk.CTkLabel(dialog, text="This entry has no previous passwords.").pack(pady=20)
+        else:
+            ctk.CTkLabel(dialog, text=f"{len(history)} previous passwords, newest first:").pack(pady=10)
+            textbox = ctk.CTkTextbox(dialog, width=480, height=200, font=("Courier", 12))
+            textbox.pack(padx=10)
+            for version in history:
+                textbox.insert("end", f"{version['replaced_at'][:19]:<20} {version['password']}\n")
+            textbox.configure(state="disabled")
+        ctk.CTkButton(dialog, text="Close", command=dialog.destroy).pack(pady=10)
+
+    def rotate_stale(self):
+        """Preview, apply and undo replacing every stale password, on a worker thread."""
+        threshold_days = self.age_filters[self.age_filter_var.get()] or RECOMMENDED_AFTER_DAYS
+
+        dialog = ctk.CTkToplevel(self.root)
+        dialog.title("Rotate Stale Passwords")
+        dialog.geometry("520x400")
+        status_label = ctk.CTkLabel(dialog, text=f"Finding passwords older than {threshold_days} days...")
+        status_label.pack(pady=10)
+        preview = ctk.CTkTextbox(dialog, width=480, height=260, font=("Courier", 12))
+        preview.pack(padx=10)
+        buttons = ctk.CTkFrame(dialog, fg_color="transparent")
+        buttons.pack(pady=10)
+        apply_button = ctk.CTkButton(buttons, text="Apply", state="disabled")
+        apply_button.pack(side="left", padx=5)
+        undo_button = ctk.CTkButton(buttons, text="Undo", state="disabled")
+        undo_button.pack(side="left", padx=5)
+        ctk.CTkButton(buttons, text="Close", command=dialog.destroy).pack(side="left", padx=5)
+
+        def run(step, *args, on_done, **kwargs):
+            """Run a rotation step off the Tk thread and poll for its result."""
+            apply_button.configure(state="disabled")
+            undo_button.configure(state="disabled")
+            worker = RotationWorker(self.db.db_name, step, *args, **kwargs).start()
+
+            def poll():
+                if not dialog.winfo_exists():
+                    return
+                if not worker.done:
+                    self.root.after(100, poll)
+                elif worker.error is not None:
+                    status_label.configure(text=f"Error: {worker.error}", text_color="red")
+                else:
+                    on_done(worker.result)
+            poll()
+
+        def planned(rotation):
+            preview.delete("1.0", "end")
+            for item in rotation.items:
+                preview.insert("end", f"{item.site:<24} {item.last_updated:<20} -> {item.new_password}\n")
+            preview.configure(state="disabled")
+            if len(rotation) == 0:
+                status_label.configure(text=f"No passwords are older than {threshold_days} days.")
+                return
+            status_label.configure(text=f"{len(rotation)} passwords will be replaced. Nothing is saved until you apply.")
+
+            def apply():
+                status_label.configure(text=f"Rotating {len(rotation)} passwords...")
+                run(apply_rotation, rotation, self.master_password, on_done=lambda count: applied(rotation, count))
+            apply_button.configure(state="normal", command=apply)
+
+        def applied(rotation, count):
+            status_label.configure(text=f"Rotated {count} passwords.", text_color="green")
+            undo_button.configure(state="normal", command=lambda: run(undo_rotation, rotation, on_done=undone))
+            self.populate_list()
+
+        def undone(count):
+            status_label.configure(text=f"Restored {count} previous passwords.", text_color="orange")
+            self.populate_list()
+
+        run(plan_rotation, threshold_days, master_password=self.master_password, on_done=planned)
+
     def back_to_home(self):
         """Navigate back to the home screen."""
-        self.frame.destroy()
-        from .home_screen import HomeScreen
-        screen = HomeScreen(self.root, self.master_password)
-        self.timeout_manager.set_current_screen(screen)
+        self.router.show("home", self.master_password)
 
     def select_row(self, row, site):
         """Select a row in the table."""
         self.selected_row = row
+        self.selected_site = site
         self.selection_label.configure(text=f"Selected: {site}", font=("Helvetica", 18))  # Update dynamically
 
     def show_error(self, message):
@@ -310,7 +560,4 @@ class PasswordVault:
 
     def logout(self):
         """Navigate to the login screen."""
-        self.frame.destroy()
-        from screens.login_screen import LoginScreen
-        screen = LoginScreen(self.root)
-        self.timeout_manager.set_current_screen(screen)
\ No newline at end of file
+        self.router.lock()
\ No newline at end of file
@@ -0,0 +1,84 @@
+import customtkinter as ctk
+from screen_router import ScreenRouter
+from profiles import ProfileManager
+from utils import toggle_theme
+
+class ProfileScreen:
+    # Shown by the ScreenRouter, which sets the window title and packs the frame
+    title = "Choose Vault"
+    # Nothing is unlocked here, so the idle timeout does not apply
+    locks_on_timeout = False
+
+    def __init__(self, root):
+        self.root = root
+        self.router = ScreenRouter()
+        self.profiles = ProfileManager()
+
+        # Set up CTkFrame
+        self.frame = ctk.CTkFrame(root)
+
+        # Theme toggle button in top-right corner
+        self.theme_button = ctk.CTkButton(
+            self.frame,
+            text="🌓",  # Moon/sun emoji
+            width=30,
+            height=30,
+            command=self.toggle_theme
+        )
+        self.theme_button.grid(row=0, column=1, sticky="ne", padx=10, pady=10)
+
+        ctk.CTkLabel(self.frame, text="Choose a Vault", font=("Microsoft YaHei UI Light", 28), anchor="center").grid(row=0, column=0, columnspan=2, pady=10)
+
+        # One button per profile; each profile is a separate vault file
+        self.profile_frame = ctk.CTkFrame(self.frame, fg_color="transparent")
+        self.profile_frame.grid(row=1, column=0, columnspan=2, pady=5)
+
+        # New profile
+        ctk.CTkLabel(self.frame, text="New vault:").grid(row=2, column=0, padx=10, pady=5)
+        self.name_entry = ctk.CTkEntry(self.frame, placeholder_text="Profile name")
+        self.name_entry.grid(row=2, column=1, padx=5, pady=5)
+        ctk.CTkButton(self.frame, text="Create Profile", command=self.create_profile).grid(row=3, column=0, columnspan=2, pady=10)
+
+        # Error Label (initially empty)
+        self.error_label = ctk.CTkLabel(self.frame, text="", text_color="red")
+        self.error_label.grid(row=4, column=0, columnspan=2, pady=5)
+
+        self.show_profiles()
+
+    def show_profiles(self):
+        """List the registered profiles, the last used one highlighted."""
+        for widget in self.profile_frame.winfo_children():
+            widget.destroy()
+        for name in self.profiles.registry.names():
+            ctk.CTkButton(
+                self.profile_frame,
+                text=name,
+                width=200,
+                fg_color=None if name == self.profiles.active else "gray40",
+                command=lambda name=name: self.open_profile(name)
+            ).pack(pady=4)
+
+    def open_profile(self, name):
+        """Make the profile active and continue to its login (or first-time setup)."""
+        self.profiles.select(name)
+        db = self.profiles.database()
+        if db.conn.execute("SELECT COUNT(*) FROM users").fetchone()[0] == 0:
+            self.router.show("consent")
+        else:
+            self.router.show("login")
+
+    def create_profile(self):
+        """Register a new vault file and open it; setup runs because it has no master password yet."""
+        name = self.name_entry.get().strip()
+        try:
+            self.profiles.registry.add(name)
+        except ValueError as e:
+            self.error_label.configure(text=str(e))
+            return
+        self.open_profile(name)
+
+    def toggle_theme(self):
+        """Toggle between light and dark mode."""
+        new_mode = toggle_theme()
+        # Update button text based on new mode
+        self.theme_button.configure(text="🌞" if new_mode == "Light" else "🌙")
@@ -1,9 +1,13 @@
 import customtkinter as ctk
+from screen_router import ScreenRouter
 import pyperclip
 import sys
 import os
 from timeout_manager import TimeoutManager
-from utils import toggle_theme
+from utils import toggle_theme, update_strength_label
+from password_strength import StrengthEstimator
+from candidate_pool import CandidatePool
+from passphrase import PassphraseGenerator, open_default_wordlist
 
 # Add the recommender system directory to the path
 sys.path.append(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'recommender system'))
@@ -12,32 +16,48 @@ sys.path.append(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'recomm
 from recommender_system import PasswordGenerator as MLPasswordGenerator
 from recommender_system_memorable import PasswordGenerator as MemorablePasswordGenerator
 
+# Shown under the generator options in AI mode
+DEFAULT_WARNING_TEXT = "Generate a secure password using advanced AI or memorable patterns"
+
 class RecommenderScreen:
+    # Shown by the ScreenRouter, which sets the window title and packs the frame
+    title = "Recommender System"
+
     def __init__(self, root, master_password):
         self.root = root
-        self.root.title("Recommender System")
+        self.router = ScreenRouter()
         self.master_password = master_password
         
         # Initialize timeout manager
         self.timeout_manager = TimeoutManager()
-        self.timeout_manager.set_current_screen(self)
         
         # Initialize password generators
         self.ml_generator = None
         self.memorable_generator = MemorablePasswordGenerator(max_length=15)
-        self.is_model_loading = False
-        
+        self.strength_estimator = StrengthEstimator()
+
+        # Candidates are generated ahead of time on background threads so a click is instant.
+        # The ML model is trained on its pool's thread the first time the screen is shown.
+        self.pools = {
+            # Several ML candidates per call, so they share the model's batched forward passes
+            "ml": CandidatePool(
+                lambda: self.ml_generator.generate_multiple(3, with_scores=True),
+                capacity=5, low_water=2, setup_fn=self.init_ml_generator, name="ml"
+            ),
+            "memorable": CandidatePool(
+                lambda: self.memorable_generator.generate_multiple(5),
+                capacity=20, low_water=5, name="memorable"
+            ),
+        }
+        self.waiting_job = None  # root.after job while a click waits for an empty pool
+        self.passphrase_wordlist = None  # Memory-mapped, opened on first use
+        self.stats_job = None
+
         # Use CTkFrame instead of tk.Frame
         self.frame = ctk.CTkFrame(root)
-        self.frame.pack(padx=20, pady=20)
 
         # Create UI elements
         self.create_widgets()
-        
-        # Bind mouse movement to update activity
-        self.frame.bind("<Motion>", self.update_activity)
-        self.frame.bind("<Button-1>", self.update_activity)
-        self.frame.bind("<Key>", self.update_activity)
     
     def create_widgets(self):
         # Theme toggle button in top-right corner
@@ -101,11 +121,30 @@ class RecommenderScreen:
             value="memorable",
             command=self.update_warning_label
         ).pack(side="left", padx=10)
+
+        ctk.CTkRadioButton(
+            options_frame,
+            text="Passphrase",
+            variable=self.generator_type,
+            value="passphrase",
+            command=self.update_warning_label
+        ).pack(side="left", padx=10)
+
+        # Word count for passphrases, only shown in passphrase mode
+        self.passphrase_frame = ctk.CTkFrame(content_frame)
+        ctk.CTkLabel(self.passphrase_frame, text="Words:").pack(side="left", padx=5)
+        self.word_count_var = ctk.StringVar(value="6")
+        ctk.CTkOptionMenu(
+            self.passphrase_frame,
+            values=[str(n) for n in range(4, 11)],
+            variable=self.word_count_var,
+            width=70
+        ).pack(side="left", padx=5)
         
         # Add warning label
         self.warning_label = ctk.CTkLabel(
             content_frame,
-            text="Generate a secure password using advanced AI or memorable patterns",
+            text=DEFAULT_WARNING_TEXT,
             font=("Arial", 12)
         )
         self.warning_label.pack(pady=(0, 10))
@@ -119,6 +158,15 @@ class RecommenderScreen:
             width=400
         )
         password_entry.pack(pady=10)
+
+        # Live strength feedback, re-scored whenever the password changes
+        self.strength_label = ctk.CTkLabel(
+            content_frame,
+            text="",
+            font=("Arial", 12)
+        )
+        self.strength_label.pack(pady=2)
+        self.password_var.trace_add("write", self.update_strength)
         
         # Feedback label for both status messages and copy confirmation
         self.feedback_label = ctk.CTkLabel(
@@ -146,83 +194,126 @@ class RecommenderScreen:
         )
         self.copy_button.pack(side="left", padx=5)
 
+        # How many candidates are ready for the selected generator
+        self.pool_stats_label = ctk.CTkLabel(
+            content_frame,
+            text="",
+            font=("Arial", 10),
+            text_color="gray"
+        )
+        self.pool_stats_label.pack(pady=(0, 5))
+
+    def init_ml_generator(self):
+        """Train the ML model. Runs on the ML pool's worker thread."""
+        generator = MLPasswordGenerator(max_length=15)
+        generator.train(epochs=5)  # Reduced epochs for faster training
+        self.ml_generator = generator
+
+    def on_show(self):
+        for pool in self.pools.values():
+            pool.start()
+        self.cancel_jobs()
+        self.update_pool_stats()
+
+    def on_hide(self):
+        """Called by the router when another screen is shown: stop the UI timers (the pools keep filling)."""
+        self.cancel_jobs()
+
+    def on_evict(self):
+        """Called by the router on logout or timeout: drop every pre-generated password."""
+        self.cancel_jobs()
+        for pool in self.pools.values():
+            pool.close()
+        if self.passphrase_wordlist is not None:
+            self.passphrase_wordlist.close()
+            self.passphrase_wordlist = None
+        self.password_var.set("")
+
+    def cancel_jobs(self):
+        for job in (self.waiting_job, self.stats_job):
+            if job is not None:
+                self.root.after_cancel(job)
+        self.waiting_job = self.stats_job = None
+
+    def update_pool_stats(self):
+        if self.generator_type.get() == "passphrase":
+            # Passphrases are generated on demand, so show their strength instead
+            if self.passphrase_wordlist is not None:
+                generator = self.passphrase_generator()
+                self.pool_stats_label.configure(
+                    text=f"{generator.words} words from {len(self.passphrase_wordlist):,} · "
+                         f"{generator.entropy_bits:.1f} bits of entropy"
+                )
+            else:
+                self.pool_stats_label.configure(text="")
+        else:
+            stats = self.pools[self.generator_type.get()].stats()
+            self.pool_stats_label.configure(
+                text=f"Ready: {stats['size']}/{stats['capacity']} ({stats['state']}) · "
+                     f"served {stats['served']} · avg {stats['avg_generation_ms']:.0f} ms per candidate"
+            )
+        self.stats_job = self.root.after(500, self.update_pool_stats)
+
+    def passphrase_generator(self):
+        return PassphraseGenerator(self.passphrase_wordlist, words=int(self.word_count_var.get()))
+
     def generate_password(self):
-        # Disable generate button to prevent multiple clicks
-        self.generate_button.configure(state="disabled")
-        
+        if self.generator_type.get() == "passphrase":
+            self.generate_passphrase()
+            return
+        if self.waiting_job is not None:
+            return  # Already waiting for a candidate
+        self.take_candidate()
+
+    def generate_passphrase(self):
         try:
-            if self.generator_type.get() == "ml":
-                if not self.is_model_loading:
-                    # Initialize ML generator if not already done
-                    if self.ml_generator is None:
-                        self.is_model_loading = True
-                        self.feedback_label.configure(
-                            text="Initializing AI model (this may take a moment)...",
-                            text_color="orange"
-                        )
-                        self.root.update()
-                        
-                        try:
-                            self.ml_generator = MLPasswordGenerator(max_length=15)
-                            self.ml_generator.train(epochs=5)  # Reduced epochs for faster training
-                            self.is_model_loading = False
-                        except Exception as e:
-                            self.is_model_loading = False
-                            raise e
-                    
-                    # Generate password using ML model
-                    self.feedback_label.configure(
-                        text="AI is generating password...",
-                        text_color="orange"
-                    )
-                    self.root.update()
-                    
-                    passwords = self.ml_generator.generate_multiple(1)
-                    if passwords:
-                        self.password_var.set(passwords[0])
-                        self.feedback_label.configure(
-                            text="AI-generated password ready!",
-                            text_color="green"
-                        )
-                    else:
-                        self.password_var.set("")
-                        self.feedback_label.configure(
-                            text="Failed to generate password. Please try again.",
-                            text_color="red"
-                        )
-                else:
-                    self.feedback_label.configure(
-                        text="Please wait, AI model is still initializing...",
-                        text_color="orange"
-                    )
-            else:  # memorable
-                # Generate memorable password
-                self.feedback_label.configure(
-                    text="Generating memorable password...",
-                    text_color="orange"
-                )
-                self.root.update()
-                
-                passwords = self.memorable_generator.generate_multiple(1)
-                if passwords:
-                    self.password_var.set(passwords[0])
-                    self.feedback_label.configure(
-                        text="Memorable password ready!",
-                        text_color="green"
-                    )
-                else:
-                    self.password_var.set("")
-                    self.feedback_label.configure(
-                        text="Failed to generate password. Please try again.",
-                        text_color="red"
-                    )
-        except Exception as e:
+            if self.passphrase_wordlist is None:
+                self.passphrase_wordlist = open_default_wordlist()
+            self.password_var.set(self.passphrase_generator().generate())
+            self.feedback_label.configure(text="Passphrase ready!", text_color="green")
+        except (OSError, ValueError) as e:
             self.password_var.set("")
+            self.feedback_label.configure(text=f"Error: {str(e)}", text_color="red")
+
+    def take_candidate(self):
+        """Show a pooled candidate, or keep checking until the pool has one."""
+        self.waiting_job = None
+        generator_type = self.generator_type.get()
+        if generator_type not in self.pools:
+            return  # Switched to passphrase mode while waiting
+        pool = self.pools[generator_type]
+        candidate = pool.take()
+        if candidate is None:
+            if pool.last_error is not None:
+                # The pool keeps retrying in the background; a later click may succeed
+                self.password_var.set("")
+                self.feedback_label.configure(text=f"Error: {pool.last_error} (retrying)", text_color="red")
+                return
+            if not pool.ready:
+                message = "Please wait, AI model is still initializing..."
+            elif generator_type == "ml":
+                message = "AI is generating password..."
+            else:
+                message = "Generating memorable password..."
+            self.feedback_label.configure(text=message, text_color="orange")
+            self.waiting_job = self.root.after(100, self.take_candidate)
+            return
+
+        if generator_type == "ml":
+            # ML candidates come with the model's own guessability estimate
+            password, bits = candidate
+            self.password_var.set(password)
             self.feedback_label.configure(
-                text=f"Error: {str(e)}",
-                text_color="red"
+                text=f"AI-generated password ready! Model guessability: ~2^{bits:.0f} guesses",
+                text_color="green"
             )
-    
+        else:
+            self.password_var.set(candidate)
+            self.feedback_label.configure(text="Memorable password ready!", text_color="green")
+
+    def update_strength(self, *args):
+        update_strength_label(self.strength_label, self.strength_estimator, self.password_var.get())
+
     def copy_password(self):
         password = self.password_var.get().strip()  # Strip any leading/trailing spaces
         if password:
@@ -239,17 +330,11 @@ class RecommenderScreen:
     
     def back_to_home(self):
         """Navigate back to the home screen."""
-        self.frame.destroy()
-        from .home_screen import HomeScreen
-        screen = HomeScreen(self.root, self.master_password)
-        self.timeout_manager.set_current_screen(screen)
+        self.router.show("home", self.master_password)
 
     def logout(self):
         """Navigate to the login screen."""
-        self.frame.destroy()
-        from screens.login_screen import LoginScreen
-        screen = LoginScreen(self.root)
-        self.timeout_manager.set_current_screen(screen)
+        self.router.lock()
 
     def toggle_theme(self):
         """Toggle between light and dark mode."""
@@ -260,11 +345,21 @@ class RecommenderScreen:
         
     def update_warning_label(self):
         """Update warning label text and visibility based on generator type."""
+        if self.generator_type.get() == "passphrase":
+            self.passphrase_frame.pack(after=self.warning_label, pady=(0, 10))
+            self.warning_label.configure(
+                text="Random words from a large wordlist: long, but easy to type and remember",
+                text_color=("gray10", "gray90")
+            )
+            return
+        self.passphrase_frame.pack_forget()
         if self.generator_type.get() == "memorable":
             self.warning_label.configure(
                 text="Note: Memorable password generation is not the most secure \nas the model for it uses common words",
                 text_color="orange"
             )
+        else:
+            self.warning_label.configure(text=DEFAULT_WARNING_TEXT, text_color=("gray10", "gray90"))
 
     def update_activity(self, event=None):
         self.timeout_manager.update_activity()
\ No newline at end of file
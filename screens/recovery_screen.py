@@ -1,16 +1,18 @@
 import customtkinter as ctk
-from database import Database
-import hashlib
+from screen_router import ScreenRouter
+from profiles import ProfileManager
 
 class RecoveryScreen:
+    # Shown by the ScreenRouter, which sets the window title and packs the frame
+    title = "Password Recovery"
+
     def __init__(self, root):
         self.root = root
-        self.root.title("Password Recovery")
-        self.db = Database()
+        self.router = ScreenRouter()
+        self.db = ProfileManager().database()
         
         # Use CTkFrame instead of tk.Frame
         self.frame = ctk.CTkFrame(root)
-        self.frame.pack(padx=20, pady=20)
 
         # Add a larger centered "Recovery" label inside the frame
         ctk.CTkLabel(self.frame, text="Recovery", font=("Microsoft YaHei UI Light", 28), anchor="center").grid(row=0, column=0, columnspan=2, pady=10)
@@ -82,25 +84,18 @@ class RecoveryScreen:
             return
 
         # Update the master password in the database
-        master_password_hash = hashlib.sha256(new_password.encode()).hexdigest()
-        cursor = self.db.conn.cursor()
-        cursor.execute("UPDATE users SET master_password_hash = ? WHERE id = 1", (master_password_hash,))
-        self.db.conn.commit()
+        self.db.set_master_password(new_password)
 
         # Generate a new backup key
         new_backup_key = self.db.generate_new_backup_key()
         self.show_message("Master password has been reset successfully!", color="green")
 
         # Navigate to the backup key screen
-        self.frame.destroy()
-        from screens.backup_key_screen import BackupKeyScreen
-        BackupKeyScreen(self.root, new_password, new_backup_key)
+        self.router.show("backup_key", new_password, new_backup_key)
 
     def back_to_login(self):
         """Navigate back to the login screen."""
-        self.frame.destroy()
-        from screens.login_screen import LoginScreen
-        LoginScreen(self.root)
+        self.router.show("login")
 
     def show_message(self, message, color="red"):
         """Display a message in the reusable message label."""
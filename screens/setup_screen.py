@@ -1,18 +1,23 @@
 import customtkinter as ctk
+from screen_router import ScreenRouter
 import secrets
 import string
-from database import Database
+from profiles import ProfileManager
 from utils import toggle_theme
 
 class SetupScreen:
+    # Shown by the ScreenRouter, which sets the window title and packs the frame
+    title = "First-Time Setup"
+    # No vault exists yet, so there is nothing to lock
+    locks_on_timeout = False
+
     def __init__(self, root):
         self.root = root
-        self.root.title("First-Time Setup")
-        self.db = Database()
+        self.router = ScreenRouter()
+        self.db = ProfileManager().database()
         
         # Use CTkFrame instead of tk.Frame
         self.frame = ctk.CTkFrame(root)
-        self.frame.pack(padx=20, pady=20)
 
         # Theme toggle button in top-right corner
         self.theme_button = ctk.CTkButton(
@@ -87,9 +92,7 @@ class SetupScreen:
         self.show_message("Master password set successfully!", color="green")
 
         # Navigate to the backup key screen
-        self.frame.destroy()
-        from .backup_key_screen import BackupKeyScreen
-        BackupKeyScreen(self.root, password, backup_key)
+        self.router.show("backup_key", password, backup_key)
 
     def show_message(self, message, color="red"):
         """Display a message in the reusable message label."""
@@ -0,0 +1,319 @@
+"""
+Two-way sync between vault database files (for example copies on two machines).
+
+Each password row carries a stable uuid, a file-local modification counter, the time it
+was last changed and a hash of its content; deletions leave a tombstone (see the sync
+bookkeeping in database.py, kept up to date by triggers). Rows are grouped into 4096
+buckets by uuid prefix and each file caches one hash per bucket, which is only
+recomputed for buckets that changed. Comparing two vaults is therefore:
+
+    1. compare the root hashes (hash of all bucket hashes); equal means nothing to do
+    2. compare the 4096 bucket hashes and keep the buckets that differ
+    3. compare the rows of those buckets only, by uuid and content hash, and read the
+       full (encrypted) rows only for the entries that are copied or conflict
+
+Nothing is decrypted: both files must share the master password, and rows are copied
+in their encrypted form, site names included. Because the master password is shared, a
+row's blind index (site_index and its site_tokens) is valid in either file and is copied
+along with it, so copied rows stay searchable. A row that differs on both sides goes to the resolver.
+The default is last writer wins, using the change times, and the CLI can ask
+interactively instead, decrypting the conflicting site names if given the master password. All changes to both files are made in one transaction (the other file is
+ATTACHed), so an interrupted sync leaves both vaults as they were.
+
+    python sync.py password_manager.db /mnt/usb/password_manager.db
+    python sync.py --profile Personal /mnt/usb/password_manager.db --interactive
+    python sync.py local.db other.db --dry-run
+"""
+
+import argparse
+import getpass
+import hashlib
+import os
+import sys
+import time
+
+from database import Database, content_hash, decrypt_or_raw, SYNC_BUCKET_DIGITS
+from migrations import run_data_migrations
+from profiles import resolve_db_path
+from tracing import traced
+
+BUCKETS = [f"{i:0{SYNC_BUCKET_DIGITS}x}" for i in range(16 ** SYNC_BUCKET_DIGITS)]
+LIVE_COLUMNS = ("uuid", "site", "password", "last_updated", "status", "modified_at", "content_hash")
+
+
+def bucket_bounds(bucket):
+    """uuid range of a bucket: uuids are lowercase hex, so every one starting with `bucket` sorts below bucket + "g"."""
+    return bucket, bucket + "g"
+
+
+class Conflict:
+    """A row that differs between the two vaults. local/remote are full entry dicts (see VaultSync.load_entry)."""
+
+    def __init__(self, uuid, local, remote):
+        self.uuid = uuid
+        self.local = local
+        self.remote = remote
+
+
+def changed_at(entry):
+    return entry["deleted_at"] if entry.get("deleted") else entry["modified_at"]
+
+
+def last_writer_wins(conflict):
+    """Keep whichever side changed last. Ties go to the larger content hash, so both directions agree."""
+    local_key = (changed_at(conflict.local) or "", conflict.local.get("content_hash") or "")
+    remote_key = (changed_at(conflict.remote) or "", conflict.remote.get("content_hash") or "")
+    return "local" if local_key >= remote_key else "remote"
+
+
+class VaultSync:
+    def __init__(self, local_path, remote_path):
+        # Bring both files' schema up to date and give rows from before sync their uuids
+        remote_db = Database(remote_path)
+        try:
+            run_data_migrations(remote_db)
+        finally:
+            remote_db.close()
+        self.db = Database(local_path)
+        run_data_migrations(self.db)
+        self.conn = self.db.conn
+        self.conn.execute("ATTACH DATABASE ? AS remote", (remote_path,))
+
+    def close(self):
+        self.conn.execute("DETACH DATABASE remote")
+        self.db.close()
+
+    # --- hash tree ---
+
+    def bucket_hashes(self, schema):
+        """Every bucket's hash, recomputing only the buckets whose cached hash was dropped."""
+        hashes = dict(self.conn.execute(f"SELECT bucket, hash FROM {schema}.sync_buckets"))
+        for bucket in BUCKETS:
+            if bucket not in hashes:
+                hashes[bucket] = self._hash_bucket(schema, bucket)
+        return hashes
+
+    def _hash_bucket(self, schema, bucket):
+        low, high = bucket_bounds(bucket)
+        # Content hashes are filled in lazily, only for rows changed since the last sync
+        missing = self.conn.execute(
+            f"SELECT id, site, password, last_updated FROM {schema}.passwords "
+            "WHERE uuid >= ? AND uuid < ? AND content_hash IS NULL", (low, high)).fetchall()
+        if missing:
+            self.conn.executemany(f"UPDATE {schema}.passwords SET content_hash = ? WHERE id = ?",
+                                  [(content_hash(site, password, last_updated), id_)
+                                   for id_, site, password, last_updated in missing])
+        entries = self.conn.execute(
+            f"SELECT uuid, content_hash FROM {schema}.passwords WHERE uuid >= ? AND uuid < ? "
+            f"UNION ALL SELECT uuid, 'deleted' FROM {schema}.tombstones WHERE uuid >= ? AND uuid < ? "
+            "ORDER BY 1", (low, high, low, high)).fetchall()
+        digest = hashlib.sha256()
+        for uuid, entry_hash in entries:
+            digest.update(f"{uuid}:{entry_hash}\n".encode())
+        bucket_hash = digest.hexdigest()
+        self.conn.execute(f"INSERT OR REPLACE INTO {schema}.sync_buckets (bucket, hash) VALUES (?, ?)",
+                          (bucket, bucket_hash))
+        return bucket_hash
+
+    @staticmethod
+    def root_hash(bucket_hashes):
+        return hashlib.sha256("".join(bucket_hashes[b] for b in BUCKETS).encode()).hexdigest()
+
+    # --- rows ---
+
+    def bucket_entries(self, schema, bucket):
+        """{uuid: summary} for the live rows and tombstones of one bucket, without the encrypted columns."""
+        low, high = bucket_bounds(bucket)
+        entries = {}
+        for uuid, modified_at, entry_hash in self.conn.execute(
+                f"SELECT uuid, modified_at, content_hash FROM {schema}.passwords WHERE uuid >= ? AND uuid < ?", (low, high)):
+            entries[uuid] = {"uuid": uuid, "modified_at": modified_at, "content_hash": entry_hash}
+        for uuid, deleted_at in self.conn.execute(
+                f"SELECT uuid, deleted_at FROM {schema}.tombstones WHERE uuid >= ? AND uuid < ?", (low, high)):
+            entries.setdefault(uuid, {"uuid": uuid, "deleted": True, "deleted_at": deleted_at})
+        return entries
+
+    def load_entry(self, schema, summary):
+        """The full row for a summary from bucket_entries (tombstones are already complete)."""
+        if summary.get("deleted"):
+            return summary
+        row = self.conn.execute(f"SELECT {', '.join(LIVE_COLUMNS)} FROM {schema}.passwords WHERE uuid = ?",
+                                (summary["uuid"],)).fetchone()
+        return dict(zip(LIVE_COLUMNS, row))
+
+    @staticmethod
+    def same(a, b):
+        if a.get("deleted") or b.get("deleted"):
+            return a.get("deleted") == b.get("deleted")
+        return a["content_hash"] == b["content_hash"]
+
+    def _next_counter(self, schema):
+        return self.conn.execute(
+            f"SELECT COALESCE(MAX(c), 0) + 1 FROM (SELECT MAX(mod_counter) AS c FROM {schema}.passwords "
+            f"UNION ALL SELECT MAX(mod_counter) FROM {schema}.tombstones)").fetchone()[0]
+
+    def _write(self, schema, source, entry, counter):
+        """Make `schema` hold `entry` (a live row or a tombstone from `source`), keeping its change time."""
+        uuid = entry["uuid"]
+        if entry.get("deleted"):
+            # The delete trigger writes a tombstone; replace it to keep the original deletion time
+            self.conn.execute(f"DELETE FROM {schema}.passwords WHERE uuid = ?", (uuid,))
+            self.conn.execute(f"INSERT OR REPLACE INTO {schema}.tombstones (uuid, mod_counter, deleted_at) VALUES (?, ?, ?)",
+                              (uuid, counter, entry["deleted_at"]))
+        else:
+            # Setting mod_counter explicitly keeps the triggers from stamping a new change time
+            values = [entry[c] for c in LIVE_COLUMNS[1:]] + [counter]
+            updated = self.conn.execute(
+                f"UPDATE {schema}.passwords SET site = ?, password = ?, last_updated = ?, status = ?, "
+                "modified_at = ?, content_hash = ?, mod_counter = ? WHERE uuid = ?", values + [uuid]).rowcount
+            if not updated:
+                self.conn.execute(
+                    f"INSERT INTO {schema}.passwords (site, password, last_updated, status, modified_at, content_hash, "
+                    "mod_counter, uuid) VALUES (?, ?, ?, ?, ?, ?, ?, ?)", values + [uuid])
+            self.conn.execute(f"DELETE FROM {schema}.tombstones WHERE uuid = ?", (uuid,))
+            self._copy_site_index(schema, source, uuid)
+        self.conn.execute(f"DELETE FROM {schema}.sync_buckets WHERE bucket = ?", (uuid[:SYNC_BUCKET_DIGITS],))
+
+    def _copy_site_index(self, schema, source, uuid):
+        """Give a copied row its blind index from `source` (a separate UPDATE, so the site trigger doesn't drop it)."""
+        self.conn.execute(
+            f"UPDATE {schema}.passwords SET site_index = (SELECT site_index FROM {source}.passwords WHERE uuid = ?) "
+            "WHERE uuid = ?", (uuid, uuid))
+        self.conn.execute(
+            f"DELETE FROM {schema}.site_tokens WHERE password_id = (SELECT id FROM {schema}.passwords WHERE uuid = ?)",
+            (uuid,))
+        self.conn.execute(
+            f"INSERT OR IGNORE INTO {schema}.site_tokens (token, password_id) "
+            f"SELECT tokens.token, (SELECT id FROM {schema}.passwords WHERE uuid = ?) "
+            f"FROM {source}.site_tokens AS tokens JOIN {source}.passwords AS entries ON entries.id = tokens.password_id "
+            "WHERE entries.uuid = ?", (uuid, uuid))
+
+    def _check_master_passwords(self):
+        local = self.conn.execute("SELECT master_password_hash, backup_key_hash FROM main.users LIMIT 1").fetchone()
+        remote = self.conn.execute("SELECT master_password_hash, backup_key_hash FROM remote.users LIMIT 1").fetchone()
+        if local and remote and local[0] != remote[0]:
+            raise ValueError("The two vaults have different master passwords; change one to match before syncing.")
+        # A brand new file takes the other vault's master password along with its entries
+        if local and not remote:
+            self.conn.execute("INSERT INTO remote.users (master_password_hash, backup_key_hash) VALUES (?, ?)", local)
+        elif remote and not local:
+            self.conn.execute("INSERT INTO main.users (master_password_hash, backup_key_hash) VALUES (?, ?)", remote)
+
+    # --- sync ---
+
+    @traced("sync.run")
+    def run(self, resolve=last_writer_wins, dry_run=False):
+        """
+        Reconcile both files and return a report dict.
+        resolve: called with a Conflict, returns "local" or "remote" (the side to keep)
+        dry_run: only report what would change
+        """
+        start = time.perf_counter()
+        report = {"buckets_differing": 0, "rows_compared": 0, "to_local": 0, "to_remote": 0, "conflicts": 0}
+        with self.db.batch():
+            self._check_master_passwords()
+            local_hashes = self.bucket_hashes("main")
+            remote_hashes = self.bucket_hashes("remote")
+            report["compare_ms"] = (time.perf_counter() - start) * 1000
+            if self.root_hash(local_hashes) == self.root_hash(remote_hashes):
+                report.update(in_sync=True, seconds=time.perf_counter() - start)
+                return report
+
+            changes = {"main": [], "remote": []}
+            for bucket in BUCKETS:
+                if local_hashes[bucket] == remote_hashes[bucket]:
+                    continue
+                report["buckets_differing"] += 1
+                local_entries = self.bucket_entries("main", bucket)
+                remote_entries = self.bucket_entries("remote", bucket)
+                for uuid in local_entries.keys() | remote_entries.keys():
+                    report["rows_compared"] += 1
+                    local, remote = local_entries.get(uuid), remote_entries.get(uuid)
+                    if local is None:
+                        changes["main"].append(remote)
+                    elif remote is None:
+                        changes["remote"].append(local)
+                    elif not self.same(local, remote):
+                        report["conflicts"] += 1
+                        local, remote = self.load_entry("main", local), self.load_entry("remote", remote)
+                        if resolve(Conflict(uuid, local, remote)) == "local":
+                            changes["remote"].append(local)
+                        else:
+                            changes["main"].append(remote)
+
+            report["to_local"] = len(changes["main"])
+            report["to_remote"] = len(changes["remote"])
+            if not dry_run:
+                for schema, source in (("main", "remote"), ("remote", "main")):
+                    counter = self._next_counter(schema)
+                    for offset, entry in enumerate(changes[schema]):
+                        self._write(schema, source, self.load_entry(source, entry), counter + offset)
+                report["in_sync"] = self.root_hash(self.bucket_hashes("main")) == self.root_hash(self.bucket_hashes("remote"))
+            else:
+                report["in_sync"] = False
+        report["seconds"] = time.perf_counter() - start
+        return report
+
+
+def sync(local_path, remote_path, resolve=last_writer_wins, dry_run=False):
+    """Two-way sync of two vault files. See VaultSync.run."""
+    vault_sync = VaultSync(local_path, remote_path)
+    try:
+        return vault_sync.run(resolve, dry_run)
+    finally:
+        vault_sync.close()
+
+
+def describe(entry, master_password=None):
+    if entry is None:
+        return "missing"
+    if entry.get("deleted"):
+        return f"deleted at {entry['deleted_at']}"
+    site = decrypt_or_raw(entry["site"], master_password) if master_password else "(site hidden)"
+    return f"{site} (changed {entry['modified_at']}, dated {entry['last_updated']})"
+
+
+def ask(conflict, master_password=None):
+    """Interactive resolver for the command line."""
+    print(f"\nConflict for entry {conflict.uuid[:8]}:")
+    print(f"  [l] this vault:  {describe(conflict.local, master_password)}")
+    print(f"  [r] other vault: {describe(conflict.remote, master_password)}")
+    while True:
+        answer = input("Keep which? [l/r] ").strip().lower()
+        if answer in ("l", "r"):
+            return "local" if answer == "l" else "remote"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Two-way sync between vault database files")
+    parser.add_argument("local", nargs="?", help="This vault (default: --profile's vault or password_manager.db)")
+    parser.add_argument("remote", help="The other vault file")
+    parser.add_argument("--profile", help="Use this profile's vault as the local side")
+    parser.add_argument("--interactive", action="store_true",
+                        help="Ask which side to keep for each conflict (prompts for the master password, or reads "
+                             "PMRS_MASTER_PASSWORD, to show site names; leave it empty to skip)")
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would change")
+    args = parser.parse_args(argv)
+
+    resolve = last_writer_wins
+    if args.interactive:
+        master_password = os.environ.get("PMRS_MASTER_PASSWORD") or getpass.getpass("Master password (to show sites): ")
+        resolve = lambda conflict: ask(conflict, master_password or None)
+    try:
+        local_path = args.local or resolve_db_path(args.profile)
+        report = sync(local_path, args.remote, resolve, args.dry_run)
+    except (KeyError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    if report.get("in_sync") and not report["to_local"] and not report["to_remote"]:
+        print(f"Already in sync (compared in {report['compare_ms']:.1f} ms)")
+    else:
+        verb = "Would copy" if args.dry_run else "Copied"
+        print(f"{verb} {report['to_local']} entries here and {report['to_remote']} to the other vault "
+              f"({report['conflicts']} conflicts, {report['buckets_differing']}/{len(BUCKETS)} buckets differed, "
+              f"{report['seconds'] * 1000:.1f} ms)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
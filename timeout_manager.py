@@ -1,42 +1,83 @@
-from datetime import datetime, timedelta
+import os
+import time
+
+# Lock the app after this many seconds without activity (override with PMRS_TIMEOUT_SECONDS)
+DEFAULT_TIMEOUT_SECONDS = 60
+
+# Events that count as user activity anywhere in the window
+ACTIVITY_EVENTS = ("<Motion>", "<ButtonPress>", "<KeyPress>")
 
 class TimeoutManager:
     _instance = None
-    
+
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super(TimeoutManager, cls).__new__(cls)
-            cls._instance.last_activity = datetime.now()
-            cls._instance.timeout_duration = timedelta(minutes=1)  # 1 minute timeout if inactive
+            cls._instance.last_activity = time.monotonic()
+            cls._instance.timeout_duration = float(os.environ.get("PMRS_TIMEOUT_SECONDS", DEFAULT_TIMEOUT_SECONDS))
             cls._instance.root = None
             cls._instance.current_screen = None
+            cls._instance._deadline_id = None  # Pending root.after() id, if armed
         return cls._instance
-    
+
     def set_root(self, root):
         self.root = root
-    
+        # One hook on the "all" tag sees activity over every widget, including child widgets
+        for sequence in ACTIVITY_EVENTS:
+            root.bind_all(sequence, self.update_activity, add="+")
+
+    def set_timeout_duration(self, seconds):
+        """Change how long the app may stay idle before locking."""
+        self.timeout_duration = float(seconds)
+        if self._deadline_id is not None:
+            self._arm(self.timeout_duration)
+
     def set_current_screen(self, screen):
         self.current_screen = screen
         self.update_activity()  # Reset activity timer when screen changes
-    
-    def update_activity(self):
-        self.last_activity = datetime.now()
-    
+        # The login screen is already locked, every other screen locks after the timeout
+        if getattr(screen, "locks_on_timeout", True):
+            self._arm(self.timeout_duration)
+        else:
+            self._disarm()
+
+    def update_activity(self, event=None):
+        # Called for every event, so only record the time; the deadline checks it later
+        self.last_activity = time.monotonic()
+
+    def seconds_remaining(self):
+        return self.last_activity + self.timeout_duration - time.monotonic()
+
     def check_timeout(self):
-        if datetime.now() - self.last_activity > self.timeout_duration:
+        if self.seconds_remaining() <= 0:
             self.handle_timeout()
             return True
         return False
-    
+
     def handle_timeout(self):
-        if self.current_screen and hasattr(self.current_screen, 'frame'):
-            self.current_screen.frame.destroy()
-        from screens.login_screen import LoginScreen
-        screen = LoginScreen(self.root)
-        self.set_current_screen(screen)  # Set the new login screen as current screen
-    
+        self._disarm()
+        # The router drops every unlocked screen and shows the login screen
+        from screen_router import ScreenRouter
+        ScreenRouter().lock()
+
     def start_timeout_check(self):
-        def check():
-            if not self.check_timeout():
-                self.root.after(1000, check)  # Check for activity every second.
-        check() 
\ No newline at end of file
+        """Arm the idle deadline for the current screen."""
+        self._arm(self.timeout_duration)
+
+    def _arm(self, seconds):
+        """Schedule a single wake-up for when the timeout could next expire."""
+        if self.root is None:
+            return
+        self._disarm()
+        self._deadline_id = self.root.after(max(int(seconds * 1000), 1), self._on_deadline)
+
+    def _disarm(self):
+        if self._deadline_id is not None and self.root is not None:
+            self.root.after_cancel(self._deadline_id)
+        self._deadline_id = None
+
+    def _on_deadline(self):
+        self._deadline_id = None
+        # Activity since the deadline was set just pushes it back
+        if not self.check_timeout():
+            self._arm(self.seconds_remaining())
@@ -0,0 +1,162 @@
+"""
+Lightweight tracing and profiling hooks.
+
+Set PMRS_TRACE=1 to record timing spans and counters around database, crypto,
+recommender and UI work. When it is not set, @traced returns the original function
+unchanged and span()/count() return immediately, so the hooks cost next to nothing.
+
+Environment variables:
+    PMRS_TRACE                  Enable tracing (1/true)
+    PMRS_TRACE_FILE             Chrome trace JSON written at exit (default: pmrs_trace.json),
+                                open it in chrome://tracing or https://ui.perfetto.dev
+    PMRS_TRACE_SUMMARY_SECONDS  Log a summary of every span this often (default: 60, 0 = off)
+"""
+
+import atexit
+import functools
+import json
+import logging
+import os
+import threading
+import time
+
+ENABLED = os.environ.get("PMRS_TRACE", "").lower() in ("1", "true", "yes", "on")
+TRACE_FILE = os.environ.get("PMRS_TRACE_FILE", "pmrs_trace.json")
+SUMMARY_SECONDS = float(os.environ.get("PMRS_TRACE_SUMMARY_SECONDS", "60"))
+
+# Keep memory bounded in long sessions; the summary stats keep counting after this
+MAX_EVENTS = 200000
+
+logger = logging.getLogger("pmrs.trace")
+
+_lock = threading.Lock()
+_events = []      # Chrome trace "complete" events
+_stats = {}       # span name -> [count, total seconds, max seconds]
+_counters = {}    # counter name -> value
+_start = time.perf_counter()
+
+
+def _record(name, started, elapsed):
+    with _lock:
+        stats = _stats.get(name)
+        if stats is None:
+            _stats[name] = [1, elapsed, elapsed]
+        else:
+            stats[0] += 1
+            stats[1] += elapsed
+            if elapsed > stats[2]:
+                stats[2] = elapsed
+        if len(_events) < MAX_EVENTS:
+            _events.append({
+                "name": name,
+                "ph": "X",
+                "ts": (started - _start) * 1e6,
+                "dur": elapsed * 1e6,
+                "pid": os.getpid(),
+                "tid": threading.get_ident(),
+            })
+
+
+class _Span:
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        _record(self.name, self.started, time.perf_counter() - self.started)
+        return False
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def span(name):
+    """Time a block: `with span("db.query"): ...`"""
+    if not ENABLED:
+        return _NULL_SPAN
+    return _Span(name)
+
+
+def traced(name=None):
+    """
+    Decorator that times every call of a function.
+    Returns the function untouched when tracing is disabled.
+    """
+    def decorator(func):
+        if not ENABLED:
+            return func
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _record(span_name, started, time.perf_counter() - started)
+        return wrapper
+    return decorator
+
+
+def count(name, amount=1):
+    """Increment a named counter."""
+    if not ENABLED:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + amount
+
+
+def summary():
+    """Return a text table of every span (slowest total first) and counter."""
+    with _lock:
+        stats = sorted(_stats.items(), key=lambda item: item[1][1], reverse=True)
+        counters = sorted(_counters.items())
+    lines = [f"{'span':<40} {'calls':>8} {'total ms':>10} {'avg ms':>9} {'max ms':>9}"]
+    for name, (calls, total, longest) in stats:
+        lines.append(f"{name:<40} {calls:>8} {total * 1000:>10.1f} {total * 1000 / calls:>9.2f} {longest * 1000:>9.2f}")
+    for name, value in counters:
+        lines.append(f"counter {name}: {value}")
+    return "\n".join(lines)
+
+
+def export_chrome_trace(path=None):
+    """Write the recorded spans as a Chrome/Perfetto trace JSON file."""
+    path = path or TRACE_FILE
+    with _lock:
+        events = list(_events)
+        counters = dict(_counters)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms", "otherData": {"counters": counters}}, f)
+    return path
+
+
+def _log_summary_periodically():
+    while True:
+        time.sleep(SUMMARY_SECONDS)
+        logger.info("Trace summary:\n%s", summary())
+
+
+def _on_exit():
+    path = export_chrome_trace()
+    logger.info("Trace summary:\n%s", summary())
+    logger.info("Trace written to %s", path)
+
+
+if ENABLED:
+    if not logging.getLogger().handlers:
+        logging.basicConfig(level=logging.INFO)
+    logger.setLevel(logging.INFO)
+    atexit.register(_on_exit)
+    if SUMMARY_SECONDS > 0:
+        threading.Thread(target=_log_summary_periodically, name="trace-summary", daemon=True).start()
@@ -1,15 +1,18 @@
 import hashlib
-import random
-import string
-import pyperclip
+import functools
+import hmac
 from cryptography.fernet import Fernet
 import base64
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
-import customtkinter as ctk
+from tracing import traced
+
+# customtkinter and pyperclip are imported inside the functions that need them, so the
+# crypto helpers can be used by the CLI and agent without loading the GUI stack.
 
 def toggle_theme():
     """Toggle between light and dark mode."""
+    import customtkinter as ctk
     current_mode = ctk.get_appearance_mode()
     new_mode = "Light" if current_mode == "Dark" else "Dark"
     ctk.set_appearance_mode(new_mode)
@@ -19,8 +22,12 @@ def hash_password(password):
     # Hash a password using SHA-256.
     return hashlib.sha256(password.encode()).hexdigest()
 
+@functools.lru_cache(maxsize=4)
+@traced("crypto.derive_key_from_password")
 def derive_key_from_password(password):
     # Derive a Fernet key from the master password using PBKDF2.
+    # Cached: the salt is fixed, so the same password always gives the same key and
+    # decrypting a whole vault should not re-run 100k PBKDF2 iterations per row.
 
     # Convert password to bytes
     password = password.encode()
@@ -38,6 +45,28 @@ def derive_key_from_password(password):
     key = base64.urlsafe_b64encode(kdf.derive(password))
     return key
 
+# Hex digits kept of each blind index HMAC (64 bits)
+BLIND_INDEX_LENGTH = 16
+
+@functools.lru_cache(maxsize=4)
+def derive_index_key(password):
+    # Key for blind indexes, derived from the vault key rather than with a second PBKDF2 run,
+    # and kept separate from it so index values reveal nothing about the encryption key.
+    return hmac.new(base64.urlsafe_b64decode(derive_key_from_password(password)), b"pmrs-site-index", hashlib.sha256).digest()
+
+def blind_index(term, master_password):
+    """
+    Truncated HMAC of a search term. Equal terms give equal values, so they can be looked up
+    in an index, but the term can't be read back without the master password.
+    """
+    return hmac.digest(derive_index_key(master_password), term.encode(), "sha256").hex()[:BLIND_INDEX_LENGTH]
+
+def clear_key_cache():
+    """Forget cached derived keys (called when the app locks)."""
+    derive_key_from_password.cache_clear()
+    derive_index_key.cache_clear()
+
+@traced("crypto.encrypt_password")
 def encrypt_password(password, master_password):
     """
     Encrypt a password using the master password.
@@ -46,6 +75,15 @@ def encrypt_password(password, master_password):
     f = Fernet(key)
     return f.encrypt(password.encode()).decode()
 
+@traced("crypto.encrypt_many")
+def encrypt_many(passwords, master_password):
+    """
+    Encrypt several passwords with one Fernet instance for the master password's key.
+    """
+    f = Fernet(derive_key_from_password(master_password))
+    return [f.encrypt(password.encode()).decode() for password in passwords]
+
+@traced("crypto.decrypt_password")
 def decrypt_password(encrypted_password, master_password):
     """
     Decrypt a password using the master password.
@@ -58,4 +96,18 @@ def copy_to_clipboard(text):
     """
     Copy text to the clipboard.
     """
-    pyperclip.copy(text)
\ No newline at end of file
+    import pyperclip
+    pyperclip.copy(text)
+
+def update_strength_label(label, estimator, password):
+    """
+    Score a password with a StrengthEstimator and show the result in a label.
+    """
+    if not password:
+        label.configure(text="")
+        return
+    result = estimator.score(password)
+    text = f"Strength: {result.label}"
+    if result.feedback:
+        text += f" - {result.feedback}"
+    label.configure(text=text, text_color=result.color)
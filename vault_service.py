@@ -0,0 +1,182 @@
+"""
+Headless vault API.
+
+All vault operations go through VaultService, so the GUI, the command line and scripts
+share one implementation. This module must not import customtkinter or TensorFlow.
+"""
+
+from background import DatabaseWorker
+from database import Database, RECOMMENDED_AFTER_DAYS, PAGE_SIZE
+from generator_core import PasswordPolicy, generate_password
+from migrations import run_data_migrations
+from utils import derive_key_from_password
+
+# Policy used when rotating a password without an explicit one
+DEFAULT_ROTATION_POLICY = PasswordPolicy(length=20)
+
+
+class VaultLockedError(Exception):
+    """Raised when an operation needs the vault to be unlocked first."""
+
+
+def unlock_step(db, master_password, progress=None):
+    """
+    The slow part of unlocking, for a DatabaseWorker: check the master password, derive the
+    vault key (cached for the whole process, so the Tk thread never runs the KDF itself),
+    finish the data migrations (rewrites of rows from older versions) and bring statuses
+    up to date.
+    progress(name, done, total) is called from the worker thread as migrations advance.
+    Returns whether the password was right.
+    """
+    if not db.verify_master_password(master_password):
+        return False
+    derive_key_from_password(master_password)
+    run_data_migrations(db, master_password, progress)
+    db.refresh_statuses()
+    return True
+
+
+def first_page_step(db, master_password):
+    """Read and decrypt the vault list's first page, for a DatabaseWorker. Returns (mod_counter, entries, cursor)."""
+    mod_counter = db.max_mod_counter()  # Read first, so a change during the query makes the page stale
+    entries, cursor = db.list_page(master_password)
+    return mod_counter, entries, cursor
+
+
+class VaultService:
+    def __init__(self, db=None, db_name='password_manager.db'):
+        self.db = db if db is not None else Database(db_name)
+        self.master_password = None
+        self._first_page = None  # DatabaseWorker running first_page_step
+
+    @property
+    def is_unlocked(self):
+        return self.master_password is not None
+
+    def unlock(self, master_password):
+        """Verify the master password and keep it for this session. Returns True on success."""
+        if not self.db.verify_master_password(master_password):
+            return False
+        self.master_password = master_password
+        self.db.refresh_statuses()
+        run_data_migrations(self.db, master_password)  # e.g. encrypts sites from older vaults and rows copied by sync
+        return True
+
+    def unlocked_by(self, master_password):
+        """Mark the session unlocked with a password unlock_step has already checked on a worker."""
+        self.master_password = master_password
+
+    def lock(self):
+        self.master_password = None
+        self._first_page = None
+
+    def prefetch_first_page(self):
+        """Start reading and decrypting the default first page of the vault list in the background."""
+        master_password = self._require_unlocked()
+        self._first_page = DatabaseWorker(self.db.db_name, first_page_step, master_password).start()
+
+    def take_first_page(self, mod_counter):
+        """
+        The prefetched first page as Database.list_page returns it, or None if it isn't ready
+        or the vault changed since (`mod_counter` is the current Database.max_mod_counter()).
+        A page is only handed out once.
+        """
+        worker, self._first_page = self._first_page, None
+        if worker is None or not worker.done or worker.error is not None:
+            return None
+        prefetched_counter, entries, cursor = worker.result
+        return (entries, cursor) if prefetched_counter == mod_counter else None
+
+    def _require_unlocked(self):
+        if not self.is_unlocked:
+            raise VaultLockedError("Vault is locked. Call unlock() first.")
+        return self.master_password
+
+    @staticmethod
+    def to_dict(entry):
+        """Convert a Database row tuple into a dict."""
+        id_, site, password, last_updated, status = entry
+        return {"id": id_, "site": site, "password": password, "last_updated": last_updated, "status": status}
+
+    def list(self):
+        """Every entry, decrypted."""
+        master_password = self._require_unlocked()
+        return [self.to_dict(e) for e in self.db.get_all_passwords(master_password)]
+
+    def list_page(self, sort="id", descending=False, site=None, status=None, older_than_days=None,
+                  after=None, limit=PAGE_SIZE):
+        """
+        One sorted, filtered page of entries and the cursor for the next page (None on the last).
+        See Database.list_page for the arguments.
+        """
+        master_password = self._require_unlocked()
+        entries, cursor = self.db.list_page(master_password, sort, descending, site, status,
+                                            older_than_days, after, limit)
+        return [self.to_dict(e) for e in entries], cursor
+
+    def get(self, password_id):
+        """One entry by ID, or None."""
+        master_password = self._require_unlocked()
+        entry = self.db.get_password(password_id, master_password)
+        return self.to_dict(entry) if entry else None
+
+    def search(self, query, exact=False):
+        """Entries whose site, or a word in it, starts with `query` (case-insensitive); or whose site is `query` if exact."""
+        master_password = self._require_unlocked()
+        return [self.to_dict(e) for e in self.db.search_passwords(query, master_password, exact)]
+
+    def list_stale(self, threshold_days=RECOMMENDED_AFTER_DAYS, limit=None):
+        """Entries not updated for more than `threshold_days`, oldest first. Only these are decrypted."""
+        master_password = self._require_unlocked()
+        return [self.to_dict(e) for e in self.db.list_stale(master_password, threshold_days, limit)]
+
+    def history(self, password_id, limit=None):
+        """An entry's previous passwords, newest first."""
+        master_password = self._require_unlocked()
+        self._require_entry(password_id)
+        return [{"id": history_id, "password": password, "last_updated": last_updated, "replaced_at": replaced_at}
+                for history_id, password, last_updated, replaced_at
+                in self.db.password_history(password_id, master_password, limit)]
+
+    def status_counts(self):
+        """Number of entries per status. Needs no master password, nothing is decrypted."""
+        self.db.refresh_statuses()
+        return self.db.count_by_status()
+
+    def add(self, site, password, last_updated=None):
+        """Add an entry and return its ID."""
+        master_password = self._require_unlocked()
+        if not site or not password:
+            raise ValueError("Site and password are required.")
+        return self.db.add_password(site, password, master_password, last_updated=last_updated)
+
+    def update(self, password_id, password):
+        master_password = self._require_unlocked()
+        if not password:
+            raise ValueError("Password is required.")
+        self._require_entry(password_id)
+        self.db.update_password(password_id, password, master_password)
+
+    def delete(self, password_id):
+        self._require_unlocked()
+        self._require_entry(password_id)
+        self.db.delete_password(password_id)
+
+    def rotate(self, password_id, policy=None):
+        """Replace an entry's password with a freshly generated one and return it."""
+        self._require_unlocked()
+        new_password = generate_password(policy or DEFAULT_ROTATION_POLICY)
+        self.update(password_id, new_password)
+        return new_password
+
+    def batch(self):
+        """Context manager that runs several operations in one transaction."""
+        return self.db.batch()
+
+    def _require_entry(self, password_id):
+        if self.db.conn.execute("SELECT 1 FROM passwords WHERE id = ?", (password_id,)).fetchone() is None:
+            raise KeyError(f"No entry with ID {password_id}")
+
+    def close(self):
+        self.lock()
+        self.db.close()